@@ -0,0 +1,136 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import aiohttp
+from src import metrics
+from src.trade_decoder import trades_from_receipt, read_tx_hash_file, _resolve_rpc_url
+from src.market_decoder import market_from_gamma
+from src.indexer.aio import HostLimiter, AsyncRPCClient, AsyncGammaClient
+
+# asyncio variant of src.demo: receipt fetches, log decoding and the Gamma
+# lookup run concurrently under one bounded scheduler, and each transaction
+# yields the same {"stage1": ...} document as the sequential demo.
+
+async def resolve_market(gamma: AsyncGammaClient, slug: str) -> dict:
+    market_data = await gamma.fetch_market_by_slug(slug)
+    if not market_data:
+        raise ValueError("Market not found in Gamma API")
+    return market_from_gamma(market_data)
+
+async def run_pipeline(tx_hashes: list, event_slug: str = None, rpc_url: str = None,
+                       gamma_url: str = None, concurrency: int = 16, per_host: int = 16) -> list:
+    """
+    Decode `tx_hashes` (and optionally the market for `event_slug`) concurrently.
+
+    Args:
+        concurrency (int): Max requests in flight overall; also the number of receipt workers.
+        per_host (int): Max requests in flight per host.
+
+    Returns:
+        list: One {"stage1": {...}} document per transaction, in input order.
+    """
+    rpc_url = _resolve_rpc_url(rpc_url)
+    results = {}
+
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        limiter = HostLimiter(total=concurrency, per_host=per_host)
+        rpc = AsyncRPCClient(session, rpc_url, limiter)
+        gamma = AsyncGammaClient(session, limiter, gamma_url)
+
+        # Market resolution overlaps with the receipt fetches below
+        market_task = None
+        if event_slug:
+            market_task = asyncio.ensure_future(resolve_market(gamma, event_slug))
+
+        # Bounded queue: the producer blocks once workers fall behind
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        if metrics.ENABLED:
+            metrics.QUEUE_DEPTH.set_function(queue.qsize, "receipts")
+
+        async def producer():
+            for tx_hash in tx_hashes:
+                await queue.put(tx_hash)
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def worker():
+            while True:
+                tx_hash = await queue.get()
+                if tx_hash is None:
+                    return
+                try:
+                    receipt = await rpc.get_receipt(tx_hash)
+                    if receipt is None:
+                        if metrics.ENABLED:
+                            metrics.DECODE_FAILURES.inc("receipt_not_found")
+                        raise ValueError(f"Transaction {tx_hash} not found")
+                    with metrics.span("decode_receipt"):
+                        results[tx_hash] = trades_from_receipt(tx_hash, receipt)
+                except Exception as e:
+                    results[tx_hash] = e
+
+        await asyncio.gather(producer(), *(worker() for _ in range(concurrency)))
+        if metrics.ENABLED:
+            metrics.QUEUE_DEPTH.set_function(None, "receipts")
+
+        market_info, market_error = None, None
+        if market_task is not None:
+            try:
+                market_info = await market_task
+            except Exception as e:
+                market_error = e
+
+    documents = []
+    for tx_hash in tx_hashes:
+        output_data = {}
+        result = results[tx_hash]
+        if isinstance(result, Exception):
+            output_data['trades_error'] = str(result)
+        else:
+            output_data['tx_hash'] = tx_hash
+            output_data['trades'] = result
+        if market_info is not None:
+            output_data['market'] = market_info
+        elif market_error is not None:
+            output_data['market_error'] = str(market_error)
+        documents.append({"stage1": output_data})
+    return documents
+
+def main():
+    parser = argparse.ArgumentParser(description="Polymarket Indexer Stage 1 Demo (asyncio)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--tx-hash", action="append", help="Transaction Hash (repeatable)")
+    group.add_argument("--tx-hash-file", help="File with one transaction hash per line")
+    parser.add_argument("--event-slug", help="Market/Event Slug for API Lookup")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max requests in flight")
+    parser.add_argument("--per-host", type=int, default=16, help="Max requests in flight per host")
+    parser.add_argument("--output", help="Output JSON file path")
+
+    args = parser.parse_args()
+
+    tx_hashes = args.tx_hash or read_tx_hash_file(args.tx_hash_file)
+
+    t0 = time.monotonic()
+    documents = asyncio.run(run_pipeline(
+        tx_hashes,
+        event_slug=args.event_slug,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+    ))
+    print(f"Decoded {len(tx_hashes)} transactions in {time.monotonic() - t0:.2f}s.")
+
+    # A single hash produces exactly the document src.demo would
+    final_json = documents[0] if len(documents) == 1 else documents
+    print(json.dumps(final_json, indent=2))
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(final_json, f, indent=2)
+        print(f"Output saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import time
+import asyncio
+import argparse
+from src.stub.synth import generate_logs, generate_events
+from src.stub.rpc import StubRPCServer
+from src.stub.gamma import StubGammaServer
+from src.async_demo import run_pipeline
+
+# Throughput of the asyncio pipeline against stand-in RPC / Gamma servers
+# with injected latency, at increasing concurrency.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the asyncio decode pipeline")
+    parser.add_argument("--tx-count", type=int, default=200, help="Transactions to decode")
+    parser.add_argument("--rpc-latency", type=float, default=0.02, help="Injected RPC latency (s)")
+    parser.add_argument("--gamma-latency", type=float, default=0.05, help="Injected Gamma latency (s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+
+    args = parser.parse_args()
+
+    logs = generate_logs(args.tx_count * 5)
+    events = generate_events(1)
+    tx_hashes = sorted({log["transactionHash"] for log in logs})[:args.tx_count]
+
+    with StubRPCServer(logs=logs, latency=args.rpc_latency) as rpc, \
+         StubGammaServer(events=events, latency=args.gamma_latency) as gamma:
+        baseline = None
+        for concurrency in args.concurrency:
+            t0 = time.perf_counter()
+            asyncio.run(run_pipeline(
+                tx_hashes,
+                event_slug=events[0]["slug"],
+                rpc_url=rpc.url,
+                gamma_url=gamma.url,
+                concurrency=concurrency,
+                per_host=concurrency,
+            ))
+            elapsed = time.perf_counter() - t0
+            baseline = baseline or elapsed
+            print(f"concurrency {concurrency:4d}: {elapsed:7.3f}s  "
+                  f"{len(tx_hashes) / elapsed:9.1f} tx/s  ({baseline / elapsed:.1f}x)")
@@ -0,0 +1,59 @@
+import os
+import time
+import random
+import argparse
+from src.ctf.derive import (
+    derive_binary_positions_reference,
+    derive_binary_positions_many,
+    compute_condition_id,
+    compute_condition_ids_many,
+    clear_position_cache,
+)
+from src.stub.synth import UMA_ADAPTER
+
+# Bulk vs per-market CTF position derivation, cross-checked for equality.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bulk CTF position-ID derivation")
+    parser.add_argument("--count", type=int, default=100000, help="Number of conditions")
+    parser.add_argument("--check", type=int, default=2000, help="Conditions cross-checked against the web3 reference")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="Worker processes for the pooled run")
+
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    question_ids = ["0x" + format(rng.getrandbits(256), "064x") for _ in range(args.count)]
+
+    t0 = time.perf_counter()
+    conditions = compute_condition_ids_many(UMA_ADAPTER, question_ids)
+    t_conditions = time.perf_counter() - t0
+
+    clear_position_cache()
+    t0 = time.perf_counter()
+    bulk = derive_binary_positions_many(conditions)
+    t_bulk = time.perf_counter() - t0
+
+    clear_position_cache()
+    t0 = time.perf_counter()
+    pooled = derive_binary_positions_many(conditions, processes=args.processes)
+    t_pooled = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    derive_binary_positions_many(conditions)
+    t_cached = time.perf_counter() - t0
+
+    sample = range(min(args.check, args.count))
+    t0 = time.perf_counter()
+    reference = [derive_binary_positions_reference(UMA_ADAPTER, question_ids[i]) for i in sample]
+    t_single = (time.perf_counter() - t0) / max(len(reference), 1) * args.count
+
+    for i, expected in zip(sample, reference):
+        assert compute_condition_id(UMA_ADAPTER, question_ids[i], 2) == conditions[i] == expected["conditionId"]
+        assert bulk[i] == pooled[i] == expected, f"mismatch at {i}"
+
+    print(f"{args.count} conditions ({len(reference)} cross-checked)")
+    print(f"  web3 reference (est.)          : {t_single:8.3f}s")
+    print(f"  compute_condition_ids_many     : {t_conditions:8.3f}s")
+    print(f"  bulk                           : {t_bulk:8.3f}s  ({t_single / t_bulk:.0f}x)")
+    print(f"  {f'bulk, {args.processes} processes':<31}: {t_pooled:8.3f}s  ({t_single / t_pooled:.0f}x)")
+    print(f"  bulk, cached                   : {t_cached:8.3f}s")
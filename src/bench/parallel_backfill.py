@@ -0,0 +1,59 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from src.stub.synth import generate_logs
+from src.stub.rpc import StubRPCServer
+from src.indexer.backfill import backfill
+from src.indexer.parallel import parallel_backfill
+
+# Sequential backfill vs the process-pool backfill at increasing worker
+# counts, on synthetic logs served by the stand-in RPC. The stub runs in its
+# own process so it does not compete with the benchmark for the GIL.
+
+def _serve(logs, max_block_range, conn):
+    with StubRPCServer(logs=logs, max_block_range=max_block_range) as server:
+        conn.send(server.url)
+        conn.recv()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the multi-core sharded backfill")
+    parser.add_argument("--count", type=int, default=100000, help="Synthetic logs to serve")
+    parser.add_argument("--logs-per-block", type=int, default=50)
+    parser.add_argument("--shard-size", type=int, default=100, help="Blocks per shard")
+    parser.add_argument("--max-block-range", type=int, default=500, help="Stub eth_getLogs range limit")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    args = parser.parse_args()
+
+    logs = generate_logs(args.count, logs_per_block=args.logs_per_block)
+    last_block = int(logs[-1]["blockNumber"], 16)
+
+    parent, child = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=_serve, args=(logs, args.max_block_range, child), daemon=True)
+    server.start()
+    rpc_url = parent.recv()
+    spool_dir = tempfile.mkdtemp(prefix="spool-")
+
+    try:
+        print(f"{len(logs)} logs over {last_block} blocks, {os.cpu_count()} CPUs")
+
+        t0 = time.perf_counter()
+        count = sum(1 for _ in backfill(1, last_block, rpc_url=rpc_url))
+        sequential = time.perf_counter() - t0
+        print(f"sequential   : {sequential:7.2f}s  {count / sequential:9.0f} fills/s")
+
+        for workers in args.workers:
+            t0 = time.perf_counter()
+            n = sum(1 for _ in parallel_backfill(1, last_block, spool_dir, rpc_url=rpc_url,
+                                                 workers=workers, shard_size=args.shard_size))
+            elapsed = time.perf_counter() - t0
+            assert n == count, f"{n} != {count}"
+            print(f"{workers:3d} workers  : {elapsed:7.2f}s  {n / elapsed:9.0f} fills/s  "
+                  f"({sequential / elapsed:.2f}x)")
+    finally:
+        parent.send(None)
+        server.join()
+        shutil.rmtree(spool_dir, ignore_errors=True)
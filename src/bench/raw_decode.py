@@ -0,0 +1,61 @@
+import time
+import argparse
+from hexbytes import HexBytes
+from web3 import Web3
+from src.trade_decoder import ORDER_FILLED_ABI
+from src.raw_decoder import decode_order_filled, _checksum
+from src.stub.synth import generate_logs
+
+# Compares contract.events.OrderFilled().process_log against the raw decoder
+# on a synthetic batch, and checks that both produce identical args.
+
+def _as_receipt_log(log: dict) -> dict:
+    # Shape logs the way web3 returns them from a receipt (HexBytes / ints)
+    return {
+        "address": Web3.to_checksum_address(log["address"]),
+        "topics": [HexBytes(t) for t in log["topics"]],
+        "data": HexBytes(log["data"]),
+        "blockNumber": int(log["blockNumber"], 16),
+        "blockHash": HexBytes(log["blockHash"]),
+        "transactionHash": HexBytes(log["transactionHash"]),
+        "transactionIndex": int(log["transactionIndex"], 16),
+        "logIndex": int(log["logIndex"], 16),
+        "removed": False,
+    }
+
+def process_log_path(logs: list, event) -> list:
+    results = []
+    for log in logs:
+        try:
+            results.append(dict(event.process_log(log)['args']))
+        except Exception:
+            results.append(None)
+    return results
+
+def raw_path(logs: list) -> list:
+    return [decode_order_filled(log) for log in logs]
+
+def timed(fn, *args):
+    _checksum.cache_clear()
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark raw OrderFilled decoding vs web3 process_log")
+    parser.add_argument("--count", type=int, default=100000, help="Number of synthetic logs")
+    parser.add_argument("--noise-ratio", type=float, default=0.5, help="Fraction of non-OrderFilled logs")
+
+    args = parser.parse_args()
+
+    logs = [_as_receipt_log(l) for l in generate_logs(args.count, noise_ratio=args.noise_ratio)]
+    event = Web3().eth.contract(abi=[ORDER_FILLED_ABI]).events.OrderFilled()
+
+    expected, t_web3 = timed(process_log_path, logs, event)
+    single, t_raw = timed(raw_path, logs)
+
+    assert single == expected, "raw decoder output differs from process_log"
+
+    print(f"{args.count} logs ({sum(r is not None for r in expected)} OrderFilled)")
+    print(f"  process_log : {t_web3:8.3f}s  {args.count / t_web3:12,.0f} logs/s")
+    print(f"  raw         : {t_raw:8.3f}s  {args.count / t_raw:12,.0f} logs/s  ({t_web3 / t_raw:.1f}x)")
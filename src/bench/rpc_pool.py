@@ -0,0 +1,69 @@
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from src.stub.synth import generate_logs
+from src.stub.rpc import StubRPCServer
+from src.indexer.rpc import RPCClient
+from src.indexer.pool import EndpointPool, split_urls
+from src.trade_decoder import trades_from_receipt
+
+# Receipt fetch + decode against three misbehaving stand-in providers, each
+# on its own and pooled (with and without hedging):
+#   limited  - steady latency, hard rate limit (429 above it)
+#   flaky    - fast, but a share of requests gets 429
+#   stalling - fastest, but a share of requests hangs past the client timeout
+
+def _run(client: RPCClient, tx_hashes: list, threads: int) -> dict:
+    def fetch(tx_hash):
+        t0 = time.perf_counter()
+        try:
+            receipt = client.get_receipt(tx_hash)
+            ok = receipt is not None and trades_from_receipt(tx_hash, receipt) is not None
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        results = list(executor.map(fetch, tx_hashes))
+    elapsed = time.perf_counter() - t0
+    latencies = sorted(seconds for _, seconds in results)
+    return {
+        "ok": sum(ok for ok, _ in results),
+        "elapsed": elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the multi-endpoint RPC pool under injected faults")
+    parser.add_argument("--tx-count", type=int, default=300, help="Receipts to fetch")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--rate-limit", type=float, default=40.0, help="Requests/s the limited provider accepts")
+    parser.add_argument("--throttle-rate", type=float, default=0.2, help="Share of 429s from the flaky provider")
+    parser.add_argument("--stall-rate", type=float, default=0.05, help="Share of stalled requests on the stalling provider")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Client HTTP timeout (s)")
+
+    args = parser.parse_args()
+
+    logs = generate_logs(args.tx_count * 5)
+    tx_hashes = sorted({log["transactionHash"] for log in logs})[:args.tx_count]
+
+    with StubRPCServer(logs=logs, latency=0.02, rate_limit=args.rate_limit) as limited, \
+         StubRPCServer(logs=logs, latency=0.01, throttle_rate=args.throttle_rate, seed=1) as flaky, \
+         StubRPCServer(logs=logs, latency=0.005, slow_rate=args.stall_rate,
+                       slow_latency=args.timeout * 3, seed=2) as stalling:
+        providers = {"limited": limited, "flaky": flaky, "stalling": stalling}
+        pooled = ",".join([f"{limited.url}#rps={args.rate_limit * 0.9:g}", flaky.url, stalling.url])
+        scenarios = [(name, server.url, None) for name, server in providers.items()]
+        scenarios += [("pool", pooled, None), ("pool+hedge", pooled, "auto")]
+
+        print(f"{args.tx_count} receipts, {args.threads} threads, timeout {args.timeout}s")
+        for name, url, hedge in scenarios:
+            before = {key: server.request_count for key, server in providers.items()}
+            pool = EndpointPool(split_urls(url), hedge=hedge)
+            client = RPCClient(url, timeout=args.timeout, backoff=0.1, cache=None, pool=pool)
+            result = _run(client, tx_hashes, args.threads)
+            share = "  ".join(f"{key}={server.request_count - before[key]}" for key, server in providers.items())
+            print(f"{name:>11}: {result['ok']:4d}/{len(tx_hashes)} ok  {result['elapsed']:6.2f}s  "
+                  f"p50 {result['p50'] * 1000:7.1f}ms  p99 {result['p99'] * 1000:7.1f}ms  requests: {share}")
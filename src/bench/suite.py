@@ -0,0 +1,271 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import resource
+import tracemalloc
+import multiprocessing
+from contextlib import redirect_stdout
+from typing import Dict, Any, List
+
+# Benchmark suite for the decode paths, with a stored-baseline check.
+#
+# Synthetic matchOrders receipts (trading tokens of synthetic Gamma markets)
+# are served by the stand-in RPC and Gamma servers. Each case runs in a fresh
+# spawned process so its peak RSS is its own, and reports:
+#   throughput      units (logs / markets) per second
+#   p50 / p99       per-call latency
+#   peak RSS        max resident set size of the case process
+#   alloc / unit    bytes allocated per unit (tracemalloc peak over a sample)
+#   blocks / unit   memory blocks still alive per unit after the sample
+# Results are compared against a stored baseline (src/bench/baseline.json
+# unless --baseline says otherwise) and any metric worse than --tolerance
+# (twice that for p99, which is inherently noisier) makes the run fail
+# (exit status 1). Absolute numbers depend on the machine: re-record the
+# baseline with --save-baseline before comparing on different hardware.
+
+CASES = ("decode_trades", "derive_binary_positions", "decode_market", "demo")
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# metric -> True if higher is better
+METRICS = {
+    "throughput": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+    "alloc_bytes_per_unit": False,
+    "blocks_per_unit": False,
+}
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss survives fork + exec on Linux (it would report the parent's
+    # peak); VmHWM belongs to this process's own address space.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _measure(fn, items: list, units: List[int], alloc_sample: int, repeat: int = 3,
+             warmup: int = 5) -> Dict[str, Any]:
+    for item in items[:warmup]:
+        fn(item)
+
+    # Timings come from the fastest of `repeat` passes to damp scheduler noise
+    elapsed, latencies = None, None
+    for _ in range(repeat):
+        pass_latencies = []
+        t0 = time.perf_counter()
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            pass_latencies.append(time.perf_counter() - start)
+        pass_elapsed = time.perf_counter() - t0
+        if elapsed is None or pass_elapsed < elapsed:
+            elapsed, latencies = pass_elapsed, sorted(pass_latencies)
+
+    sample = items[:alloc_sample]
+    sample_units = sum(units[:alloc_sample]) or 1
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    kept = [fn(item) for item in sample]
+    blocks_after = sys.getallocatedblocks()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+
+    return {
+        "unit": None,
+        "count": len(items),
+        "throughput": sum(units) / elapsed,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "peak_rss_mb": _peak_rss_mb(),
+        "alloc_bytes_per_unit": peak / sample_units,
+        "blocks_per_unit": (blocks_after - blocks_before) / sample_units,
+    }
+
+# --- cases (run in the spawned child; imports happen there) ---
+
+def _case_decode_trades(params: dict) -> Dict[str, Any]:
+    from src.trade_decoder import decode_trades
+    rpc_url = params["rpc_url"]
+    result = _measure(lambda h: decode_trades(h, rpc_url), params["tx_hashes"],
+                      [params["logs_per_tx"]] * len(params["tx_hashes"]), params["alloc_sample"], params["repeat"])
+    result["unit"] = "logs"
+    return result
+
+def _case_derive_binary_positions(params: dict) -> Dict[str, Any]:
+    from src.ctf.derive import derive_binary_positions
+    from src.stub.synth import UMA_ADAPTER
+    rng = random.Random(1)
+    question_ids = ["0x" + format(rng.getrandbits(256), "064x") for _ in range(params["derive_count"])]
+    result = _measure(lambda q: derive_binary_positions(UMA_ADAPTER, q), question_ids,
+                      [1] * len(question_ids), params["alloc_sample"], params["repeat"])
+    result["unit"] = "markets"
+    return result
+
+def _case_decode_market(params: dict) -> Dict[str, Any]:
+    from src.market_decoder import decode_market
+    result = _measure(lambda slug: decode_market(slug=slug), params["slugs"],
+                      [1] * len(params["slugs"]), params["alloc_sample"], params["repeat"])
+    result["unit"] = "markets"
+    return result
+
+def _case_demo(params: dict) -> Dict[str, Any]:
+    from src import demo
+
+    def run(item):
+        tx_hash, slug = item
+        sys.argv = ["src.demo", "--tx-hash", tx_hash, "--event-slug", slug]
+        with redirect_stdout(io.StringIO()):
+            demo.main()
+
+    items = list(zip(params["tx_hashes"], params["tx_slugs"]))
+    result = _measure(run, items, [params["logs_per_tx"]] * len(items), params["alloc_sample"], params["repeat"])
+    result["unit"] = "logs"
+    return result
+
+def _run_case(name: str, params: dict, conn):
+    try:
+        conn.send(globals()[f"_case_{name}"](params))
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+
+def run_case(name: str, params: dict) -> Dict[str, Any]:
+    """Run one case in a fresh spawned process and return its metrics."""
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe()
+    process = ctx.Process(target=_run_case, args=(name, params, child))
+    process.start()
+    result = parent.recv()
+    process.join()
+    if "error" in result:
+        raise RuntimeError(f"{name}: {result['error']}")
+    return result
+
+# --- baseline ---
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float) -> List[str]:
+    """Regression messages for every metric worse than `tolerance` (fraction) vs the baseline."""
+    regressions = []
+    for case, metrics in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = base.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse > (2 * tolerance if metric == "p99_ms" else tolerance):
+                regressions.append(f"{case}.{metric}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+    return regressions
+
+def _format_row(case: str, m: Dict[str, Any]) -> str:
+    return (f"{case:24s} {m['throughput']:12,.0f} {m['unit'] + '/s':10s} "
+            f"p50 {m['p50_ms']:8.3f}ms  p99 {m['p99_ms']:8.3f}ms  "
+            f"rss {m['peak_rss_mb']:7.1f}MB  alloc {m['alloc_bytes_per_unit']:8.0f}B/{m['unit'][:-1]}  "
+            f"blocks {m['blocks_per_unit']:6.1f}/{m['unit'][:-1]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite with stand-in RPC / Gamma servers")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES)
+    parser.add_argument("--tx-count", type=int, default=500, help="Synthetic matchOrders transactions")
+    parser.add_argument("--fills-per-tx", type=int, default=3, help="Maker fills per transaction")
+    parser.add_argument("--market-count", type=int, default=200, help="Synthetic Gamma events (one market each)")
+    parser.add_argument("--derive-count", type=int, default=20000, help="Markets to derive position IDs for")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per case (fastest is kept)")
+    parser.add_argument("--alloc-sample", type=int, default=100, help="Calls traced for allocation metrics")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="Injected RPC latency (s)")
+    parser.add_argument("--gamma-latency", type=float, default=0.0, help="Injected Gamma latency (s)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument("--no-baseline", action="store_true", help="Skip the baseline comparison")
+    parser.add_argument("--save-baseline", nargs="?", const=BASELINE_PATH,
+                        help="Write this run's results as the baseline (default: the stored one)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before failing (fraction)")
+    parser.add_argument("--output", help="Write results JSON here")
+
+    args = parser.parse_args()
+
+    from src.stub.synth import generate_events, generate_match_logs, market_tokens
+    from src.stub.rpc import StubRPCServer
+    from src.stub.gamma import StubGammaServer
+
+    events = generate_events(args.market_count)
+    logs = generate_match_logs(events, args.tx_count, fills_per_tx=args.fills_per_tx)
+    tx_hashes = list(dict.fromkeys(log["transactionHash"] for log in logs))
+
+    # Event slug of the market each transaction traded, for the demo's token check
+    slug_by_token = {t: e["slug"] for e in events for m in e["markets"] for t in market_tokens(m)}
+    tx_slugs = []
+    for i, tx_hash in enumerate(tx_hashes):
+        summary = logs[i * (args.fills_per_tx + 2) + args.fills_per_tx]
+        tx_slugs.append(slug_by_token[int(summary["data"][2 + 64:2 + 128], 16)])
+
+    with StubRPCServer(logs=logs, latency=args.rpc_latency) as rpc, \
+         StubGammaServer(events=events, latency=args.gamma_latency) as gamma:
+        # Spawned case processes read these at import time
+        os.environ["RPC_URL"] = rpc.url
+        os.environ["GAMMA_API_URL"] = gamma.url
+        os.environ["CACHE_MODE"] = "off"
+
+        params = {
+            "rpc_url": rpc.url,
+            "tx_hashes": tx_hashes,
+            "tx_slugs": tx_slugs,
+            "logs_per_tx": args.fills_per_tx + 2,
+            "slugs": [e["slug"] for e in events],
+            "derive_count": args.derive_count,
+            "alloc_sample": args.alloc_sample,
+            "repeat": args.repeat,
+        }
+
+        print(f"{len(tx_hashes)} txs / {len(logs)} logs, {len(events)} markets, "
+              f"Python {platform.python_version()} on {platform.machine()}")
+        results = {}
+        for case in args.cases:
+            results[case] = run_case(case, params)
+            print(_format_row(case, results[case]))
+
+    document = {
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items()
+                   if k not in ("baseline", "no_baseline", "save_baseline", "output")},
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(document, f, indent=2)
+
+    if args.save_baseline:
+        print(f"Saved baseline to {args.save_baseline}")
+    elif not args.no_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != document["params"]:
+            print("Warning: baseline was recorded with different parameters")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions:
+            print(f"REGRESSION (> {args.tolerance:.0%} worse than {args.baseline}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
@@ -0,0 +1,105 @@
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+from decimal import Decimal
+from src.raw_decoder import decode_order_filled
+from src.indexer.rpc import format_log
+from src.stub.synth import generate_logs
+from src.trade import Trade, TradeBatch
+
+# Memory / throughput of the trade representations: the original
+# 13-key dict (reproduced verbatim below), __slots__ Trade objects and
+# a struct-of-arrays TradeBatch. Also checks the JSON stays byte-identical.
+
+def legacy_trade(tx_hash: str, log, args) -> dict:
+    # build_trade as it was before Trade existed
+    exchange_address = log['address']
+    if args['taker'].lower() == exchange_address.lower():
+        return None
+    maker_asset_id = args['makerAssetId']
+    taker_asset_id = args['takerAssetId']
+    maker_amount = args['makerAmountFilled']
+    taker_amount = args['takerAmountFilled']
+    if maker_asset_id == 0:
+        try:
+            price = Decimal(maker_amount) / Decimal(taker_amount)
+        except:
+            price = Decimal(0)
+        token_id = hex(taker_asset_id)
+        side = "BUY"
+    else:
+        try:
+            price = Decimal(taker_amount) / Decimal(maker_amount)
+        except:
+            price = Decimal(0)
+        token_id = hex(maker_asset_id)
+        side = "SELL"
+    trade = {
+        "tx_hash": tx_hash,
+        "log_index": log['logIndex'],
+        "exchange": exchange_address,
+        "maker": args['maker'],
+        "taker": args['taker'],
+        "maker_asset_id": str(maker_asset_id),
+        "taker_asset_id": str(taker_asset_id),
+        "maker_amount": str(maker_amount),
+        "taker_amount": str(taker_amount),
+        "price": f"{price:.6f}".rstrip('0').rstrip('.') if '.' in f"{price:.6f}" else f"{price:.6f}",
+        "token_id": token_id,
+        "side": side
+    }
+    trade["price"] = str(price)
+    return trade
+
+def build_dicts(events):
+    return [t for t in (legacy_trade(log['transactionHash'], log, args) for log, args in events) if t]
+
+def build_objects(events):
+    return [t for t in (Trade.from_event(log['transactionHash'], log, args) for log, args in events) if t]
+
+def build_batch(events):
+    batch = TradeBatch()
+    for log, args in events:
+        trade = Trade.from_event(log['transactionHash'], log, args)
+        if trade is not None:
+            batch.append(trade)
+    return batch
+
+def measure(fn, events):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn(events)
+    elapsed = time.perf_counter() - t0
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, size
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare trade dicts, Trade objects and TradeBatch")
+    parser.add_argument("--count", type=int, default=200000, help="Number of synthetic fills")
+
+    args = parser.parse_args()
+
+    logs = [format_log(log) for log in generate_logs(args.count, summary_ratio=0.0)]
+    events = [(log, decode_order_filled(log)) for log in logs]
+
+    dicts, t_dict, m_dict = measure(build_dicts, events)
+    objects, t_obj, m_obj = measure(build_objects, events)
+    batch, t_batch, m_batch = measure(build_batch, events)
+
+    t0 = time.perf_counter()
+    encoded = json.dumps([t.to_dict() for t in objects], indent=2)
+    t_serialize = time.perf_counter() - t0
+
+    assert encoded == json.dumps(dicts, indent=2), "Trade JSON differs from the dict path"
+    assert json.dumps(batch.to_dicts(), indent=2) == encoded, "TradeBatch JSON differs from the dict path"
+
+    n = len(dicts)
+    print(f"{n} fills")
+    print(f"  dict       : {t_dict:7.3f}s  {m_dict / n:7.0f} B/fill")
+    print(f"  Trade      : {t_obj:7.3f}s  {m_obj / n:7.0f} B/fill  ({m_dict / m_obj:.1f}x smaller)")
+    print(f"  TradeBatch : {t_batch:7.3f}s  {m_batch / n:7.0f} B/fill  ({m_dict / m_batch:.1f}x smaller)")
+    print(f"  to_dict + json.dumps (serialization time): {t_serialize:.3f}s")
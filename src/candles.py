@@ -0,0 +1,300 @@
+import os
+import json
+import bisect
+import argparse
+from decimal import Decimal
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+from dotenv import load_dotenv
+from src.trade import Trade
+from src.store.records import token_bytes
+from src.indexer.rpc import RPCClient, get_client
+
+load_dotenv()
+
+# Incremental OHLCV / VWAP candles per outcome token.
+#
+# Prices are never materialised per fill: a price is kept as the pair
+# (usdc, size) of base-unit integers, compared by cross-multiplication, and
+# only turned into a Decimal string when a candle is serialized. Volume
+# (outcome tokens) and notional (USDC) are integer sums, so VWAP is the exact
+# ratio notional / volume.
+#
+# Every field merges associatively and commutatively (open / close pick the
+# fill with the lowest / highest (block, log index), high / low the extreme
+# price, the rest add up). Shards can therefore be aggregated independently
+# and combined with `merge`, and a late fill is just another `add`.
+# Feeding the same fill twice counts it twice; deduplicate upstream (the
+# trade store's (tx_hash, log_index) key) when replaying.
+
+INTERVALS = {"1m": 60, "5m": 300, "1h": 3600, "1d": 86400}
+
+def _price_str(usdc: int, size: int) -> str:
+    # Same formatting as the decoder's trade["price"]
+    if size == 0:
+        return str(Decimal(0))
+    return str(Decimal(usdc) / Decimal(size))
+
+def fill_parts(fill) -> Tuple[int, int, int, bool, Tuple[int, int]]:
+    """
+    (token, usdc, size, is_buy, (block_number, log_index)) of a Trade or
+    decoder trade dict, all as integers.
+    """
+    if isinstance(fill, Trade):
+        maker_asset_id, taker_asset_id = fill.maker_asset_id, fill.taker_asset_id
+        maker_amount, taker_amount = fill.maker_amount, fill.taker_amount
+        key = (fill.block_number, fill.log_index)
+    else:
+        maker_asset_id, taker_asset_id = int(fill["maker_asset_id"]), int(fill["taker_asset_id"])
+        maker_amount, taker_amount = int(fill["maker_amount"]), int(fill["taker_amount"])
+        key = (fill["block_number"], int(fill["log_index"]))
+    # makerAssetId = 0: maker pays USDC for tokens (BUY); otherwise maker sells tokens
+    if maker_asset_id == 0:
+        return taker_asset_id, maker_amount, taker_amount, True, key
+    return maker_asset_id, taker_amount, maker_amount, False, key
+
+class Candle:
+    """One OHLCV bucket. Prices are (usdc, size) integer pairs."""
+
+    __slots__ = ("start", "open", "open_key", "high", "low", "close", "close_key",
+                 "volume", "notional", "buy_volume", "count")
+
+    def __init__(self, start: int, usdc: int, size: int, is_buy: bool, key: Tuple[int, int]):
+        self.start = start
+        self.open = self.high = self.low = self.close = (usdc, size)
+        self.open_key = self.close_key = key
+        self.volume = size
+        self.notional = usdc
+        self.buy_volume = size if is_buy else 0
+        self.count = 1
+
+    def add(self, usdc: int, size: int, is_buy: bool, key: Tuple[int, int]):
+        price = (usdc, size)
+        if key < self.open_key:
+            self.open, self.open_key = price, key
+        if key > self.close_key:
+            self.close, self.close_key = price, key
+        # a/b > c/d  <=>  a*d > c*b  (sizes are positive)
+        if usdc * self.high[1] > self.high[0] * size:
+            self.high = price
+        if usdc * self.low[1] < self.low[0] * size:
+            self.low = price
+        self.volume += size
+        self.notional += usdc
+        if is_buy:
+            self.buy_volume += size
+        self.count += 1
+
+    def merge(self, other: "Candle"):
+        """Fold `other` (same bucket) into this candle."""
+        if other.open_key < self.open_key:
+            self.open, self.open_key = other.open, other.open_key
+        if other.close_key > self.close_key:
+            self.close, self.close_key = other.close, other.close_key
+        if other.high[0] * self.high[1] > self.high[0] * other.high[1]:
+            self.high = other.high
+        if other.low[0] * self.low[1] < self.low[0] * other.low[1]:
+            self.low = other.low
+        self.volume += other.volume
+        self.notional += other.notional
+        self.buy_volume += other.buy_volume
+        self.count += other.count
+
+    def copy(self) -> "Candle":
+        candle = Candle.__new__(Candle)
+        for field in self.__slots__:
+            setattr(candle, field, getattr(self, field))
+        return candle
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start": self.start,
+            "open": _price_str(*self.open),
+            "high": _price_str(*self.high),
+            "low": _price_str(*self.low),
+            "close": _price_str(*self.close),
+            "vwap": _price_str(self.notional, self.volume),
+            "volume": str(self.volume),
+            "notional": str(self.notional),
+            "buy_volume": str(self.buy_volume),
+            "count": self.count,
+        }
+
+    def to_state(self) -> list:
+        return [self.start, list(self.open), list(self.open_key), list(self.high), list(self.low),
+                list(self.close), list(self.close_key), self.volume, self.notional, self.buy_volume, self.count]
+
+    @classmethod
+    def from_state(cls, state: list) -> "Candle":
+        candle = cls.__new__(cls)
+        (candle.start, open_, open_key, high, low, close, close_key,
+         candle.volume, candle.notional, candle.buy_volume, candle.count) = state
+        candle.open, candle.open_key = tuple(open_), tuple(open_key)
+        candle.high, candle.low = tuple(high), tuple(low)
+        candle.close, candle.close_key = tuple(close), tuple(close_key)
+        return candle
+
+class CandleEngine:
+    """
+    Per-token candles at several intervals, updated one fill at a time.
+
+    Args:
+        intervals (dict): Interval name -> seconds (defaults to 1m/5m/1h/1d).
+    """
+
+    def __init__(self, intervals: Dict[str, int] = None):
+        self.intervals = dict(intervals or INTERVALS)
+        # interval -> token -> bucket start -> Candle, plus the sorted bucket
+        # starts per (interval, token) for range queries
+        self.candles: Dict[str, Dict[int, Dict[int, Candle]]] = {name: {} for name in self.intervals}
+        self.starts: Dict[str, Dict[int, List[int]]] = {name: {} for name in self.intervals}
+
+    def _bucket(self, name: str, token: int, start: int) -> Optional[Candle]:
+        return self.candles[name].get(token, {}).get(start)
+
+    def _insert(self, name: str, token: int, candle: Candle):
+        self.candles[name].setdefault(token, {})[candle.start] = candle
+        starts = self.starts[name].setdefault(token, [])
+        # Fills arrive mostly in order, so this is nearly always an append
+        if not starts or candle.start > starts[-1]:
+            starts.append(candle.start)
+        else:
+            bisect.insort(starts, candle.start)
+
+    def add(self, fill, timestamp: int):
+        """Apply one fill (Trade or trade dict) executed at `timestamp` (unix seconds)."""
+        token, usdc, size, is_buy, key = fill_parts(fill)
+        if size == 0:
+            return
+        for name, seconds in self.intervals.items():
+            start = timestamp - timestamp % seconds
+            candle = self._bucket(name, token, start)
+            if candle is None:
+                self._insert(name, token, Candle(start, usdc, size, is_buy, key))
+            else:
+                candle.add(usdc, size, is_buy, key)
+
+    def add_many(self, fills: Iterable, timestamps: Dict[int, int]):
+        """Apply fills using a block number -> timestamp map."""
+        for fill in fills:
+            block_number = fill.block_number if isinstance(fill, Trade) else fill["block_number"]
+            self.add(fill, timestamps[block_number])
+
+    def merge(self, other: "CandleEngine"):
+        """Fold another engine's state (e.g. a shard's) into this one."""
+        for name in self.intervals:
+            for token, buckets in other.candles.get(name, {}).items():
+                for start, candle in buckets.items():
+                    mine = self._bucket(name, token, start)
+                    if mine is None:
+                        self._insert(name, token, candle.copy())
+                    else:
+                        mine.merge(candle)
+
+    def tokens(self) -> List[int]:
+        name = next(iter(self.intervals))
+        return list(self.candles[name])
+
+    def query(self, token, interval: str, start: int = None, end: int = None) -> List[Candle]:
+        """
+        Candles of `token` (int, 0x-hex or decimal string) whose bucket starts
+        in [start, end), oldest first.
+        """
+        token = int.from_bytes(token_bytes(token), "big")
+        starts = self.starts[interval].get(token)
+        if not starts:
+            return []
+        lo = 0 if start is None else bisect.bisect_left(starts, start)
+        hi = len(starts) if end is None else bisect.bisect_left(starts, end)
+        buckets = self.candles[interval][token]
+        return [buckets[s] for s in starts[lo:hi]]
+
+    def latest(self, token, interval: str) -> Optional[Candle]:
+        token = int.from_bytes(token_bytes(token), "big")
+        starts = self.starts[interval].get(token)
+        if not starts:
+            return None
+        return self.candles[interval][token][starts[-1]]
+
+    def save(self, path: str):
+        state = {
+            "intervals": self.intervals,
+            "candles": {
+                name: {str(token): [buckets[s].to_state() for s in self.starts[name][token]]
+                       for token, buckets in tokens.items()}
+                for name, tokens in self.candles.items()
+            },
+        }
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CandleEngine":
+        with open(path) as f:
+            state = json.load(f)
+        engine = cls(state["intervals"])
+        for name, tokens in state["candles"].items():
+            for token, candles in tokens.items():
+                token = int(token)
+                engine.candles[name][token] = {c[0]: Candle.from_state(c) for c in candles}
+                engine.starts[name][token] = [c[0] for c in candles]
+        return engine
+
+def block_timestamps(client: RPCClient, block_numbers: Iterable[int],
+                     known: Dict[int, int] = None) -> Dict[int, int]:
+    """
+    Block number -> timestamp, fetched with batched eth_getBlockByNumber.
+    `known` (if given) is consulted first and updated in place.
+    """
+    known = {} if known is None else known
+    missing = sorted({b for b in block_numbers if b not in known})
+    if missing:
+        blocks = client.batch_call([("eth_getBlockByNumber", [hex(b), False]) for b in missing], raise_errors=True)
+        for number, block in zip(missing, blocks):
+            if block is None:
+                raise ValueError(f"Block {number} not found")
+            known[number] = int(block["timestamp"], 16)
+    return known
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build OHLCV / VWAP candles from decoded trades")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--input", help="Trades as JSON Lines (backfill --output), with block_number")
+    source.add_argument("--state", help="Load a saved candle state instead of building one")
+    parser.add_argument("--rpc-url", help="RPC endpoint for block timestamps (defaults to RPC_URL)")
+    parser.add_argument("--save", help="Save the candle state (JSON) for later queries / merging")
+    parser.add_argument("--merge", nargs="*", default=[], help="Saved states (e.g. of other shards) to merge in")
+    parser.add_argument("--token", help="Print candles of this token ID")
+    parser.add_argument("--interval", default="1h", choices=sorted(INTERVALS), help="Candle interval")
+
+    args = parser.parse_args()
+
+    try:
+        if args.state:
+            engine = CandleEngine.load(args.state)
+        else:
+            rpc_url = args.rpc_url or os.getenv("RPC_URL")
+            if not rpc_url:
+                raise ValueError("RPC_URL not set")
+            with open(args.input) as f:
+                trades = [json.loads(line) for line in f if line.strip()]
+            timestamps = block_timestamps(get_client(rpc_url), (t["block_number"] for t in trades))
+            engine = CandleEngine()
+            engine.add_many(trades, timestamps)
+
+        for path in args.merge:
+            engine.merge(CandleEngine.load(path))
+
+        if args.save:
+            engine.save(args.save)
+
+        if args.token:
+            print(json.dumps([c.to_dict() for c in engine.query(args.token, args.interval)], indent=2))
+        else:
+            print(f"{len(engine.tokens())} tokens")
+
+    except Exception as e:
+        print(f"Error: {e}")
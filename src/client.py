@@ -0,0 +1,142 @@
+import os
+import json
+import socket
+import argparse
+import http.client
+from urllib.parse import urlsplit
+from typing import Optional, Dict, Any, List
+
+# Thin client for the resident decode service (src.service).
+#
+# Standard library only, so a call costs the interpreter start plus one local
+# round trip instead of importing web3 / requests and re-fetching Gamma data.
+# The service address is "http://host:port" or "unix:/path/to.sock"; it
+# defaults to DECODE_SERVICE. dotenv is deliberately not loaded here (that
+# would import python-dotenv on every call); export DECODE_SERVICE instead.
+
+DEFAULT_ADDRESS = "http://127.0.0.1:8600"
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+class ServiceClient:
+    """
+    Args:
+        address (str): "http://host:port" or "unix:/path" (defaults to DECODE_SERVICE).
+        timeout (float): Socket timeout in seconds.
+    """
+
+    def __init__(self, address: str = None, timeout: float = 60.0):
+        self.address = address or os.getenv("DECODE_SERVICE") or DEFAULT_ADDRESS
+        self.timeout = timeout
+        self.conn = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self.address.startswith("unix:"):
+            return _UnixHTTPConnection(self.address[len("unix:"):], self.timeout)
+        url = urlsplit(self.address)
+        return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=self.timeout)
+
+    def request(self, path: str, params: Dict[str, Any] = None) -> Any:
+        """
+        Call an endpoint; returns its result. Service-side errors raise
+        ValueError, an unreachable service raises ConnectionError.
+        """
+        body = json.dumps(params or {}).encode()
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = self._connect()
+            try:
+                self.conn.request("POST", path, body, {"Content-Type": "application/json"})
+                response = self.conn.getresponse()
+                data = json.loads(response.read())
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # Kept-alive connection closed by the server; reconnect once
+                self.close()
+                if attempt:
+                    raise
+            except (FileNotFoundError, ConnectionRefusedError) as e:
+                self.close()
+                raise ConnectionError(f"Decode service not reachable at {self.address}: {e}")
+        if "error" in data:
+            raise ValueError(data["error"])
+        return data["result"]
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def decode_tx(self, tx_hash: str, include_block: bool = False) -> list:
+        return self.request("/decode-tx", {"tx_hash": tx_hash, "include_block": include_block})
+
+    def decode_txs(self, tx_hashes: List[str], include_block: bool = False) -> list:
+        """One {"tx_hash", "trades"} or {"tx_hash", "error"} per hash, in order."""
+        return self.request("/decode-tx", {"tx_hashes": tx_hashes, "include_block": include_block})
+
+    def decode_market(self, slug: str = None, condition_id: str = None) -> dict:
+        return self.request("/decode-market", {"slug": slug, "condition_id": condition_id})
+
+    def derive_positions(self, oracle: str = None, question_id: str = None, condition_id: str = None,
+                         collateral_token: str = None) -> dict:
+        return self.request("/derive-positions", {"oracle": oracle, "question_id": question_id,
+                                                  "condition_id": condition_id,
+                                                  "collateral_token": collateral_token})
+
+    def derive_positions_many(self, condition_ids: List[str], collateral_token: str = None) -> list:
+        return self.request("/derive-positions", {"condition_ids": condition_ids,
+                                                  "collateral_token": collateral_token})
+
+    def token(self, token_id: str) -> Optional[dict]:
+        return self.request("/token", {"token_id": token_id})
+
+    def health(self) -> dict:
+        return self.request("/health")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the resident decode service")
+    parser.add_argument("--service", help="Service address (defaults to DECODE_SERVICE or http://127.0.0.1:8600)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    command = commands.add_parser("decode-tx", help="Decode the trades of one or more transactions")
+    command.add_argument("tx_hashes", nargs="+")
+    command = commands.add_parser("decode-market", help="Decode a market by slug or condition ID")
+    command.add_argument("--slug")
+    command.add_argument("--condition-id")
+    command = commands.add_parser("derive-positions", help="Derive YES / NO position IDs")
+    command.add_argument("--oracle")
+    command.add_argument("--question-id")
+    command.add_argument("--condition-id")
+    command.add_argument("--collateral-token")
+    command = commands.add_parser("token", help="Look up a token ID in the service's token index")
+    command.add_argument("token_id")
+    commands.add_parser("health", help="Service status")
+
+    args = parser.parse_args()
+
+    try:
+        client = ServiceClient(args.service)
+        if args.command == "decode-tx":
+            if len(args.tx_hashes) == 1:
+                result = client.decode_tx(args.tx_hashes[0])
+            else:
+                result = client.decode_txs(args.tx_hashes)
+        elif args.command == "decode-market":
+            result = client.decode_market(args.slug, args.condition_id)
+        elif args.command == "derive-positions":
+            result = client.derive_positions(args.oracle, args.question_id, args.condition_id,
+                                             args.collateral_token)
+        elif args.command == "token":
+            result = client.token(args.token_id)
+        else:
+            result = client.health()
+        print(json.dumps(result, indent=2))
+    except Exception as e:
+        print(f"Error: {e}")
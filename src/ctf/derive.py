@@ -1,4 +1,20 @@
-from web3 import Web3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from eth_hash.auto import keccak
+from hexbytes import HexBytes
+
+_web3 = None
+
+def _solidity_keccak(abi_types: list, values: list):
+    # web3 takes ~0.3s to import; load it only when this reference path runs
+    global _web3
+    if _web3 is None:
+        from web3 import Web3
+        _web3 = Web3
+    return _web3.solidity_keccak(abi_types, values)
+
+USDC_E = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
 
 def _ensure_0x_prefix(value: str) -> str:
     """Ensure the hex string has 0x prefix."""
@@ -18,7 +34,7 @@ def compute_condition_id(oracle: str, question_id: str, outcome_slot_count: int)
     Returns:
         str: The computed condition ID as a hex string.
     """
-    return Web3.solidity_keccak(
+    return _solidity_keccak(
         ['address', 'bytes32', 'uint256'],
         [oracle, _ensure_0x_prefix(question_id), outcome_slot_count]
     ).hex()
@@ -36,7 +52,7 @@ def compute_collection_id(parent_collection_id: str, condition_id: str, index_se
     Returns:
         str: The computed collection ID as a hex string.
     """
-    return Web3.solidity_keccak(
+    return _solidity_keccak(
         ['bytes32', 'bytes32', 'uint256'],
         [_ensure_0x_prefix(parent_collection_id), _ensure_0x_prefix(condition_id), index_set]
     ).hex()
@@ -52,7 +68,7 @@ def compute_position_id(collateral_token: str, collection_id: str) -> str:
     Returns:
         str: The computed position ID as a hex string.
     """
-    return Web3.solidity_keccak(
+    return _solidity_keccak(
         ['address', 'bytes32'],
         [collateral_token, _ensure_0x_prefix(collection_id)]
     ).hex()
@@ -71,38 +87,142 @@ def derive_binary_positions(oracle: str, question_id: str, condition_id: str = N
     Returns:
         dict: containing 'conditionId', 'yesTokenId', 'noTokenId'
     """
-    # Polymarket USDC.e address on Polygon
-    if collateral_token is None:
-        collateral_token = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
+    # Same hashes as the compute_* reference functions above, via the packed
+    # keccak path below (no web3 import, cached per condition).
+    if condition_id is None:
+        condition_id = compute_condition_ids_many(oracle, [question_id], 2)[0]
 
+    # Binary market: outcome slot 0 -> indexSet 1 (0b01) = YES,
+    # slot 1 -> indexSet 2 (0b10) = NO (see stage1.md)
+    return derive_binary_positions_many([condition_id], collateral_token)[0]
+
+def derive_binary_positions_reference(oracle: str, question_id: str, condition_id: str = None,
+                                      collateral_token: str = None) -> dict:
+    """`derive_binary_positions` through web3's solidity_keccak, for cross-checking."""
+    if collateral_token is None:
+        collateral_token = USDC_E
     if condition_id is None:
         condition_id = compute_condition_id(oracle, question_id, 2)
-    
-    # Parent collection is 0x0
     parent_collection_id = "0x" + "0" * 64
-
-    # Binary Market: Slot 1 (IndexSet 1) is YES, Slot 2 (IndexSet 2) is NO
-    # Wait, strictly speaking:
-    # Polymarket Binary: 
-    #  - Outcome 0 (Low index) => IndexSet 1 (0b01) => Usually "YES" (depends on market phrasing, but technically outcome 0)
-    #  - Outcome 1 (High index) => IndexSet 2 (0b10) => Usually "NO"
-    # Actually, Gnosis CTF docs usually treat index sets bitmask.
-    # Slot 0 -> 1 << 0 = 1
-    # Slot 1 -> 1 << 1 = 2
-    # In Polymarket context:
-    #  YES is usually index 0? Or NO?
-    #  Let's check stage1.md description:
-    #  "YES 头寸的 indexSet = 1 (0b01)... NO 头寸的 indexSet = 2 (0b10)"
-    #  Okay, we will follow that.
-    
-    collection_id_yes = compute_collection_id(parent_collection_id, condition_id, 1)
-    collection_id_no = compute_collection_id(parent_collection_id, condition_id, 2)
-    
-    yes_token_id = compute_position_id(collateral_token, collection_id_yes)
-    no_token_id = compute_position_id(collateral_token, collection_id_no)
-    
     return {
         "conditionId": condition_id,
-        "yesTokenId": yes_token_id,
-        "noTokenId": no_token_id
+        "yesTokenId": compute_position_id(collateral_token, compute_collection_id(parent_collection_id, condition_id, 1)),
+        "noTokenId": compute_position_id(collateral_token, compute_collection_id(parent_collection_id, condition_id, 2)),
     }
+
+# --- Bulk derivation ---
+#
+# The preimages are fixed width, so they can be packed straight into bytes
+# and hashed with keccak directly instead of going through solidity_keccak's
+# type-driven ABI packing:
+#   condition  = keccak(oracle[20] ++ questionId[32] ++ uint256(slots))
+#   collection = keccak(parent[32] ++ conditionId[32] ++ uint256(indexSet))
+#   position   = keccak(collateral[20] ++ collectionId[32])
+
+_ZERO32 = b"\x00" * 32
+_INDEX_SET_YES = (1).to_bytes(32, "big")
+_INDEX_SET_NO = (2).to_bytes(32, "big")
+# Match what solidity_keccak(...).hex() returns with the installed hexbytes
+# (with "0x" before hexbytes 1.0, without after).
+_HEX_PREFIX = "0x" if HexBytes(b"\x00").hex().startswith("0x") else ""
+
+# (collateral bytes, conditionId bytes) -> (yes position, no position), least
+# recently used first. Bounded: the resident service keeps it for its lifetime.
+POSITION_CACHE_SIZE = 100000
+_position_cache: OrderedDict = OrderedDict()
+_position_cache_lock = threading.Lock()
+
+def clear_position_cache():
+    with _position_cache_lock:
+        _position_cache.clear()
+
+def _hex_to_bytes(value: str, size: int) -> bytes:
+    value = value[2:] if value.startswith("0x") else value
+    raw = bytes.fromhex(value)
+    if len(raw) != size:
+        raise ValueError(f"expected {size} bytes, got {len(raw)}: {value}")
+    return raw
+
+def _derive_pair(collateral: bytes, condition: bytes) -> tuple:
+    yes = keccak(collateral + keccak(_ZERO32 + condition + _INDEX_SET_YES))
+    no = keccak(collateral + keccak(_ZERO32 + condition + _INDEX_SET_NO))
+    return yes, no
+
+def _derive_chunk(collateral: bytes, conditions: list) -> list:
+    # Runs in worker processes
+    return [_derive_pair(collateral, condition) for condition in conditions]
+
+def compute_condition_ids_many(oracle: str, question_ids: list, outcome_slot_count: int = 2) -> list:
+    """
+    Bulk `compute_condition_id` for one oracle.
+
+    Returns:
+        list: Condition IDs as hex strings, aligned with `question_ids`.
+    """
+    oracle_bytes = _hex_to_bytes(oracle, 20)
+    slots = outcome_slot_count.to_bytes(32, "big")
+    return [
+        _HEX_PREFIX + keccak(oracle_bytes + _hex_to_bytes(question_id, 32) + slots).hex()
+        for question_id in question_ids
+    ]
+
+def derive_binary_positions_many(conditions: list, collateral_token: str = None,
+                                 processes: int = None, chunk_size: int = 20000) -> list:
+    """
+    Bulk `derive_binary_positions` for known condition IDs.
+
+    Results are cached per (collateral, conditionId) in an LRU of
+    POSITION_CACHE_SIZE entries. Uncached conditions are
+    hashed in-process, or across a process pool when `processes` is set and
+    there is more than one chunk of them.
+
+    Args:
+        conditions (list): Condition IDs (bytes32 hex strings).
+        collateral_token (str, optional): Defaults to Polymarket USDC.e.
+        processes (int, optional): Worker processes for large batches.
+        chunk_size (int): Conditions per worker task.
+
+    Returns:
+        list: dicts with 'conditionId', 'yesTokenId', 'noTokenId', aligned with `conditions`.
+    """
+    if collateral_token is None:
+        collateral_token = USDC_E
+    collateral = _hex_to_bytes(collateral_token, 20)
+    condition_bytes = [_hex_to_bytes(condition_id, 32) for condition_id in conditions]
+
+    pairs = {}
+    with _position_cache_lock:
+        for condition in condition_bytes:
+            if condition in pairs:
+                continue
+            pair = _position_cache.get((collateral, condition))
+            if pair is not None:
+                _position_cache.move_to_end((collateral, condition))
+                pairs[condition] = pair
+
+    missing = [c for c in dict.fromkeys(condition_bytes) if c not in pairs]
+    if processes and len(missing) > chunk_size:
+        chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            for chunk, chunk_pairs in zip(chunks, pool.map(_derive_chunk, [collateral] * len(chunks), chunks)):
+                pairs.update(zip(chunk, chunk_pairs))
+    else:
+        for condition in missing:
+            pairs[condition] = _derive_pair(collateral, condition)
+
+    if missing:
+        with _position_cache_lock:
+            for condition in missing:
+                _position_cache[(collateral, condition)] = pairs[condition]
+            while len(_position_cache) > POSITION_CACHE_SIZE:
+                _position_cache.popitem(last=False)
+
+    results = []
+    for condition_id, condition in zip(conditions, condition_bytes):
+        yes, no = pairs[condition]
+        results.append({
+            "conditionId": condition_id,
+            "yesTokenId": _HEX_PREFIX + yes.hex(),
+            "noTokenId": _HEX_PREFIX + no.hex(),
+        })
+    return results
@@ -3,21 +3,49 @@ import json
 import os
 from src.trade_decoder import decode_trades
 from src.market_decoder import decode_market
+from src.indexer.catalog import MarketCatalog
+from src.indexer.token_index import load_index
+
+def verify_tokens(trades: list, market_info: dict, token_index=None):
+    trade_tokens = set(t['token_id'] for t in trades)
+    yes_id = market_info.get('yesTokenId')
+    no_id = market_info.get('noTokenId')
+    
+    print("Verifying tokens...")
+    for t in trade_tokens:
+        if t == yes_id:
+            print(f"  Token {t} matches YES token.")
+        elif t == no_id:
+            print(f"  Token {t} matches NO token.")
+        else:
+            info = token_index.get(t) if token_index is not None else None
+            if info is not None:
+                print(f"  Token {t} belongs to market {info.condition_id} (outcome {info.outcome_index}).")
+            else:
+                print(f"  Token {t} DOES NOT match market YES/NO tokens (might be another market in same tx).")
 
 def main():
     parser = argparse.ArgumentParser(description="Polymarket Indexer Stage 1 Demo")
     parser.add_argument("--tx-hash", required=True, help="Transaction Hash")
     parser.add_argument("--event-slug", help="Market/Event Slug for API Lookup")
+    parser.add_argument("--catalog", help="Local Gamma catalog (see src.indexer.catalog)")
+    parser.add_argument("--token-index", help="Token ID -> market index (see src.indexer.token_index)")
     parser.add_argument("--output", help="Output JSON file path")
+    parser.add_argument("--service", nargs="?", const="", help="Decode via the resident service (src.service); "
+                                                               "address defaults to DECODE_SERVICE")
     
     args = parser.parse_args()
     
     output_data = {}
+    client = None
+    if args.service is not None:
+        from src.client import ServiceClient
+        client = ServiceClient(args.service or None)
     
     # 1. Decode Trades
     print(f"Decoding trades for tx: {args.tx_hash}...")
     try:
-        trades = decode_trades(args.tx_hash)
+        trades = client.decode_tx(args.tx_hash) if client else decode_trades(args.tx_hash)
         output_data['tx_hash'] = args.tx_hash
         output_data['trades'] = trades
         print(f"Found {len(trades)} trades.")
@@ -29,24 +57,18 @@ def main():
     if args.event_slug:
         print(f"Decoding market for slug: {args.event_slug}...")
         try:
-            market_info = decode_market(slug=args.event_slug)
+            if client:
+                market_info = client.decode_market(slug=args.event_slug)
+            else:
+                catalog = MarketCatalog(args.catalog) if args.catalog else None
+                market_info = decode_market(slug=args.event_slug, catalog=catalog)
             output_data['market'] = market_info
             
             # 3. Cross-Validation (Optional)
             # Check if trade tokens match market tokens
             if 'trades' in output_data and output_data['trades']:
-                trade_tokens = set(t['token_id'] for t in output_data['trades'])
-                yes_id = market_info.get('yesTokenId')
-                no_id = market_info.get('noTokenId')
-                
-                print("Verifying tokens...")
-                for t in trade_tokens:
-                    if t == yes_id:
-                        print(f"  Token {t} matches YES token.")
-                    elif t == no_id:
-                        print(f"  Token {t} matches NO token.")
-                    else:
-                        print(f"  Token {t} DOES NOT match market YES/NO tokens (might be another market in same tx).")
+                token_index = load_index(args.token_index) if args.token_index else None
+                verify_tokens(output_data['trades'], market_info, token_index)
                         
         except Exception as e:
              print(f"Error decoding market: {e}")
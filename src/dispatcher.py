@@ -0,0 +1,306 @@
+import os
+import json
+import argparse
+from typing import NamedTuple, Optional, Dict, Any, List, Callable
+from eth_hash.auto import keccak
+from dotenv import load_dotenv
+from src import metrics
+from src.raw_decoder import ORDER_FILLED_TOPIC, decode_order_filled, _to_bytes, _checksum
+from src.indexer.rpc import get_client, format_log
+from src.trade import Trade
+
+load_dotenv()
+
+# Single-pass multi-event log dispatcher.
+# Every log is routed by its topic0 through one dict lookup to a decoder for
+# that event type; logs of any other event cost only that lookup. Fills are
+# grouped under the OrdersMatched that closes them: the exchange emits the
+# maker-order OrderFilled logs, then the taker-order OrderFilled (taker ==
+# exchange), then OrdersMatched(takerOrderHash, ...).
+
+CONDITIONAL_TOKENS = "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045"
+NEG_RISK_ADAPTER = "0xd91E80cF2E7be2e162c6513ceD06f1dD0dA35296"
+
+def _topic(signature: str) -> str:
+    return "0x" + keccak(signature.encode()).hex()
+
+ORDERS_MATCHED_TOPIC = _topic("OrdersMatched(bytes32,address,uint256,uint256,uint256,uint256)")
+CONDITION_PREPARATION_TOPIC = _topic("ConditionPreparation(bytes32,address,bytes32,uint256)")
+POSITION_SPLIT_TOPIC = _topic("PositionSplit(address,address,bytes32,bytes32,uint256[],uint256)")
+POSITIONS_CONVERTED_TOPIC = _topic("PositionsConverted(address,bytes32,uint256,uint256)")
+
+def _hex(value: bytes) -> str:
+    return "0x" + value.hex()
+
+def _words(data: bytes, count: int) -> List[int]:
+    return [int.from_bytes(data[i * 32:(i + 1) * 32], "big") for i in range(count)]
+
+class OrdersMatched(NamedTuple):
+    tx_hash: str
+    log_index: int
+    block_number: Optional[int]
+    exchange: str
+    taker_order_hash: str
+    taker_order_maker: str
+    maker_asset_id: int
+    taker_asset_id: int
+    maker_amount: int
+    taker_amount: int
+
+class ConditionPreparation(NamedTuple):
+    tx_hash: str
+    log_index: int
+    block_number: Optional[int]
+    condition_id: str
+    oracle: str
+    question_id: str
+    outcome_slot_count: int
+
+class PositionSplit(NamedTuple):
+    tx_hash: str
+    log_index: int
+    block_number: Optional[int]
+    stakeholder: str
+    collateral_token: str
+    parent_collection_id: str
+    condition_id: str
+    partition: tuple
+    amount: int
+
+class PositionsConverted(NamedTuple):
+    tx_hash: str
+    log_index: int
+    block_number: Optional[int]
+    stakeholder: str
+    market_id: str
+    index_set: int
+    amount: int
+
+class Match(NamedTuple):
+    """An OrdersMatched with the maker fills it settled and the taker-order summary fill."""
+    matched: OrdersMatched
+    fills: List[Trade]
+    taker_fill: Optional[Trade]
+
+# --- per-event decoders: (log, tx_hash, log_index, block_number) -> record ---
+
+def _decode_order_filled(log, tx_hash, log_index, block_number):
+    args = decode_order_filled(log)
+    if args is None:
+        return None
+    return Trade(tx_hash, log_index, log['address'], args['maker'], args['taker'],
+                 args['makerAssetId'], args['takerAssetId'],
+                 args['makerAmountFilled'], args['takerAmountFilled'],
+                 block_number, args['orderHash'])
+
+def _decode_orders_matched(log, tx_hash, log_index, block_number):
+    topics, data = log['topics'], _to_bytes(log['data'])
+    if len(topics) != 3 or len(data) != 4 * 32:
+        return None
+    return OrdersMatched(tx_hash, log_index, block_number, log['address'],
+                         _hex(_to_bytes(topics[1])), _checksum(_to_bytes(topics[2])), *_words(data, 4))
+
+def _decode_condition_preparation(log, tx_hash, log_index, block_number):
+    topics, data = log['topics'], _to_bytes(log['data'])
+    if len(topics) != 4 or len(data) != 32:
+        return None
+    return ConditionPreparation(tx_hash, log_index, block_number,
+                                _hex(_to_bytes(topics[1])), _checksum(_to_bytes(topics[2])),
+                                _hex(_to_bytes(topics[3])), _words(data, 1)[0])
+
+def _decode_position_split(log, tx_hash, log_index, block_number):
+    # data: collateralToken, offset(partition), amount, len(partition), partition...
+    topics, data = log['topics'], _to_bytes(log['data'])
+    if len(topics) != 4 or len(data) < 4 * 32:
+        return None
+    collateral_word, offset, amount = data[0:32], _words(data[32:64], 1)[0], _words(data[64:96], 1)[0]
+    length = _words(data[offset:offset + 32], 1)[0]
+    partition = tuple(_words(data[offset + 32:offset + 32 + length * 32], length))
+    return PositionSplit(tx_hash, log_index, block_number, _checksum(_to_bytes(topics[1])),
+                         _checksum(collateral_word), _hex(_to_bytes(topics[2])),
+                         _hex(_to_bytes(topics[3])), partition, amount)
+
+def _decode_positions_converted(log, tx_hash, log_index, block_number):
+    topics, data = log['topics'], _to_bytes(log['data'])
+    if len(topics) != 4 or len(data) != 32:
+        return None
+    return PositionsConverted(tx_hash, log_index, block_number, _checksum(_to_bytes(topics[1])),
+                              _hex(_to_bytes(topics[2])), int.from_bytes(_to_bytes(topics[3]), "big"),
+                              _words(data, 1)[0])
+
+# topic0 -> decoder
+DECODERS: Dict[str, Callable] = {
+    ORDER_FILLED_TOPIC: _decode_order_filled,
+    ORDERS_MATCHED_TOPIC: _decode_orders_matched,
+    CONDITION_PREPARATION_TOPIC: _decode_condition_preparation,
+    POSITION_SPLIT_TOPIC: _decode_position_split,
+    POSITIONS_CONVERTED_TOPIC: _decode_positions_converted,
+}
+
+def _topic0(log) -> Optional[str]:
+    topics = log['topics']
+    if not topics:
+        return None
+    topic0 = topics[0]
+    if isinstance(topic0, str):
+        return topic0.lower()
+    return "0x" + bytes(topic0).hex()
+
+class Dispatched:
+    """Typed records of one pass over a receipt's or block range's logs."""
+
+    def __init__(self):
+        self.matches: List[Match] = []
+        # Maker-side fills (summary fills excluded), grouped or not
+        self.fills: List[Trade] = []
+        self.conditions: List[ConditionPreparation] = []
+        self.splits: List[PositionSplit] = []
+        self.conversions: List[PositionsConverted] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trades": [t.to_dict() for t in self.fills],
+            "matches": [
+                {
+                    **_record_dict(m.matched),
+                    "fills": [t.log_index for t in m.fills],
+                    "taker_fill": m.taker_fill.log_index if m.taker_fill else None,
+                }
+                for m in self.matches
+            ],
+            "conditions": [_record_dict(r) for r in self.conditions],
+            "splits": [_record_dict(r) for r in self.splits],
+            "conversions": [_record_dict(r) for r in self.conversions],
+        }
+
+def _record_dict(record) -> Dict[str, Any]:
+    # Large integers as strings, like the trade dicts
+    out = {}
+    for key, value in record._asdict().items():
+        if isinstance(value, int) and key not in ("log_index", "block_number", "outcome_slot_count"):
+            value = str(value)
+        elif isinstance(value, tuple):
+            value = [str(v) for v in value]
+        out[key] = value
+    return out
+
+def dispatch(logs: list, tx_hash: str = None) -> Dispatched:
+    """
+    Decode `logs` in one pass.
+
+    Logs may come from one receipt (pass `tx_hash`) or a block range (each
+    log's transactionHash is used). Raw JSON-RPC logs are accepted.
+    """
+    result = Dispatched()
+    pending: Dict[str, List[Trade]] = {}
+    routed = 0
+
+    for log in logs:
+        decoder = DECODERS.get(_topic0(log))
+        if decoder is None:
+            continue
+        routed += 1
+        if isinstance(log.get('logIndex'), str):
+            # raw JSON-RPC log
+            log = format_log(log)
+        log_tx = tx_hash or log.get('transactionHash')
+        if not isinstance(log_tx, str):
+            log_tx = "0x" + bytes(log_tx).hex()
+        record = decoder(log, log_tx, log['logIndex'], log.get('blockNumber'))
+        if record is None:
+            if metrics.ENABLED:
+                metrics.DECODE_FAILURES.inc("malformed")
+            continue
+
+        if isinstance(record, Trade):
+            pending.setdefault(log_tx, []).append(record)
+        elif isinstance(record, OrdersMatched):
+            fills = pending.pop(log_tx, [])
+            taker_hash = bytes.fromhex(record.taker_order_hash[2:])
+            taker_fill = None
+            maker_fills = []
+            for fill in fills:
+                if fill.order_hash == taker_hash and fill.exchange == record.exchange:
+                    taker_fill = fill
+                else:
+                    maker_fills.append(fill)
+            result.matches.append(Match(record, maker_fills, taker_fill))
+            result.fills.extend(maker_fills)
+        elif isinstance(record, ConditionPreparation):
+            result.conditions.append(record)
+        elif isinstance(record, PositionSplit):
+            result.splits.append(record)
+        elif isinstance(record, PositionsConverted):
+            result.conversions.append(record)
+
+    # Fills not closed by an OrdersMatched (e.g. direct fillOrder): fall back
+    # to the taker == exchange heuristic for the summary log.
+    for fills in pending.values():
+        result.fills.extend(f for f in fills if f.taker.lower() != f.exchange.lower())
+    result.fills.sort(key=lambda t: (t.block_number or 0, t.log_index))
+    if metrics.ENABLED:
+        # Block-range scans arrive as an iterator and are counted by iter_logs
+        if isinstance(logs, list):
+            metrics.LOGS_SCANNED.inc("dispatch", amount=len(logs))
+        metrics.LOGS_MATCHED.inc("dispatch", amount=routed)
+        metrics.FILLS.inc("dispatch", amount=len(result.fills))
+    return result
+
+def dispatch_tx(tx_hash: str, rpc_url: str = None) -> Dispatched:
+    if not rpc_url:
+        rpc_url = os.getenv("RPC_URL")
+
+    if not rpc_url:
+        raise ValueError("RPC_URL not set")
+
+    tx_receipt = get_client(rpc_url).get_receipt(tx_hash)
+    if tx_receipt is None:
+        if metrics.ENABLED:
+            metrics.DECODE_FAILURES.inc("receipt_not_found")
+        raise ValueError(f"Transaction {tx_hash} not found")
+    return dispatch(tx_receipt['logs'], tx_hash)
+
+def dispatch_blocks(from_block: int, to_block: int, rpc_url: str = None, **kwargs) -> Dispatched:
+    """
+    One eth_getLogs scan over [from_block, to_block] for every routed event
+    (exchanges, ConditionalTokens, NegRiskAdapter), decoded in one pass.
+    Extra keyword arguments are passed to `iter_logs`.
+    """
+    from src.indexer.backfill import iter_logs
+    from src.trade_decoder import EXCHANGE_ADDRESSES
+
+    if not rpc_url:
+        rpc_url = os.getenv("RPC_URL")
+
+    if not rpc_url:
+        raise ValueError("RPC_URL not set")
+
+    addresses = EXCHANGE_ADDRESSES + [CONDITIONAL_TOKENS, NEG_RISK_ADAPTER]
+    logs = iter_logs(get_client(rpc_url), from_block, to_block, addresses, list(DECODERS), **kwargs)
+    return dispatch(logs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Decode every known Polymarket event in a transaction")
+    parser.add_argument("--tx-hash", help="Transaction Hash")
+    parser.add_argument("--from-block", type=int, help="First block (inclusive), instead of --tx-hash")
+    parser.add_argument("--to-block", type=int, help="Last block (inclusive)")
+    parser.add_argument("--output", help="Output JSON file path")
+
+    args = parser.parse_args()
+
+    try:
+        if args.tx_hash:
+            result = dispatch_tx(args.tx_hash).to_dict()
+        elif args.from_block is not None and args.to_block is not None:
+            result = dispatch_blocks(args.from_block, args.to_block).to_dict()
+        else:
+            raise ValueError("Provide --tx-hash or --from-block/--to-block")
+        print(json.dumps(result, indent=2))
+
+        if args.output:
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+            with open(args.output, 'w') as f:
+                json.dump(result, f, indent=2)
+
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,199 @@
+import time
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit
+import aiohttp
+from src import metrics
+from src.indexer.gamma import GAMMA_API_URL, market_from_events, market_from_markets
+from src.indexer.rpc import RPCError, _is_transient
+from src.indexer.cache import MISS, get_cache
+from src.indexer.pool import EndpointPool, Throttled, _retry_after
+
+# asyncio counterparts of src.indexer.rpc / src.indexer.gamma.
+
+class HostLimiter:
+    """
+    Bounded concurrency: at most `total` requests in flight overall and
+    `per_host` per host. Callers wait (backpressure) when a limit is reached.
+    """
+
+    def __init__(self, total: int = 64, per_host: int = 16):
+        self.total = asyncio.Semaphore(total)
+        self.per_host_limit = per_host
+        self.hosts: Dict[str, asyncio.Semaphore] = {}
+        self.in_flight = 0
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self.hosts.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self.hosts[host] = semaphore
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        async with self._host_semaphore(url):
+            async with self.total:
+                self.in_flight += 1
+                try:
+                    yield
+                finally:
+                    self.in_flight -= 1
+
+class AsyncRPCClient:
+    """
+    Async JSON-RPC client. Shares the aiohttp session (connection pool) and
+    the HostLimiter with the other async clients of the pipeline. Several
+    comma-separated endpoints are balanced and failed over through an
+    EndpointPool, like RPCClient (hedging is left to the sync client).
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, rpc_url: str, limiter: HostLimiter,
+                 max_retries: int = 3, backoff: float = 0.5, pool: EndpointPool = None):
+        self.session = session
+        self.rpc_url = rpc_url
+        self.pool = pool if pool is not None else EndpointPool.from_url(rpc_url)
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = get_cache()
+        self._ids = itertools.count(1)
+
+    async def call(self, method: str, params: list = None):
+        if self.cache is None:
+            return await self._call(method, params)
+        result = self.cache.lookup_rpc(method, params)
+        if result is MISS:
+            result = await self._call(method, params)
+            if self.cache.wants_head(method, params, result):
+                self.cache.set_head(int(await self._call("eth_blockNumber"), 16))
+            self.cache.record_rpc(method, params, result)
+        return result
+
+    async def _acquire(self, exclude: list):
+        while True:
+            endpoint, delay = self.pool.pick(exclude)
+            if endpoint is not None or delay < 0:
+                return endpoint
+            await asyncio.sleep(delay)
+
+    async def _post(self, payload: dict):
+        # Best endpoint first, failing over to the others before giving up
+        tried = []
+        while True:
+            endpoint = await self._acquire(tried)
+            tried.append(endpoint)
+            t0 = time.perf_counter()
+            try:
+                # Timed from the slot, not the queue in front of it
+                async with self.limiter.slot(endpoint.url):
+                    t0 = time.perf_counter()
+                    async with self.session.post(endpoint.url, json=payload) as response:
+                        if response.status == 429:
+                            raise Throttled(f"429 Too Many Requests from {endpoint.label}",
+                                            _retry_after(response.headers.get("Retry-After")))
+                        response.raise_for_status()
+                        body = await response.json(content_type=None)
+                if isinstance(body, dict) and (body.get("error") or {}).get("code") == 429:
+                    raise Throttled(f"Rate limited by {endpoint.label}: {body['error'].get('message')}")
+            except (aiohttp.ClientError, asyncio.TimeoutError, Throttled) as e:
+                if isinstance(e, Throttled):
+                    self.pool.report_failure(endpoint, "throttled", e.retry_after)
+                elif isinstance(e, asyncio.TimeoutError):
+                    self.pool.report_failure(endpoint, "timeout", seconds=time.perf_counter() - t0)
+                else:
+                    self.pool.report_failure(endpoint, "error")
+                if len(tried) == len(self.pool.endpoints):
+                    raise
+                if metrics.ENABLED:
+                    metrics.RPC_FAILOVERS.inc(endpoint.label)
+                continue
+            except BaseException:
+                with self.pool.lock:
+                    endpoint.in_flight -= 1
+                raise
+            self.pool.report_success(endpoint, time.perf_counter() - t0)
+            if metrics.ENABLED:
+                metrics.RPC_SECONDS.observe(time.perf_counter() - t0, payload["method"])
+            return body
+
+    async def _call(self, method: str, params: list = None):
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []}
+        for attempt in range(self.max_retries + 1):
+            try:
+                body = await self._post(payload)
+            except (aiohttp.ClientError, asyncio.TimeoutError, Throttled) as e:
+                if metrics.ENABLED:
+                    metrics.RPC_ERRORS.inc(method, type(e).__name__)
+                if attempt == self.max_retries:
+                    raise
+                if metrics.ENABLED:
+                    metrics.RPC_RETRIES.inc(method)
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            if "error" in body:
+                error = body["error"]
+                error = RPCError(error.get("code"), error.get("message"), error.get("data"))
+                if metrics.ENABLED:
+                    metrics.RPC_ERRORS.inc(method, str(error.code))
+                if not _is_transient(error) or attempt == self.max_retries:
+                    raise error
+                if metrics.ENABLED:
+                    metrics.RPC_RETRIES.inc(method)
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                continue
+            return body.get("result")
+
+    async def get_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        return await self.call("eth_getTransactionReceipt", [tx_hash])
+
+class AsyncGammaClient:
+    """Async Gamma API client; same response handling as src.indexer.gamma."""
+
+    def __init__(self, session: aiohttp.ClientSession, limiter: HostLimiter, base_url: str = None):
+        self.session = session
+        self.limiter = limiter
+        self.base_url = base_url or GAMMA_API_URL
+        self.cache = get_cache()
+
+    async def _get(self, path: str, params: dict):
+        if self.cache is not None:
+            data = self.cache.lookup_http(path, params)
+            if data is not MISS:
+                if metrics.ENABLED:
+                    metrics.GAMMA_REQUESTS.inc("cache")
+                return data
+        if metrics.ENABLED:
+            metrics.GAMMA_REQUESTS.inc("api")
+        url = f"{self.base_url}{path}"
+        async with self.limiter.slot(url):
+            t0 = time.perf_counter()
+            async with self.session.get(url, params=params) as response:
+                response.raise_for_status()
+                data = await response.json(content_type=None)
+            if metrics.ENABLED:
+                metrics.STAGE_SECONDS.observe(time.perf_counter() - t0, "gamma_request")
+        if self.cache is not None:
+            self.cache.record_http(path, params, data)
+        return data
+
+    async def fetch_market_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        try:
+            return market_from_events(await self._get("/events", {"slug": slug}))
+        except Exception as e:
+            if metrics.ENABLED:
+                metrics.GAMMA_ERRORS.inc(type(e).__name__)
+            print(f"Error fetching from Gamma: {e}")
+            return None
+
+    async def fetch_market_by_id(self, condition_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return market_from_markets(await self._get("/markets", {"condition_id": condition_id}))
+        except Exception as e:
+            if metrics.ENABLED:
+                metrics.GAMMA_ERRORS.inc(type(e).__name__)
+            print(f"Error fetching from Gamma: {e}")
+            return None
@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+from src import metrics
+from src.trade_decoder import EXCHANGE_ADDRESSES
+from src.trade import Trade
+from src.raw_decoder import ORDER_FILLED_TOPIC, decode_order_filled
+from src.indexer.rpc import RPCClient, RPCError, get_client, format_log
+from src.indexer.token_index import load_index, tag_trade
+from src.store.writer import BatchWriter, open_store
+
+load_dotenv()
+
+# Error fragments hosted providers use when an eth_getLogs range is too big
+# (Alchemy, Infura, QuickNode, public Polygon nodes, ...). Only node error
+# objects are matched: 429s, timeouts and other transport failures go through
+# the client's retry / backoff and never shrink the range.
+RANGE_ERROR_CODES = {-32005}
+RANGE_ERROR_HINTS = (
+    "block range",
+    "range is too large",
+    "range too large",
+    "range is too wide",
+    "exceed maximum block range",
+    "query returned more than",
+    "response size exceeded",
+    "log response size",
+)
+# -32005 doubles as "rate limited" on some providers
+RATE_LIMIT_HINTS = ("rate limit", "request rate", "rate exceeded", "too many requests")
+
+def _is_range_error(e: Exception) -> bool:
+    if not isinstance(e, RPCError) or e.code == 429:
+        return False
+    message = str(e).lower()
+    if any(hint in message for hint in RATE_LIMIT_HINTS):
+        return False
+    return e.code in RANGE_ERROR_CODES or any(hint in message for hint in RANGE_ERROR_HINTS)
+
+def iter_order_filled_logs(client: RPCClient, from_block: int, to_block: int,
+                           addresses: list = None, **kwargs):
+    """
+    Yield OrderFilled logs in [from_block, to_block] using topic-filtered eth_getLogs.
+    Keyword arguments are passed to `iter_logs`.
+    """
+    if addresses is None:
+        addresses = EXCHANGE_ADDRESSES
+    return iter_logs(client, from_block, to_block, addresses, [ORDER_FILLED_TOPIC], **kwargs)
+
+def iter_logs(client: RPCClient, from_block: int, to_block: int,
+              addresses: list, topic0s: list, chunk_size: int = 2000,
+              min_chunk_size: int = 1, max_chunk_size: int = 100000,
+              fast_seconds: float = 1.0):
+    """
+    Yield logs of `addresses` whose topic0 is one of `topic0s`, in chain order.
+
+    When the provider rejects a range as too large the range is halved and
+    retried; after a response that comes back within `fast_seconds` the range
+    is doubled again (up to `max_chunk_size`). A rejected range is a ceiling:
+    near it the range is bisected between the largest answered range and the
+    ceiling, so a provider's fixed cap is found in a few calls and not
+    retried on every other request.
+    """
+    start = from_block
+    ceiling, answered = max_chunk_size + 1, 0
+    while start <= to_block:
+        end = min(start + chunk_size - 1, to_block)
+        t0 = time.monotonic()
+        try:
+            with metrics.span("get_logs"):
+                logs = client.get_logs({
+                    "fromBlock": hex(start),
+                    "toBlock": hex(end),
+                    "address": addresses,
+                    "topics": [topic0s],
+                })
+        except Exception as e:
+            if not _is_range_error(e) or end == start:
+                raise
+            if metrics.ENABLED:
+                metrics.LOG_RANGE_SPLITS.inc()
+            ceiling = end - start + 1
+            chunk_size = answered if 0 < answered < ceiling else max(min_chunk_size, ceiling // 2)
+            continue
+        elapsed = time.monotonic() - t0
+        if metrics.ENABLED:
+            metrics.LOGS_SCANNED.inc("getLogs", amount=len(logs))
+
+        # Logs from several addresses may interleave; keep chain order.
+        logs = [format_log(log) for log in logs]
+        for log in sorted(logs, key=lambda l: (l['blockNumber'], l['logIndex'])):
+            yield log
+
+        answered = max(answered, end - start + 1)
+        start = end + 1
+        if elapsed < fast_seconds:
+            grown = chunk_size * 2 if chunk_size * 2 < ceiling else (chunk_size + ceiling) // 2
+            chunk_size = min(max_chunk_size, grown)
+
+def iter_trades(from_block: int, to_block: int, rpc_url: str = None, **kwargs):
+    """
+    Yield compact `Trade` objects for every OrderFilled in the block range.
+
+    Extra keyword arguments are passed to `iter_order_filled_logs`.
+    """
+    if not rpc_url:
+        rpc_url = os.getenv("RPC_URL")
+
+    if not rpc_url:
+        raise ValueError("RPC_URL not set")
+
+    client = get_client(rpc_url)
+
+    if metrics.ENABLED:
+        yield from _iter_trades_measured(iter_order_filled_logs(client, from_block, to_block, **kwargs))
+        return
+
+    for log in iter_order_filled_logs(client, from_block, to_block, **kwargs):
+        args = decode_order_filled(log)
+        if args is None:
+            continue
+        trade = Trade.from_event(log['transactionHash'], log, args, log['blockNumber'])
+        if trade is not None:
+            yield trade
+
+def _iter_trades_measured(logs):
+    # Same as the loop in iter_trades, with counts flushed when the consumer
+    # finishes (or abandons) the generator
+    matched = fills = malformed = 0
+    try:
+        for log in logs:
+            args = decode_order_filled(log)
+            if args is None:
+                # the filter asked for OrderFilled only
+                malformed += 1
+                continue
+            matched += 1
+            trade = Trade.from_event(log['transactionHash'], log, args, log['blockNumber'])
+            if trade is not None:
+                fills += 1
+                yield trade
+    finally:
+        metrics.LOGS_MATCHED.inc("getLogs", amount=matched)
+        metrics.FILLS.inc("getLogs", amount=fills)
+        if malformed:
+            metrics.DECODE_FAILURES.inc("malformed", amount=malformed)
+
+def backfill(from_block: int, to_block: int, rpc_url: str = None, token_index=None, **kwargs):
+    """
+    Yield trade dicts for every OrderFilled in the block range.
+
+    If `token_index` is given, each trade is tagged with its market.
+    Extra keyword arguments are passed to `iter_order_filled_logs`.
+    """
+    for trade in iter_trades(from_block, to_block, rpc_url=rpc_url, **kwargs):
+        trade = trade.to_dict()
+        if token_index is not None:
+            tag_trade(trade, token_index)
+        yield trade
+
+def run_follow(args, token_index=None):
+    """`--follow`: stream fills of new blocks to the configured sink until interrupted."""
+    from src.indexer.follow import follow, Rollback
+
+    store = open_store(args.store) if args.store else None
+    out = None
+    if args.output and not store:
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        out = open(args.output, 'a')
+
+    count = 0
+    try:
+        for update in follow(args.rpc_url, from_block=args.from_block, confirmations=args.confirmations,
+                             min_interval=args.poll_interval):
+            if isinstance(update, Rollback):
+                print(f"Reorg: rolling back to block {update.block_number}")
+                if store is not None:
+                    if hasattr(store, "delete_after_in"):
+                        with store.transaction() as conn:
+                            store.delete_after_in(conn, update.block_number)
+                    else:
+                        print("Warning: this store cannot delete rolled back fills; use --confirmations")
+                elif out is not None:
+                    out.write(json.dumps({"rollback_to_block": update.block_number}) + "\n")
+                    out.flush()
+                else:
+                    print(json.dumps({"rollback_to_block": update.block_number}), flush=True)
+                continue
+
+            trades = [t.to_dict() for t in update.trades]
+            if token_index is not None:
+                for trade in trades:
+                    tag_trade(trade, token_index)
+            # One write + flush per block range keeps the lag at one round trip
+            if store is not None:
+                store.upsert(trades)
+            elif out is not None:
+                out.write("".join(json.dumps(trade) + "\n" for trade in trades))
+                out.flush()
+            else:
+                for trade in trades:
+                    print(json.dumps(trade))
+                sys.stdout.flush()
+            count += len(trades)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if out is not None:
+            out.close()
+        if store is not None:
+            store.close()
+    print(f"Followed {count} trades.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill OrderFilled trades over a block range")
+    parser.add_argument("--from-block", type=int, help="First block (inclusive; with --follow defaults to the head)")
+    parser.add_argument("--to-block", type=int, help="Last block (inclusive); not used with --follow")
+    parser.add_argument("--rpc-url", help="RPC endpoint (defaults to RPC_URL)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Initial eth_getLogs block range")
+    parser.add_argument("--max-chunk-size", type=int, default=100000, help="Upper bound for the adaptive range")
+    parser.add_argument("--token-index", help="Tag trades using a token ID -> market index")
+    parser.add_argument("--output", help="Output file (JSON Lines, one trade per line)")
+    parser.add_argument("--store", help="Trade store: sqlite:<path> or parquet:<dir> (idempotent upsert)")
+    parser.add_argument("--follow", action="store_true", help="Keep following the chain head (live mode)")
+    parser.add_argument("--confirmations", type=int, default=0, help="With --follow: blocks a fill must be buried under")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="With --follow: fastest head poll period (s)")
+
+    args = parser.parse_args()
+
+    try:
+        if args.follow:
+            run_follow(args, load_index(args.token_index) if args.token_index else None)
+        else:
+            if args.from_block is None or args.to_block is None:
+                raise ValueError("--from-block and --to-block are required (or use --follow)")
+
+            trades = backfill(
+                args.from_block,
+                args.to_block,
+                rpc_url=args.rpc_url,
+                chunk_size=args.chunk_size,
+                max_chunk_size=args.max_chunk_size,
+                token_index=load_index(args.token_index) if args.token_index else None,
+            )
+
+            count = 0
+            if args.store:
+                store = open_store(args.store)
+                with BatchWriter(store) as writer:
+                    for trade in trades:
+                        writer.write(trade)
+                        count += 1
+                store.close()
+            elif args.output:
+                if os.path.dirname(args.output):
+                    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+                with open(args.output, 'w') as f:
+                    for trade in trades:
+                        f.write(json.dumps(trade) + "\n")
+                        count += 1
+            else:
+                for trade in trades:
+                    print(json.dumps(trade))
+                    count += 1
+
+            print(f"Backfilled {count} trades from blocks {args.from_block}-{args.to_block}.")
+
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,488 @@
+import os
+import json
+import glob
+import time
+import zlib
+import sqlite3
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode, parse_qsl, quote, unquote
+from typing import Optional, Any, Iterator, Tuple
+from dotenv import load_dotenv
+from src import metrics
+
+load_dotenv()
+
+# Record/replay response cache under the RPC and Gamma clients.
+#
+# Responses are stored once per distinct content: the compact JSON is
+# zlib-compressed and addressed by its SHA-256, and request keys point at the
+# digest (so e.g. the many empty eth_getLogs answers share one object).
+# Everything lives in a single SQLite file; a small in-memory LRU of the
+# serialized responses sits in front of it.
+#
+# Modes:
+#   off           no caching
+#   record        always hit the network, store every immutable response
+#   replay        serve only from the cache; a miss raises CacheMiss
+#   read-through  serve from the cache, fall back to the network and store
+#
+# eth_getLogs answers over numeric ranges are stored per (filter, range) and
+# a later query is served from any recorded ranges that together cover it,
+# so replays work even when the adaptive chunking picks different ranges.
+#
+# Only immutable RPC responses are stored: receipts and blocks at least
+# `confirmations` blocks deep, eth_getLogs over a final numeric range (or a
+# block hash), and eth_chainId. Gamma responses are stored as they were
+# fetched; in read-through mode they are served for `gamma_ttl` seconds
+# (forever if unset) since markets keep updating prices and status.
+
+MODES = ("off", "record", "replay", "read-through")
+
+# Sentinel for "not in the cache"; None is a valid cached result
+MISS = object()
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a request was never recorded."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest BLOB PRIMARY KEY,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS refs (
+    key TEXT PRIMARY KEY,
+    digest BLOB NOT NULL,
+    stored_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS log_ranges (
+    filter TEXT NOT NULL,
+    from_block INTEGER NOT NULL,
+    to_block INTEGER NOT NULL,
+    digest BLOB NOT NULL,
+    PRIMARY KEY (filter, from_block, to_block)
+) WITHOUT ROWID;
+"""
+
+def _serialize(value) -> bytes:
+    # Key order is kept so cached responses print exactly like live ones
+    return json.dumps(value, separators=(",", ":")).encode()
+
+def _lower(value):
+    # Hashes, addresses and hex quantities are case-insensitive
+    if isinstance(value, str):
+        return value.lower()
+    if isinstance(value, list):
+        return [_lower(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _lower(v) for k, v in value.items()}
+    return value
+
+def rpc_key(method: str, params: list) -> str:
+    return f"rpc:{method}:{json.dumps(_lower(params or []), sort_keys=True, separators=(',', ':'))}"
+
+def log_filter_key(flt: dict) -> str:
+    """Address/topic part of an eth_getLogs filter (the block range left out)."""
+    addresses = flt.get("address")
+    if isinstance(addresses, str):
+        addresses = [addresses]
+    return json.dumps({"address": sorted(_lower(addresses)) if addresses else None,
+                       "topics": _lower(flt.get("topics") or [])}, sort_keys=True, separators=(",", ":"))
+
+def _numeric_range(flt: dict) -> Optional[Tuple[int, int]]:
+    from_block, to_block = flt.get("fromBlock"), flt.get("toBlock")
+    if flt.get("blockHash") or not all(isinstance(b, str) and b.startswith("0x") for b in (from_block, to_block)):
+        return None
+    return int(from_block, 16), int(to_block, 16)
+
+def http_key(path: str, params: dict = None) -> str:
+    """Key for a GET request; the base URL is left out so recordings replay against any host."""
+    query = urlencode(sorted((params or {}).items()))
+    return f"GET {path}?{query}" if query else f"GET {path}"
+
+class ResponseStore:
+    """
+    Content-addressed, compressed response store (SQLite) with an LRU in front.
+
+    Args:
+        path (str): SQLite file.
+        lru_size (int): Responses kept decompressed in memory.
+    """
+
+    def __init__(self, path: str, lru_size: int = 4096):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA busy_timeout=10000")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.lru: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self.lru_size = lru_size
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _remember(self, key: str, raw: bytes, stored_at: float):
+        self.lru[key] = (raw, stored_at)
+        self.lru.move_to_end(key)
+        if len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+
+    def _put_object(self, raw: bytes) -> bytes:
+        digest = hashlib.sha256(raw).digest()
+        self.conn.execute("INSERT OR IGNORE INTO objects (digest, data) VALUES (?, ?)",
+                          (digest, zlib.compress(raw, 6)))
+        return digest
+
+    def get_raw(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Serialized response and the time it was stored, or None."""
+        with self.lock:
+            entry = self.lru.get(key)
+            if entry is not None:
+                self.lru.move_to_end(key)
+                return entry
+            row = self.conn.execute(
+                "SELECT o.data, r.stored_at FROM refs r JOIN objects o ON o.digest = r.digest WHERE r.key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            raw = zlib.decompress(row[0])
+            self._remember(key, raw, row[1])
+            return raw, row[1]
+
+    def get(self, key: str, max_age: float = None) -> Any:
+        """Cached response for `key`, or MISS (also when older than `max_age` seconds)."""
+        entry = self.get_raw(key)
+        if entry is None:
+            return MISS
+        raw, stored_at = entry
+        if max_age is not None and time.time() - stored_at > max_age:
+            return MISS
+        # Parsed on every hit so callers can never mutate the cached copy
+        return json.loads(raw)
+
+    def put(self, key: str, value: Any):
+        raw = _serialize(value)
+        stored_at = time.time()
+        with self.lock:
+            with self.conn:
+                digest = self._put_object(raw)
+                self.conn.execute("INSERT OR REPLACE INTO refs (key, digest, stored_at) VALUES (?, ?, ?)",
+                                  (key, digest, stored_at))
+            self._remember(key, raw, stored_at)
+
+    def put_logs(self, filter_key: str, from_block: int, to_block: int, logs: list):
+        with self.lock:
+            with self.conn:
+                digest = self._put_object(_serialize(logs))
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO log_ranges (filter, from_block, to_block, digest) VALUES (?, ?, ?, ?)",
+                    (filter_key, from_block, to_block, digest),
+                )
+
+    def get_logs(self, filter_key: str, from_block: int, to_block: int) -> Any:
+        """
+        Logs in [from_block, to_block] assembled from recorded ranges of the
+        same filter, or MISS unless those ranges cover the whole query.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT from_block, to_block, digest FROM log_ranges "
+                "WHERE filter = ? AND to_block >= ? AND from_block <= ? ORDER BY from_block, to_block DESC",
+                (filter_key, from_block, to_block),
+            ).fetchall()
+            covered = from_block
+            chosen = []
+            for start, end, digest in rows:
+                if start > covered:
+                    break
+                if end >= covered:
+                    chosen.append(digest)
+                    covered = end + 1
+                if covered > to_block:
+                    break
+            if covered <= to_block:
+                return MISS
+            blobs = []
+            for digest in chosen:
+                key = "obj:" + digest.hex()
+                entry = self.lru.get(key)
+                if entry is None:
+                    raw = zlib.decompress(self.conn.execute(
+                        "SELECT data FROM objects WHERE digest = ?", (digest,)).fetchone()[0])
+                    self._remember(key, raw, 0.0)
+                else:
+                    raw = entry[0]
+                    self.lru.move_to_end(key)
+                blobs.append(raw)
+
+        logs = []
+        seen = set()
+        for raw in blobs:
+            for log in json.loads(raw):
+                block = int(log["blockNumber"], 16)
+                position = (block, log["logIndex"])
+                if from_block <= block <= to_block and position not in seen:
+                    seen.add(position)
+                    logs.append(log)
+        if len(blobs) > 1:
+            logs.sort(key=lambda l: (int(l["blockNumber"], 16), int(l["logIndex"], 16)))
+        return logs
+
+    def iter_keys(self, prefix: str = "") -> Iterator[str]:
+        with self.lock:
+            rows = self.conn.execute("SELECT key FROM refs WHERE key >= ? ORDER BY key", (prefix,)).fetchall()
+        for (key,) in rows:
+            if not key.startswith(prefix):
+                break
+            yield key
+
+    def stats(self) -> dict:
+        with self.lock:
+            refs = self.conn.execute("SELECT COUNT(*) FROM refs").fetchone()[0]
+            ranges = self.conn.execute("SELECT COUNT(*) FROM log_ranges").fetchone()[0]
+            objects, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM objects").fetchone()
+        return {"keys": refs, "log_ranges": ranges, "objects": objects, "compressed_bytes": size}
+
+class ResponseCache:
+    """
+    Caching policy on top of a ResponseStore.
+
+    Args:
+        store (ResponseStore): Backing store.
+        mode (str): One of MODES.
+        confirmations (int): Depth after which a block counts as final.
+        gamma_ttl (float, optional): Max age of Gamma responses served in read-through mode.
+        head_ttl (float): Seconds a fetched chain head is trusted before refetching.
+    """
+
+    def __init__(self, store: ResponseStore, mode: str = "read-through", confirmations: int = 128,
+                 gamma_ttl: float = None, head_ttl: float = 10.0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode '{mode}' (expected one of {', '.join(MODES)})")
+        self.store = store
+        self.mode = mode
+        self.confirmations = confirmations
+        self.gamma_ttl = gamma_ttl
+        self.head_ttl = head_ttl
+        self.head = None
+        self.head_time = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def reads(self) -> bool:
+        return self.mode in ("replay", "read-through")
+
+    @property
+    def writes(self) -> bool:
+        return self.mode in ("record", "read-through")
+
+    def _lookup(self, key: str, max_age: float = None) -> Any:
+        if not self.reads:
+            return MISS
+        return self._count(self.store.get(key, max_age), key)
+
+    def _count(self, value, key: str) -> Any:
+        if metrics.ENABLED:
+            kind = key.split(":", 2)[1] if key.startswith("rpc:") else "http"
+            metrics.CACHE_REQUESTS.inc(kind, "miss" if value is MISS else "hit")
+        if value is MISS:
+            self.misses += 1
+            if self.mode == "replay":
+                raise CacheMiss(f"Not recorded: {key}")
+        else:
+            self.hits += 1
+        return value
+
+    # --- RPC ---
+
+    def lookup_rpc(self, method: str, params: list) -> Any:
+        if method == "eth_getLogs" and params:
+            block_range = _numeric_range(params[0])
+            if block_range is not None:
+                if not self.reads:
+                    return MISS
+                key = rpc_key(method, params)
+                return self._count(self.store.get_logs(log_filter_key(params[0]), *block_range), key)
+        return self._lookup(rpc_key(method, params))
+
+    def _final_block(self, method: str, params: list, result) -> Optional[int]:
+        """
+        Block that must be final for the response to be immutable: 0 when it
+        is immutable regardless, None when it is never cacheable.
+        """
+        params = params or []
+        if method == "eth_chainId":
+            return 0
+        if result is None:
+            return None
+        if method == "eth_getTransactionReceipt":
+            return int(result["blockNumber"], 16)
+        if method == "eth_getBlockByHash":
+            return 0
+        if method == "eth_getBlockByNumber":
+            tag = params[0] if params else None
+            if not isinstance(tag, str) or not tag.startswith("0x"):
+                return None
+            return int(tag, 16)
+        if method == "eth_getLogs":
+            flt = params[0] if params else {}
+            if flt.get("blockHash"):
+                return 0
+            to_block = flt.get("toBlock")
+            if not isinstance(to_block, str) or not to_block.startswith("0x"):
+                return None
+            return int(to_block, 16)
+        return None
+
+    def safe_head(self) -> Optional[int]:
+        if self.head is None:
+            return None
+        return self.head - self.confirmations
+
+    def wants_head(self, method: str, params: list, result) -> bool:
+        """True if storing this response needs a fresher chain head (see set_head)."""
+        if not self.writes:
+            return False
+        block = self._final_block(method, params, result)
+        if not block:
+            return False
+        safe = self.safe_head()
+        if safe is not None and block <= safe:
+            return False
+        return time.monotonic() - self.head_time > self.head_ttl
+
+    def set_head(self, head: int):
+        self.head = head
+        self.head_time = time.monotonic()
+
+    def record_rpc(self, method: str, params: list, result):
+        if not self.writes:
+            return
+        block = self._final_block(method, params, result)
+        if block is None:
+            return
+        if block:
+            safe = self.safe_head()
+            if safe is None or block > safe:
+                return
+        if method == "eth_getLogs":
+            block_range = _numeric_range(params[0])
+            if block_range is not None:
+                self.store.put_logs(log_filter_key(params[0]), *block_range, result)
+                return
+        self.store.put(rpc_key(method, params), result)
+
+    # --- Gamma / HTTP ---
+
+    def lookup_http(self, path: str, params: dict = None) -> Any:
+        max_age = self.gamma_ttl if self.mode == "read-through" else None
+        return self._lookup(http_key(path, params), max_age)
+
+    def record_http(self, path: str, params: dict, data):
+        if self.writes:
+            self.store.put(http_key(path, params), data)
+
+_cache = None
+_cache_loaded = False
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[ResponseCache]:
+    """
+    Process-wide cache configured from the environment, or None when
+    disabled. CACHE_MODE selects the mode (default off), CACHE_PATH the
+    SQLite file, CACHE_CONFIRMATIONS and CACHE_GAMMA_TTL the policy.
+    """
+    global _cache, _cache_loaded
+    with _cache_lock:
+        if not _cache_loaded:
+            mode = os.getenv("CACHE_MODE") or "off"
+            if mode != "off":
+                gamma_ttl = os.getenv("CACHE_GAMMA_TTL")
+                _cache = ResponseCache(
+                    ResponseStore(os.getenv("CACHE_PATH") or "data/cache.db"),
+                    mode=mode,
+                    confirmations=int(os.getenv("CACHE_CONFIRMATIONS") or 128),
+                    gamma_ttl=float(gamma_ttl) if gamma_ttl else None,
+                )
+            _cache_loaded = True
+        return _cache
+
+def set_cache(cache: Optional[ResponseCache]):
+    """Install `cache` as the process-wide cache (None disables caching)."""
+    global _cache, _cache_loaded
+    with _cache_lock:
+        _cache = cache
+        _cache_loaded = True
+
+def reset_cache():
+    """Drop the process-wide cache (forked workers reopen their own connection)."""
+    global _cache, _cache_loaded, _cache_lock
+    _cache = None
+    _cache_loaded = False
+    _cache_lock = threading.Lock()
+
+# --- fixtures (stage1.md: fixtures/tx_<hash>.json, fixtures/market_<slug>.json) ---
+
+def export_fixtures(store: ResponseStore, directory: str) -> int:
+    """Write recorded receipts and Gamma event lookups as fixture files."""
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for key in store.iter_keys("rpc:eth_getTransactionReceipt:"):
+        tx_hash = json.loads(key.split(":", 2)[2])[0]
+        with open(os.path.join(directory, f"tx_{tx_hash}.json"), 'w') as f:
+            json.dump(store.get(key), f, indent=2)
+        count += 1
+    for key in store.iter_keys("GET /events?slug="):
+        # Decode the query the key was built from, so import re-encodes it exactly once
+        params = parse_qsl(key[len("GET /events?"):])
+        if len(params) != 1:
+            continue
+        slug = params[0][1]
+        with open(os.path.join(directory, f"market_{quote(slug, safe='')}.json"), 'w') as f:
+            json.dump(store.get(key), f, indent=2)
+        count += 1
+    return count
+
+def import_fixtures(store: ResponseStore, directory: str) -> int:
+    """Load fixture files written by `export_fixtures` (or by hand) into the store."""
+    count = 0
+    for path in sorted(glob.glob(os.path.join(directory, "tx_*.json"))):
+        tx_hash = os.path.basename(path)[len("tx_"):-len(".json")]
+        with open(path) as f:
+            store.put(rpc_key("eth_getTransactionReceipt", [tx_hash]), json.load(f))
+        count += 1
+    for path in sorted(glob.glob(os.path.join(directory, "market_*.json"))):
+        slug = unquote(os.path.basename(path)[len("market_"):-len(".json")])
+        with open(path) as f:
+            store.put(http_key("/events", {"slug": slug}), json.load(f))
+        count += 1
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect the response cache and convert it to/from fixtures")
+    parser.add_argument("--path", default=os.getenv("CACHE_PATH") or "data/cache.db", help="Cache SQLite file")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--export-fixtures", metavar="DIR", help="Write tx_<hash>.json / market_<slug>.json files")
+    group.add_argument("--import-fixtures", metavar="DIR", help="Load tx_<hash>.json / market_<slug>.json files")
+
+    args = parser.parse_args()
+
+    try:
+        store = ResponseStore(args.path)
+        if args.export_fixtures:
+            print(f"Exported {export_fixtures(store, args.export_fixtures)} fixtures to {args.export_fixtures}")
+        elif args.import_fixtures:
+            print(f"Imported {import_fixtures(store, args.import_fixtures)} fixtures from {args.import_fixtures}")
+        print(json.dumps(store.stats(), indent=2))
+        store.close()
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,250 @@
+import os
+import json
+import hashlib
+import sqlite3
+import argparse
+import requests
+from typing import Optional, Dict, Any, List
+from src.indexer.gamma import GAMMA_API_URL
+
+# Local Gamma market catalog.
+# Pages through every Gamma event once into SQLite, then refreshes
+# incrementally: events are requested newest-updated first and paging stops
+# at the first page that reaches events older than the stored watermark.
+# Events stamped with the watermark itself are fetched again and skipped if
+# their content hash is unchanged. Pages overlap by one event; when that
+# event is missing from the next page, rows moved up while paging and the
+# page before is read again so none is skipped. Each page request carries
+# the ETag seen last time, so an unchanged catalog costs a single 304.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    slug TEXT,
+    updated_at TEXT,
+    etag TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_slug ON events(slug);
+
+CREATE TABLE IF NOT EXISTS markets (
+    id TEXT PRIMARY KEY,
+    event_id TEXT,
+    position INTEGER,
+    slug TEXT,
+    condition_id TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_markets_slug ON markets(slug);
+CREATE INDEX IF NOT EXISTS idx_markets_condition ON markets(condition_id);
+CREATE INDEX IF NOT EXISTS idx_markets_event ON markets(event_id, position);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class MarketCatalog:
+    """
+    SQLite-backed store of Gamma events and markets.
+
+    Args:
+        path (str): Database file (":memory:" for a throwaway catalog).
+        base_url (str, optional): Gamma API base URL.
+    """
+
+    def __init__(self, path: str, base_url: str = None):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.base_url = base_url or GAMMA_API_URL
+        self.session = requests.Session()
+
+    def close(self):
+        self.conn.close()
+        self.session.close()
+
+    # --- sync state ---
+
+    def _get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str):
+        self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    # --- writes ---
+
+    def upsert_event(self, event: dict) -> bool:
+        """Store `event` and its markets; returns False if it is already stored unchanged."""
+        event_id = str(event.get("id"))
+        etag = hashlib.sha1(json.dumps(event, sort_keys=True).encode()).hexdigest()
+        row = self.conn.execute("SELECT etag FROM events WHERE id = ?", (event_id,)).fetchone()
+        if row is not None and row[0] == etag:
+            return False
+        markets = event.get("markets") or []
+        stored = {k: v for k, v in event.items() if k != "markets"}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO events (id, slug, updated_at, etag, data) VALUES (?, ?, ?, ?, ?)",
+            (event_id, event.get("slug"), event.get("updatedAt"), etag, json.dumps(stored)),
+        )
+        # The event's market list is authoritative: markets it no longer has are dropped
+        self.conn.execute("DELETE FROM markets WHERE event_id = ?", (event_id,))
+        for position, market in enumerate(markets):
+            condition_id = market.get("conditionId")
+            self.conn.execute(
+                "INSERT OR REPLACE INTO markets (id, event_id, position, slug, condition_id, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(market.get("id")),
+                    event_id,
+                    position,
+                    market.get("slug"),
+                    condition_id.lower() if condition_id else None,
+                    market.get("updatedAt"),
+                    json.dumps(market),
+                ),
+            )
+        return True
+
+    # --- sync ---
+
+    def _get_page(self, offset: int, page_size: int, use_etag: bool = True):
+        """Returns (events, etag); events is None for a 304."""
+        url = f"{self.base_url}/events"
+        params = {"limit": page_size, "offset": offset, "order": "updatedAt", "ascending": "false"}
+        headers = {}
+        etag = self._get_state(f"etag:events:{page_size}:{offset}") if use_etag else None
+        if etag:
+            headers["If-None-Match"] = etag
+
+        response = self.session.get(url, params=params, headers=headers)
+        if response.status_code == 304:
+            return None, etag
+        response.raise_for_status()
+        return response.json(), response.headers.get("ETag")
+
+    def sync(self, page_size: int = 500, full: bool = False) -> int:
+        """
+        Pull events from Gamma into the store.
+
+        A first sync (or `full=True`) pages through everything; later syncs
+        stop once they reach events updated before the last run.
+
+        Returns:
+            int: Number of events written (new or changed).
+        """
+        watermark = None if full else self._get_state("watermark:events")
+        newest = watermark
+        written = 0
+        offset = 0
+        overlap = 1 if page_size > 1 else 0
+        step = page_size - overlap
+        last_id = None
+
+        while True:
+            page, etag = self._get_page(offset, page_size, use_etag=not full)
+            if page is None:
+                # 304: this page is unchanged since the last sync
+                if watermark is not None:
+                    break
+                offset += step
+                last_id = None
+                continue
+            if not page:
+                break
+            if overlap and last_id is not None and last_id not in {str(e.get("id")) for e in page}:
+                # Rows moved up since the previous page: read the page before again
+                offset = max(0, offset - step)
+                last_id = None
+                continue
+
+            reached_known = False
+            for event in page:
+                updated_at = event.get("updatedAt")
+                if watermark is not None and updated_at is not None and updated_at < watermark:
+                    reached_known = True
+                    continue
+                if self.upsert_event(event):
+                    written += 1
+                if updated_at and (newest is None or updated_at > newest):
+                    newest = updated_at
+
+            # Only a processed page's ETag is kept, so a 304 never hides unseen events
+            if etag:
+                self._set_state(f"etag:events:{page_size}:{offset}", etag)
+            self.conn.commit()
+            if reached_known or len(page) < page_size:
+                break
+            offset += step
+            last_id = str(page[-1].get("id"))
+
+        if newest is not None:
+            self._set_state("watermark:events", newest)
+        self.conn.commit()
+        return written
+
+    # --- reads (no network) ---
+
+    def get_event(self, slug: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute("SELECT id, data FROM events WHERE slug = ?", (slug,)).fetchone()
+        if row is None:
+            return None
+        event = json.loads(row[1])
+        event["markets"] = self.markets_for_event(row[0])
+        return event
+
+    def markets_for_event(self, event_id: str) -> List[Dict[str, Any]]:
+        rows = self.conn.execute(
+            "SELECT data FROM markets WHERE event_id = ? ORDER BY position", (str(event_id),)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def market_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        """
+        Same resolution as fetch_market_by_slug (event slug -> first market),
+        falling back to a market-level slug.
+        """
+        row = self.conn.execute(
+            "SELECT m.data FROM events e JOIN markets m ON m.event_id = e.id "
+            "WHERE e.slug = ? ORDER BY m.position LIMIT 1", (slug,)
+        ).fetchone()
+        if row is None:
+            row = self.conn.execute("SELECT data FROM markets WHERE slug = ?", (slug,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def market_by_condition_id(self, condition_id: str) -> Optional[Dict[str, Any]]:
+        row = self.conn.execute(
+            "SELECT data FROM markets WHERE condition_id = ?", (condition_id.lower(),)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_markets(self):
+        for (data,) in self.conn.execute("SELECT data FROM markets ORDER BY event_id, position"):
+            yield json.loads(data)
+
+    def count(self) -> Dict[str, int]:
+        return {
+            "events": self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0],
+            "markets": self.conn.execute("SELECT COUNT(*) FROM markets").fetchone()[0],
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the Gamma market catalog into a local store")
+    parser.add_argument("--db", default="data/catalog.db", help="SQLite catalog path")
+    parser.add_argument("--page-size", type=int, default=500, help="Events per Gamma page")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and page through everything")
+
+    args = parser.parse_args()
+
+    try:
+        catalog = MarketCatalog(args.db)
+        written = catalog.sync(page_size=args.page_size, full=args.full)
+        counts = catalog.count()
+        print(f"Synced {written} events. Catalog: {counts['events']} events, {counts['markets']} markets.")
+        catalog.close()
+    except Exception as e:
+        print(f"Error: {e}")
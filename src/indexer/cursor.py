@@ -0,0 +1,245 @@
+import os
+import time
+import argparse
+from typing import Optional, NamedTuple, List
+from dotenv import load_dotenv
+from src.indexer.rpc import RPCClient, get_client
+from src.indexer.backfill import iter_trades
+from src.store.sqlite import SQLiteTradeStore
+
+load_dotenv()
+
+# Checkpointed, resumable and reorg-safe indexing.
+#
+# The cursor lives in the SQLite trade store. Each window of blocks is
+# committed in ONE transaction together with its trades: the trades, the new
+# last-processed block and that block's hash. A crash therefore leaves either
+# the whole window or none of it, so a restart neither duplicates nor skips.
+#
+# The hashes of recent checkpoints are kept. Before resuming they are
+# compared with the chain; since a block hash commits to all its ancestors,
+# the newest checkpoint whose hash still matches is the fork point. Trades
+# above it are deleted and those blocks re-indexed.
+#
+# Each window reads the hash of its last block (and of the block before it)
+# BEFORE its logs and the last block's hash again after them. A changed hash
+# means a reorg raced the window and it is fetched again; a parent that no
+# longer matches the cursor rolls back first. So the stored hash always
+# belongs to the chain the stored trades came from.
+#
+# A rollback deletes trades by block number, whichever job wrote them, so a
+# store holds exactly one cursor: IndexCursor refuses a second name.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursor (
+    name TEXT PRIMARY KEY,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name TEXT NOT NULL,
+    block_number INTEGER NOT NULL,
+    block_hash TEXT NOT NULL,
+    PRIMARY KEY (name, block_number)
+);
+"""
+
+class Checkpoint(NamedTuple):
+    block_number: int
+    block_hash: str
+
+class IndexCursor:
+    """
+    Args:
+        store (SQLiteTradeStore): Store that holds both trades and cursor.
+        name (str): Cursor name. One cursor per store: a rollback deletes every
+                    trade above the fork point, which other jobs' cursors would not know about.
+        keep (int): Recent checkpoints kept for reorg detection.
+    """
+
+    def __init__(self, store: SQLiteTradeStore, name: str = "backfill", keep: int = 256):
+        self.store = store
+        self.name = name
+        self.keep = keep
+        with store.transaction() as conn:
+            conn.executescript(SCHEMA)
+            other = conn.execute(
+                "SELECT name FROM cursor WHERE name != ? UNION SELECT name FROM checkpoints WHERE name != ?",
+                (name, name),
+            ).fetchone()
+        if other:
+            raise ValueError(f"Store already holds cursor '{other[0]}'; use one store per indexing job")
+
+    def get(self) -> Optional[Checkpoint]:
+        with self.store.transaction() as conn:
+            row = conn.execute(
+                "SELECT block_number, block_hash FROM cursor WHERE name = ?", (self.name,)
+            ).fetchone()
+        return Checkpoint(*row) if row else None
+
+    def recent(self) -> List[Checkpoint]:
+        with self.store.transaction() as conn:
+            rows = conn.execute(
+                "SELECT block_number, block_hash FROM checkpoints WHERE name = ? ORDER BY block_number DESC",
+                (self.name,),
+            ).fetchall()
+        return [Checkpoint(*row) for row in rows]
+
+    def commit(self, trades: list, block_number: int, block_hash: str) -> int:
+        """Write `trades` and advance the cursor to `block_number` atomically."""
+        with self.store.transaction() as conn:
+            written = self.store.upsert_in(conn, trades)
+            conn.execute(
+                "INSERT OR REPLACE INTO cursor (name, block_number, block_hash) VALUES (?, ?, ?)",
+                (self.name, block_number, block_hash),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, block_number, block_hash) VALUES (?, ?, ?)",
+                (self.name, block_number, block_hash),
+            )
+            conn.execute(
+                "DELETE FROM checkpoints WHERE name = ? AND block_number NOT IN "
+                "(SELECT block_number FROM checkpoints WHERE name = ? ORDER BY block_number DESC LIMIT ?)",
+                (self.name, self.name, self.keep),
+            )
+        return written
+
+    def rollback(self, checkpoint: Optional[Checkpoint], start_block: int):
+        """
+        Drop everything above `checkpoint` (trades, checkpoints, cursor) in
+        one transaction. With no surviving checkpoint everything from
+        `start_block` on is dropped and the cursor is cleared.
+        """
+        keep_to = checkpoint.block_number if checkpoint else start_block - 1
+        with self.store.transaction() as conn:
+            self.store.delete_after_in(conn, keep_to)
+            conn.execute("DELETE FROM checkpoints WHERE name = ? AND block_number > ?", (self.name, keep_to))
+            if checkpoint:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cursor (name, block_number, block_hash) VALUES (?, ?, ?)",
+                    (self.name, checkpoint.block_number, checkpoint.block_hash),
+                )
+            else:
+                conn.execute("DELETE FROM cursor WHERE name = ?", (self.name,))
+
+    def find_fork_point(self, client: RPCClient) -> Optional[Checkpoint]:
+        """
+        Newest stored checkpoint still on the canonical chain, or None if
+        none is. Returns the cursor itself when there was no reorg.
+        """
+        checkpoints = self.recent()
+        if not checkpoints:
+            return None
+        hashes = client.batch_call([("eth_getBlockByNumber", [hex(c.block_number), False]) for c in checkpoints],
+                                   raise_errors=True)
+        for checkpoint, block in zip(checkpoints, hashes):
+            if block is not None and block["hash"].lower() == checkpoint.block_hash.lower():
+                return checkpoint
+        return None
+
+    def check_reorg(self, client: RPCClient, start_block: int) -> Optional[int]:
+        """
+        Compare recent checkpoints with the chain and roll back on a reorg.
+
+        Returns:
+            int: Block the cursor was rolled back to, or None if the chain is unchanged.
+        """
+        current = self.get()
+        if current is None:
+            return None
+        fork = self.find_fork_point(client)
+        if fork == current:
+            return None
+        self.rollback(fork, start_block)
+        return fork.block_number if fork else start_block - 1
+
+def _header_hashes(client: RPCClient, numbers: List[int]) -> List[str]:
+    blocks = client.batch_call([("eth_getBlockByNumber", [hex(n), False]) for n in numbers], raise_errors=True)
+    for number, block in zip(numbers, blocks):
+        if block is None:
+            raise ValueError(f"Block {number} not found")
+    return [block["hash"].lower() for block in blocks]
+
+def index_range(store: SQLiteTradeStore, from_block: int, to_block: int, rpc_url: str = None,
+                window: int = 1000, name: str = "backfill", max_attempts: int = 5, **kwargs) -> int:
+    """
+    Index [from_block, to_block] into `store`, resuming from the stored
+    cursor and re-indexing after a reorg. Commits every `window` blocks; a
+    window a reorg raced is fetched again, up to `max_attempts` times.
+    Extra keyword arguments are passed to `iter_trades`.
+
+    Returns:
+        int: Trades written by this run.
+    """
+    if not rpc_url:
+        rpc_url = os.getenv("RPC_URL")
+
+    if not rpc_url:
+        raise ValueError("RPC_URL not set")
+
+    client = get_client(rpc_url)
+    cursor = IndexCursor(store, name)
+
+    rolled_back = cursor.check_reorg(client, from_block)
+    if rolled_back is not None:
+        print(f"Reorg detected: rolled back to block {rolled_back}")
+
+    checkpoint = cursor.get()
+    start = max(from_block, checkpoint.block_number + 1) if checkpoint else from_block
+    if start > from_block:
+        print(f"Resuming from block {start}")
+
+    written = 0
+    attempts = 0
+    while start <= to_block:
+        end = min(start + window - 1, to_block)
+        checkpoint = cursor.get()
+        if checkpoint and checkpoint.block_number == start - 1:
+            block_hash, parent_hash = _header_hashes(client, [end, start - 1])
+            if parent_hash != checkpoint.block_hash.lower():
+                # Reorg below the cursor since the last window
+                rolled_back = cursor.check_reorg(client, from_block)
+                if rolled_back is not None:
+                    print(f"Reorg detected: rolled back to block {rolled_back}")
+                    start = rolled_back + 1
+                    continue
+                # The chain flipped back to the cursor's block; check the window again
+                attempts += 1
+                if attempts >= max_attempts:
+                    raise ValueError(f"Block {start - 1} kept changing; giving up after {attempts} attempts")
+                continue
+        else:
+            block_hash, = _header_hashes(client, [end])
+
+        trades = [t.to_dict() for t in iter_trades(start, end, rpc_url=rpc_url, **kwargs)]
+        if _header_hashes(client, [end])[0] != block_hash:
+            attempts += 1
+            if attempts >= max_attempts:
+                raise ValueError(f"Blocks {start}-{end} kept changing; giving up after {attempts} attempts")
+            print(f"Reorg while indexing blocks {start}-{end}; fetching the window again")
+            continue
+        attempts = 0
+        written += cursor.commit(trades, end, block_hash)
+        start = end + 1
+    return written
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable, reorg-safe indexing into a SQLite trade store")
+    parser.add_argument("--from-block", type=int, required=True, help="First block (inclusive)")
+    parser.add_argument("--to-block", type=int, required=True, help="Last block (inclusive)")
+    parser.add_argument("--db", default="data/trades.db", help="SQLite trade store (holds the cursor too)")
+    parser.add_argument("--window", type=int, default=1000, help="Blocks per checkpoint")
+    parser.add_argument("--name", default="backfill", help="Cursor name (one per store)")
+    parser.add_argument("--rpc-url", help="RPC endpoint (defaults to RPC_URL)")
+
+    args = parser.parse_args()
+
+    try:
+        store = SQLiteTradeStore(args.db)
+        t0 = time.monotonic()
+        written = index_range(store, args.from_block, args.to_block, rpc_url=args.rpc_url,
+                              window=args.window, name=args.name)
+        print(f"Indexed {written} trades in {time.monotonic() - t0:.2f}s; cursor at {IndexCursor(store, args.name).get()}")
+        store.close()
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,202 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import NamedTuple, Optional, List, Iterator, Union
+import requests
+from dotenv import load_dotenv
+from src import metrics
+from src.trade import Trade
+from src.trade_decoder import EXCHANGE_ADDRESSES
+from src.raw_decoder import ORDER_FILLED_TOPIC, decode_order_filled
+from src.indexer.rpc import RPCClient, RPCError, get_client, format_log
+
+load_dotenv()
+
+# Live follow mode: track the chain head and decode OrderFilled logs of each
+# new block as soon as it is visible.
+#
+# The head is found by adaptive eth_blockNumber polling: the observed block
+# interval is tracked, the poller sleeps until shortly before the next block
+# is due and then polls every `min_interval`, so a new block is picked up
+# within one short poll of its arrival without hammering the node between
+# blocks. Each step then sends ONE JSON-RPC batch: the header of the block
+# before the new range (parent check), the header of its last block, and the
+# eth_getLogs for the range.
+#
+# Blocks are processed once they are `confirmations` deep. Reorgs shallower
+# than that are never seen; deeper ones (or any reorg with confirmations=0)
+# are detected because the stored hash of the last processed block no longer
+# matches the chain. The newest stored hash that still matches is the fork
+# point, and a Rollback(fork) is emitted before the replacement blocks.
+
+class Update(NamedTuple):
+    """Fills of blocks [from_block, to_block], in chain order."""
+    from_block: int
+    to_block: int
+    head: int
+    trades: List[Trade]
+
+class Rollback(NamedTuple):
+    """Everything above `block_number` was reorged out and will be re-emitted."""
+    block_number: int
+
+class HeadPoller:
+    """
+    Adaptive eth_blockNumber polling.
+
+    Args:
+        client (RPCClient): RPC client.
+        min_interval (float): Fastest poll period (seconds), used once a block is due.
+        max_interval (float): Slowest poll period.
+        lead (float): Fraction of the block interval to sleep before fast polling starts.
+    """
+
+    def __init__(self, client: RPCClient, min_interval: float = 0.05, max_interval: float = 2.0,
+                 lead: float = 0.8):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.lead = lead
+        self.head: Optional[int] = None
+        self.seen_at: Optional[float] = None
+        # Exponential moving average of seconds per block
+        self.block_time: Optional[float] = None
+
+    def poll(self) -> int:
+        head = int(self.client.call("eth_blockNumber"), 16)
+        now = time.monotonic()
+        if self.head is None or head > self.head:
+            if self.head is not None:
+                interval = (now - self.seen_at) / (head - self.head)
+                self.block_time = interval if self.block_time is None else 0.8 * self.block_time + 0.2 * interval
+            self.head, self.seen_at = head, now
+        return head
+
+    def delay(self) -> float:
+        """Seconds to sleep before the next poll."""
+        if self.block_time is None or self.seen_at is None:
+            return self.min_interval
+        due = self.seen_at + self.block_time * self.lead - time.monotonic()
+        return max(self.min_interval, min(due, self.max_interval))
+
+    def wait(self, above: int, stop: threading.Event = None) -> Optional[int]:
+        """Block until the head is above `above`; returns it (None if `stop` is set)."""
+        while stop is None or not stop.is_set():
+            head = self.poll()
+            if head > above:
+                return head
+            time.sleep(self.delay())
+        return None
+
+def _block_query(number: int) -> tuple:
+    return ("eth_getBlockByNumber", [hex(number), False])
+
+def _decode(logs: list) -> List[Trade]:
+    trades = []
+    logs = [format_log(log) for log in logs]
+    for log in sorted(logs, key=lambda l: (l['blockNumber'], l['logIndex'])):
+        args = decode_order_filled(log)
+        if args is None:
+            continue
+        trade = Trade.from_event(log['transactionHash'], log, args, log['blockNumber'])
+        if trade is not None:
+            trades.append(trade)
+    if metrics.ENABLED:
+        metrics.LOGS_SCANNED.inc("follow", amount=len(logs))
+        metrics.FILLS.inc("follow", amount=len(trades))
+    return trades
+
+def _find_fork(client: RPCClient, checkpoints: deque) -> Optional[int]:
+    # Newest stored (number, hash) still on the canonical chain
+    recent = list(reversed(checkpoints))
+    blocks = client.batch_call([_block_query(number) for number, _ in recent], raise_errors=True)
+    for (number, block_hash), block in zip(recent, blocks):
+        if block is not None and block["hash"].lower() == block_hash.lower():
+            return number
+    return None
+
+def follow(rpc_url: str = None, from_block: int = None, confirmations: int = 0,
+           addresses: list = None, max_range: int = 1000, keep: int = 128,
+           min_interval: float = 0.05, max_interval: float = 2.0,
+           stop: threading.Event = None) -> Iterator[Union[Update, Rollback]]:
+    """
+    Follow the chain and yield an Update for every newly confirmed block
+    range, and a Rollback when a reorg replaced already emitted blocks.
+
+    Args:
+        rpc_url (str): RPC endpoint (defaults to RPC_URL).
+        from_block (int): First block to emit (defaults to the current confirmed head + 1).
+        confirmations (int): Blocks a block must be buried under before it is emitted.
+        addresses (list): Exchange contracts (defaults to both Polymarket exchanges).
+        max_range (int): Max blocks per step while catching up.
+        keep (int): Recent block hashes kept for finding the fork point.
+        stop (threading.Event): Set to end the generator.
+    """
+    if not rpc_url:
+        rpc_url = os.getenv("RPC_URL")
+
+    if not rpc_url:
+        raise ValueError("RPC_URL not set")
+
+    client = get_client(rpc_url)
+    poller = HeadPoller(client, min_interval, max_interval)
+    addresses = addresses or EXCHANGE_ADDRESSES
+    # (block number, hash) of the last block of every emitted range
+    checkpoints: deque = deque(maxlen=keep)
+
+    if from_block is None:
+        from_block = poller.poll() - confirmations + 1
+    last = from_block - 1
+
+    while stop is None or not stop.is_set():
+        try:
+            head = poller.wait(last + confirmations, stop)
+            if head is None:
+                return
+            t_head = time.perf_counter()
+            start, end = last + 1, min(head - confirmations, last + max_range)
+
+            calls = [_block_query(end)]
+            if checkpoints:
+                calls.append(_block_query(start - 1))
+            calls.append(("eth_getLogs", [{
+                "fromBlock": hex(start),
+                "toBlock": hex(end),
+                "address": addresses,
+                "topics": [[ORDER_FILLED_TOPIC]],
+            }]))
+            results = client.batch_call(calls, raise_errors=True)
+            end_block, logs = results[0], results[-1]
+            if end_block is None:
+                # Head moved backwards (node behind a load balancer); poll again
+                time.sleep(poller.delay())
+                continue
+
+            if checkpoints:
+                parent = results[1]
+                if parent is None or parent["hash"].lower() != checkpoints[-1][1].lower():
+                    fork = _find_fork(client, checkpoints)
+                    if fork is None:
+                        fork = checkpoints[0][0] - 1
+                        print(f"Warning: reorg deeper than {len(checkpoints)} tracked blocks; rolling back to {fork}")
+                    while checkpoints and checkpoints[-1][0] > fork:
+                        checkpoints.pop()
+                    last = fork
+                    if metrics.ENABLED:
+                        metrics.FOLLOW_ROLLBACKS.inc()
+                    yield Rollback(fork)
+                    continue
+
+            # The end header was read before the logs, so a reorg racing this
+            # batch leaves a stale hash behind and is caught by the next step.
+            checkpoints.append((end, end_block["hash"]))
+            trades = _decode(logs)
+            last = end
+            if metrics.ENABLED:
+                metrics.QUEUE_DEPTH.set(head - confirmations - end, "follow_blocks_behind")
+                metrics.STAGE_SECONDS.observe(time.perf_counter() - t_head, "follow_block")
+            yield Update(start, end, head, trades)
+        except (RPCError, requests.RequestException, ValueError) as e:
+            print(f"Error: {e}; retrying")
+            time.sleep(max_interval)
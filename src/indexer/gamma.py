@@ -1,13 +1,73 @@
+import os
 import requests
 from typing import Optional, Dict, Any
+from src import metrics
+from src.indexer.cache import MISS, get_cache
 
-GAMMA_API_URL = "https://gamma-api.polymarket.com"
+# Overridable so the decoders can be pointed at a local stand-in
+GAMMA_API_URL = os.getenv("GAMMA_API_URL") or "https://gamma-api.polymarket.com"
+
+def get_json(path: str, params: dict):
+    """
+    GET a Gamma endpoint, going through the response cache when one is configured.
+    """
+    cache = get_cache()
+    if cache is not None:
+        data = cache.lookup_http(path, params)
+        if data is not MISS:
+            if metrics.ENABLED:
+                metrics.GAMMA_REQUESTS.inc("cache")
+            return data
+    if metrics.ENABLED:
+        metrics.GAMMA_REQUESTS.inc("api")
+    with metrics.span("gamma_request"):
+        response = requests.get(f"{GAMMA_API_URL}{path}", params=params)
+        response.raise_for_status()
+        data = response.json()
+    if cache is not None:
+        cache.record_http(path, params, data)
+    return data
+
+def market_from_events(data) -> Optional[Dict[str, Any]]:
+    """
+    Pick the market out of an /events?slug=... response.
+    """
+    # Typically returns a list of events.
+    if isinstance(data, list) and len(data) > 0:
+        # We assume the user wants the first market of the event 
+        # OR pass a market slug? 
+        # The prompt says "market slug".
+        # If the slug provided is a market slug, we might not find it in events?
+        # Polymarket slugs are usually event level. Market level slugs exist but are less common.
+        # Let's support checking both.
+        
+        # If data is a list of events, we need the markets inside.
+        event = data[0]
+        if "markets" in event:
+            # Return the list of markets or the first one?
+            # For this stage, let's assume valid event slug -> return first market or look for match?
+            # The user input in validation is --market-slug "will-there-be..." which looks like an event slug.
+            # So we return the first market of that event to match behavior.
+            return event["markets"][0]
+    
+    return None
+
+def market_from_markets(data) -> Optional[Dict[str, Any]]:
+    """
+    Pick the market out of a /markets?condition_id=... response.
+    """
+    if isinstance(data, list) and len(data) > 0:
+        return data[0]
+    if isinstance(data, dict):
+         # Some endpoints return dict directly if ID is unique
+         return data
+         
+    return None
 
 def fetch_market_by_slug(slug: str) -> Optional[Dict[str, Any]]:
     """
     Fetch market data by slug from Gamma API.
     """
-    url = f"{GAMMA_API_URL}/events"
     # Gamma API usually returns events which contain markets
     # Or we can search markets directly?
     # Let's try /markets?slug=... or similar query if possible, 
@@ -18,30 +78,10 @@ def fetch_market_by_slug(slug: str) -> Optional[Dict[str, Any]]:
     
     params = {"slug": slug}
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Typically returns a list of events.
-        if isinstance(data, list) and len(data) > 0:
-            # We assume the user wants the first market of the event 
-            # OR pass a market slug? 
-            # The prompt says "market slug".
-            # If the slug provided is a market slug, we might not find it in events?
-            # Polymarket slugs are usually event level. Market level slugs exist but are less common.
-            # Let's support checking both.
-            
-            # If data is a list of events, we need the markets inside.
-            event = data[0]
-            if "markets" in event:
-                # Return the list of markets or the first one?
-                # For this stage, let's assume valid event slug -> return first market or look for match?
-                # The user input in validation is --market-slug "will-there-be..." which looks like an event slug.
-                # So we return the first market of that event to match behavior.
-                return event["markets"][0]
-        
-        return None
+        return market_from_events(get_json("/events", params))
     except Exception as e:
+        if metrics.ENABLED:
+            metrics.GAMMA_ERRORS.inc(type(e).__name__)
         print(f"Error fetching from Gamma: {e}")
         return None
 
@@ -49,20 +89,11 @@ def fetch_market_by_id(condition_id: str) -> Optional[Dict[str, Any]]:
     """
     Fetch market by condition ID.
     """
-    url = f"{GAMMA_API_URL}/markets"
     params = {"condition_id": condition_id}
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        
-        if isinstance(data, list) and len(data) > 0:
-            return data[0]
-        if isinstance(data, dict):
-             # Some endpoints return dict directly if ID is unique
-             return data
-             
-        return None
+        return market_from_markets(get_json("/markets", params))
     except Exception as e:
+        if metrics.ENABLED:
+            metrics.GAMMA_ERRORS.inc(type(e).__name__)
         print(f"Error fetching from Gamma: {e}")
         return None
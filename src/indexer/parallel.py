@@ -0,0 +1,219 @@
+import os
+import json
+import hashlib
+import time
+import argparse
+import multiprocessing
+from typing import List, Tuple, Optional
+from dotenv import load_dotenv
+from src import metrics
+from src.indexer.rpc import reset_clients
+from src.indexer.backfill import backfill
+from src.indexer.token_index import load_index
+from src.store.writer import BatchWriter, open_store
+
+load_dotenv()
+
+# Multi-core backfill. Fetching is I/O but decoding (ABI words, price
+# division, hex/JSON formatting) is CPU-bound Python, so one process tops out
+# at one core. The block range is split into many small shards that worker
+# processes pull from a shared queue: a worker that finishes a cheap shard
+# immediately takes the next one, so dense and sparse ranges balance out
+# (work stealing by over-partitioning).
+#
+# Each worker writes its shard to a spool file (JSON Lines) and renames it
+# into place when complete; a finished spool file is the shard's checkpoint.
+# The parent merges spool files in shard order into the sink, so output order
+# matches the sequential backfill. A rerun skips shards whose spool file
+# already exists.
+#
+# Spool files only say which blocks they cover, so the spool directory also
+# holds a manifest with a digest of the run parameters (RPC endpoint, token
+# index, shard size, filters). A rerun with different parameters refuses to
+# resume from spools it did not write.
+
+Shard = Tuple[int, int]
+
+def split_shards(from_block: int, to_block: int, shard_size: int) -> List[Shard]:
+    """Split [from_block, to_block] into inclusive ranges of at most `shard_size` blocks."""
+    return [(start, min(start + shard_size - 1, to_block))
+            for start in range(from_block, to_block + 1, shard_size)]
+
+def shard_path(spool_dir: str, shard: Shard) -> str:
+    return os.path.join(spool_dir, f"shard-{shard[0]:012d}-{shard[1]:012d}.jsonl")
+
+MANIFEST = "manifest.json"
+
+def run_digest(rpc_url: str, shard_size: int, token_index: Optional[str], kwargs: dict) -> str:
+    """Digest of everything that shapes a shard's output (the RPC URL is only hashed)."""
+    index = None
+    if token_index:
+        stat = os.stat(token_index)
+        index = [os.path.abspath(token_index), stat.st_size, stat.st_mtime_ns]
+    params = {"rpc_url": rpc_url, "shard_size": shard_size, "token_index": index, "kwargs": kwargs}
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+def check_manifest(spool_dir: str, digest: str):
+    """
+    Claim `spool_dir` for the run `digest`. Raises ValueError if it holds
+    spool files of a run with different parameters.
+    """
+    path = os.path.join(spool_dir, MANIFEST)
+    spooled = any(n.startswith("shard-") for n in os.listdir(spool_dir))
+    if os.path.exists(path):
+        with open(path) as f:
+            stored = json.load(f).get("run")
+    else:
+        stored = None
+    if spooled and stored != digest:
+        raise ValueError(f"{spool_dir} holds shards of a run with different parameters; "
+                         "remove it or pass another --spool-dir")
+    if stored != digest:
+        tmp = path + ".tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"run": digest}, f)
+        os.replace(tmp, path)
+
+# --- worker side ---
+
+_worker_token_index = None
+
+def _init_worker(token_index_path: Optional[str]):
+    global _worker_token_index
+    reset_clients()
+    _worker_token_index = load_index(token_index_path) if token_index_path else None
+
+def _run_shard(task) -> Tuple[Shard, int, float]:
+    shard, spool_dir, rpc_url, kwargs = task
+    t0 = time.monotonic()
+    path = shard_path(spool_dir, shard)
+    tmp = path + ".tmp"
+    count = 0
+    with open(tmp, 'w') as f:
+        for trade in backfill(shard[0], shard[1], rpc_url=rpc_url, token_index=_worker_token_index, **kwargs):
+            f.write(json.dumps(trade) + "\n")
+            count += 1
+    os.replace(tmp, path)
+    return shard, count, time.monotonic() - t0
+
+# --- parent side ---
+
+def parallel_backfill(from_block: int, to_block: int, spool_dir: str, rpc_url: str = None,
+                      workers: int = None, shard_size: int = 1000, token_index: str = None,
+                      keep_spool: bool = False, **kwargs):
+    """
+    Backfill a block range in a process pool and yield the spooled JSON line
+    of every trade, in chain order.
+
+    Args:
+        from_block (int): First block (inclusive).
+        to_block (int): Last block (inclusive).
+        spool_dir (str): Directory for per-shard spool files / checkpoints.
+        rpc_url (str): RPC endpoint (defaults to RPC_URL).
+        workers (int): Worker processes (defaults to the CPU count).
+        shard_size (int): Blocks per shard; keep it well below range / workers.
+        token_index (str): Optional token index path; workers tag trades with it.
+        keep_spool (bool): Keep spool files after the run completes.
+        **kwargs: Passed to `iter_order_filled_logs` in each worker.
+
+    Yields:
+        str: One JSON-encoded trade per line (without the newline).
+    """
+    if not rpc_url:
+        rpc_url = os.getenv("RPC_URL")
+
+    if not rpc_url:
+        raise ValueError("RPC_URL not set")
+
+    os.makedirs(spool_dir, exist_ok=True)
+    check_manifest(spool_dir, run_digest(rpc_url, shard_size, token_index, kwargs))
+    shards = split_shards(from_block, to_block, shard_size)
+    pending = [s for s in shards if not os.path.exists(shard_path(spool_dir, s))]
+    if len(pending) < len(shards):
+        print(f"Resuming: {len(shards) - len(pending)}/{len(shards)} shards already done")
+
+    tasks = [(shard, spool_dir, rpc_url, kwargs) for shard in pending]
+    pool = multiprocessing.Pool(workers or os.cpu_count(), initializer=_init_worker, initargs=(token_index,))
+    try:
+        # imap hands out one shard at a time (chunksize=1) and yields results in
+        # submission order, so merging can start as soon as the first shard is done.
+        results = pool.imap(_run_shard, tasks, chunksize=1)
+        pending_set = set(pending)
+        for merged, shard in enumerate(shards):
+            if metrics.ENABLED:
+                # Shards not yet merged (worker metrics stay in the worker processes)
+                metrics.QUEUE_DEPTH.set(len(shards) - merged, "backfill_shards")
+            if shard in pending_set:
+                next(results)
+            with open(shard_path(spool_dir, shard)) as f:
+                for line in f:
+                    yield line.rstrip("\n")
+        if metrics.ENABLED:
+            metrics.QUEUE_DEPTH.set(0, "backfill_shards")
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    # Only drop the checkpoints once the whole range has been merged, so an
+    # interrupted run can resume from every completed shard.
+    if not keep_spool:
+        for shard in shards:
+            os.remove(shard_path(spool_dir, shard))
+        if not any(n.startswith("shard-") for n in os.listdir(spool_dir)):
+            os.remove(os.path.join(spool_dir, MANIFEST))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill OrderFilled trades using a process pool")
+    parser.add_argument("--from-block", type=int, required=True, help="First block (inclusive)")
+    parser.add_argument("--to-block", type=int, required=True, help="Last block (inclusive)")
+    parser.add_argument("--rpc-url", help="RPC endpoint (defaults to RPC_URL)")
+    parser.add_argument("--workers", type=int, help="Worker processes (defaults to CPU count)")
+    parser.add_argument("--shard-size", type=int, default=1000, help="Blocks per shard")
+    parser.add_argument("--spool-dir", default="data/spool", help="Per-shard spool files (checkpoints)")
+    parser.add_argument("--keep-spool", action="store_true", help="Keep spool files after merging")
+    parser.add_argument("--token-index", help="Tag trades using a token ID -> market index")
+    parser.add_argument("--output", help="Output file (JSON Lines, one trade per line)")
+    parser.add_argument("--store", help="Trade store: sqlite:<path> or parquet:<dir> (idempotent upsert)")
+
+    args = parser.parse_args()
+
+    try:
+        t0 = time.monotonic()
+        lines = parallel_backfill(
+            args.from_block,
+            args.to_block,
+            spool_dir=args.spool_dir,
+            rpc_url=args.rpc_url,
+            workers=args.workers,
+            shard_size=args.shard_size,
+            token_index=args.token_index,
+            keep_spool=args.keep_spool,
+        )
+
+        # Spooled lines are already JSON: only the store sink parses them
+        count = 0
+        if args.store:
+            store = open_store(args.store)
+            with BatchWriter(store) as writer:
+                for line in lines:
+                    writer.write(json.loads(line))
+                    count += 1
+            store.close()
+        elif args.output:
+            if os.path.dirname(args.output):
+                os.makedirs(os.path.dirname(args.output), exist_ok=True)
+            with open(args.output, 'w') as f:
+                for line in lines:
+                    f.write(line + "\n")
+                    count += 1
+        else:
+            for line in lines:
+                print(line)
+                count += 1
+
+        print(f"Backfilled {count} trades from blocks {args.from_block}-{args.to_block} "
+              f"in {time.monotonic() - t0:.2f}s.")
+
+    except Exception as e:
+        print(f"Error: {e}")
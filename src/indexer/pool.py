@@ -0,0 +1,370 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit, urlunsplit, parse_qs
+from typing import Optional, Dict, Any, List, Tuple
+import requests
+from src import metrics
+
+# Multi-endpoint JSON-RPC pool.
+#
+# RPC_URL may list several providers, comma-separated. Each one gets its own
+# keep-alive session, an optional token-bucket rate limit and a health record:
+# an EWMA of its latency, an EWMA of its failure rate (decaying over time so a
+# recovered provider gets traffic again) and a cooldown after a 429, timeout or
+# server error (Retry-After when the provider sends one, else doubling per
+# consecutive failure). Every request goes to the healthiest endpoint that has
+# a token; a failed request moves straight on to the next one (failover), and
+# only when every endpoint failed does the error reach the client's own retry
+# and backoff.
+#
+# Hedging (RPC_HEDGE) is for calls where the tail matters, like receipts of
+# live transactions: when the first endpoint has not answered after the hedge
+# delay, the same request is sent to a second endpoint and the first answer
+# wins. The delay is fixed (RPC_HEDGE=0.2) or the primary's recent p95
+# (RPC_HEDGE=auto). Only read-only calls in HEDGE_METHODS are hedged.
+#
+# Endpoint syntax: "https://a/KEY,https://b/KEY#rps=25" - the fragment (never
+# sent) sets that endpoint's requests per second; RPC_RATE_LIMIT is the
+# default for endpoints without one. A single URL without a rate limit takes
+# the plain session path, as before.
+
+HEDGE_METHODS = {"eth_getTransactionReceipt", "eth_blockNumber", "eth_getBlockByNumber", "eth_chainId"}
+
+# Failures that move a request to the next endpoint
+FAILOVER_ERRORS = (requests.ConnectionError, requests.Timeout, requests.HTTPError, ValueError)
+
+LATENCY_ALPHA = 0.2
+ERROR_ALPHA = 0.3
+# Seconds for the failure score to halve without new failures
+ERROR_HALF_LIFE = 30.0
+# Seconds of latency one unit of failure score is worth when ranking endpoints
+ERROR_PENALTY = 2.0
+MAX_COOLDOWN = 30.0
+
+class Throttled(requests.HTTPError):
+    """The endpoint answered 429 (HTTP status or JSON-RPC error)."""
+
+    def __init__(self, message: str, retry_after: float = None, **kwargs):
+        super().__init__(message, **kwargs)
+        self.retry_after = retry_after
+
+def split_urls(rpc_url: str) -> List[Tuple[str, Optional[float]]]:
+    """'url1,url2#rps=10' -> [(url1, None), (url2, 10.0)]"""
+    endpoints = []
+    for part in rpc_url.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        url, _, fragment = part.partition("#")
+        rate = parse_qs(fragment).get("rps")
+        endpoints.append((url, float(rate[-1]) if rate else None))
+    return endpoints
+
+def _label(url: str) -> str:
+    # Host only: paths and query strings often carry API keys
+    parts = urlsplit(url)
+    return parts.netloc.rpartition("@")[2] or urlunsplit(parts)
+
+def _retry_after(value) -> Optional[float]:
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+class Endpoint:
+    """
+    One provider: token bucket plus health record. Mutated under the pool lock.
+
+    Args:
+        url (str): Endpoint URL.
+        rate (float, optional): Requests per second; None for unlimited.
+        burst (float, optional): Bucket size (defaults to one second of `rate`).
+    """
+
+    def __init__(self, url: str, rate: float = None, burst: float = None, label: str = None):
+        self.url = url
+        self.label = label or _label(url)
+        self.rate = rate
+        self.burst = burst or max(1.0, rate or 0.0)
+        self.tokens = self.burst
+        self.refilled = time.monotonic()
+        self.latency: Optional[float] = None
+        self.errors = 0.0
+        self.errors_at = 0.0
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.in_flight = 0
+        self.samples: deque = deque(maxlen=200)
+        self.requests = 0
+        self.failures = 0
+        self._session = None
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=32)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def token_wait(self, now: float) -> float:
+        """Seconds until a token is available (0 when one is)."""
+        if self.rate is None:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.rate)
+        self.refilled = now
+        return 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.rate
+
+    def error_score(self, now: float) -> float:
+        return self.errors * 0.5 ** ((now - self.errors_at) / ERROR_HALF_LIFE)
+
+    def score(self, now: float) -> float:
+        """Expected cost of sending here; lower is better. Unmeasured endpoints score 0 so they get tried."""
+        latency = self.latency or 0.0
+        return latency * (1 + self.in_flight) + ERROR_PENALTY * self.error_score(now)
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) < 20:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+    def status(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "endpoint": self.label,
+            "latency_ms": None if self.latency is None else round(self.latency * 1000, 2),
+            "error_score": round(self.error_score(now), 3),
+            "cooldown_seconds": round(max(0.0, self.cooldown_until - now), 2),
+            "rate_limit": self.rate,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+class EndpointPool:
+    """
+    Endpoint selection, rate limiting, failover and hedging for RPCClient
+    (the async client shares `acquire` / `report_*`).
+
+    Args:
+        endpoints (list): (url, rate) pairs as returned by split_urls.
+        rate_limit (float, optional): Default requests per second per endpoint.
+        hedge (str | float, optional): Hedge delay in seconds, "auto" for the primary's p95, None to disable.
+        max_workers (int): Threads for hedged requests.
+    """
+
+    def __init__(self, endpoints: List[Tuple[str, Optional[float]]], rate_limit: float = None,
+                 hedge=None, max_workers: int = 32):
+        if not endpoints:
+            raise ValueError("No RPC endpoint configured")
+        labels = [_label(url) for url, _ in endpoints]
+        self.endpoints = [
+            Endpoint(url, rate if rate is not None else rate_limit,
+                     label=label if labels.count(label) == 1 else f"{label}#{i}")
+            for i, ((url, rate), label) in enumerate(zip(endpoints, labels))
+        ]
+        self.hedge = None if hedge in (None, "", "0", 0, "off") else hedge
+        if self.hedge not in (None, "auto"):
+            self.hedge = float(self.hedge)
+        self.lock = threading.Lock()
+        self.max_workers = max_workers
+        self._executor = None
+        # One unlimited endpoint: nothing to choose, keep the plain path
+        self.single = len(self.endpoints) == 1 and self.endpoints[0].rate is None
+        if metrics.ENABLED:
+            for endpoint in self.endpoints:
+                metrics.RPC_ENDPOINT_LATENCY.set_function(lambda e=endpoint: e.latency or 0.0, endpoint.label)
+
+    @classmethod
+    def from_url(cls, rpc_url: str, **kwargs) -> "EndpointPool":
+        """Pool for a comma-separated RPC_URL; RPC_RATE_LIMIT / RPC_HEDGE fill unset options."""
+        if "rate_limit" not in kwargs and os.getenv("RPC_RATE_LIMIT"):
+            kwargs["rate_limit"] = float(os.getenv("RPC_RATE_LIMIT"))
+        if "hedge" not in kwargs:
+            kwargs["hedge"] = os.getenv("RPC_HEDGE") or None
+        return cls(split_urls(rpc_url), **kwargs)
+
+    @property
+    def hedging(self) -> bool:
+        return self.hedge is not None and len(self.endpoints) > 1
+
+    def status(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [endpoint.status() for endpoint in self.endpoints]
+
+    # --- selection ---
+
+    def pick(self, exclude=()) -> Tuple[Optional[Endpoint], float]:
+        """
+        Take a token from the best endpoint not in `exclude`.
+
+        Returns (endpoint, 0), or (None, seconds until a token frees up), or
+        (None, -1) when every endpoint is excluded. Endpoints cooling down are
+        only used when all candidates are.
+        """
+        with self.lock:
+            now = time.monotonic()
+            candidates = [e for e in self.endpoints if e not in exclude]
+            if not candidates:
+                return None, -1.0
+            healthy = [e for e in candidates if e.cooldown_until <= now] or candidates
+            ready = [e for e in healthy if e.token_wait(now) == 0.0]
+            if not ready:
+                return None, min(e.token_wait(now) for e in healthy)
+            endpoint = min(ready, key=lambda e: e.score(now))
+            if endpoint.rate is not None:
+                endpoint.tokens -= 1.0
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint, 0.0
+
+    def acquire(self, exclude=(), block: bool = True) -> Optional[Endpoint]:
+        """Best endpoint not in `exclude`, waiting for a rate-limit token if `block`."""
+        while True:
+            endpoint, delay = self.pick(exclude)
+            if endpoint is not None or delay < 0 or not block:
+                return endpoint
+            time.sleep(delay)
+
+    def report_success(self, endpoint: Endpoint, seconds: float):
+        with self.lock:
+            endpoint.in_flight -= 1
+            endpoint.latency = seconds if endpoint.latency is None else \
+                (1 - LATENCY_ALPHA) * endpoint.latency + LATENCY_ALPHA * seconds
+            endpoint.samples.append(seconds)
+            endpoint.strikes = 0
+            endpoint.cooldown_until = 0.0
+        if metrics.ENABLED:
+            metrics.RPC_ENDPOINT_REQUESTS.inc(endpoint.label, "ok")
+
+    def report_failure(self, endpoint: Endpoint, reason: str, retry_after: float = None,
+                       seconds: float = None, done: bool = True):
+        """
+        Record a failed request. `reason` is "throttled", "timeout" or "error";
+        `done=False` marks a throttled item inside an otherwise answered batch.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if done:
+                endpoint.in_flight -= 1
+            endpoint.errors = (1 - ERROR_ALPHA) * endpoint.error_score(now) + ERROR_ALPHA
+            endpoint.errors_at = now
+            endpoint.failures += 1
+            if reason == "timeout" and seconds is not None:
+                # A timeout is at least this slow
+                endpoint.latency = max(endpoint.latency or 0.0, seconds)
+            if retry_after is None:
+                retry_after = min(MAX_COOLDOWN, (1.0 if reason == "throttled" else 0.5) * 2 ** endpoint.strikes)
+            endpoint.strikes += 1
+            endpoint.cooldown_until = max(endpoint.cooldown_until, now + retry_after)
+        if metrics.ENABLED:
+            metrics.RPC_ENDPOINT_REQUESTS.inc(endpoint.label, reason)
+
+    # --- requests ---
+
+    def _send(self, endpoint: Endpoint, payload, timeout: float):
+        t0 = time.perf_counter()
+        try:
+            response = endpoint.session.post(endpoint.url, json=payload, timeout=timeout)
+            if response.status_code == 429:
+                raise Throttled(f"429 Too Many Requests from {endpoint.label}",
+                                _retry_after(response.headers.get("Retry-After")), response=response)
+            response.raise_for_status()
+            body = response.json()
+            if isinstance(body, dict) and (body.get("error") or {}).get("code") == 429:
+                raise Throttled(f"Rate limited by {endpoint.label}: {body['error'].get('message')}")
+        except Throttled as e:
+            self.report_failure(endpoint, "throttled", e.retry_after)
+            raise
+        except requests.Timeout:
+            self.report_failure(endpoint, "timeout", seconds=time.perf_counter() - t0)
+            raise
+        except FAILOVER_ERRORS:
+            self.report_failure(endpoint, "error")
+            raise
+        except BaseException:
+            with self.lock:
+                endpoint.in_flight -= 1
+            raise
+        self.report_success(endpoint, time.perf_counter() - t0)
+        if isinstance(body, list) and any((item.get("error") or {}).get("code") == 429
+                                          for item in body if isinstance(item, dict)):
+            # Partly throttled batch: the client resends those items; steer them elsewhere
+            self.report_failure(endpoint, "throttled", done=False)
+        return body
+
+    def post(self, payload, timeout: float, hedge: bool = False):
+        """
+        POST `payload` to the best endpoint, failing over to the others on
+        429s, timeouts, connection and HTTP errors. Raises the last error when
+        every endpoint failed.
+        """
+        if self.single:
+            endpoint = self.endpoints[0]
+            response = endpoint.session.post(endpoint.url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            return response.json()
+
+        tried: List[Endpoint] = []
+        last_error = None
+        while True:
+            endpoint = self.acquire(tried)
+            if endpoint is None:
+                raise last_error
+            tried.append(endpoint)
+            try:
+                if hedge and self.hedging:
+                    return self._post_hedged(endpoint, payload, timeout, tried)
+                return self._send(endpoint, payload, timeout)
+            except FAILOVER_ERRORS as e:
+                last_error = e
+                if metrics.ENABLED and len(tried) < len(self.endpoints):
+                    metrics.RPC_FAILOVERS.inc(endpoint.label)
+
+    def _hedge_delay(self, endpoint: Endpoint) -> float:
+        if self.hedge != "auto":
+            return self.hedge
+        with self.lock:
+            p95 = endpoint.p95()
+            latency = endpoint.latency
+        if p95 is not None:
+            return p95
+        # Too few samples yet: a generous multiple of the mean
+        return 3 * latency if latency else 0.25
+
+    def _post_hedged(self, primary: Endpoint, payload, timeout: float, tried: List[Endpoint]):
+        if self._executor is None:
+            with self.lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="rpc-hedge")
+        first = self._executor.submit(self._send, primary, payload, timeout)
+        done, _ = wait([first], timeout=self._hedge_delay(primary))
+        if done:
+            return first.result()
+        # Only hedge onto an endpoint that has a token right now
+        backup = self.acquire(tried, block=False)
+        if backup is None:
+            return first.result()
+        tried.append(backup)
+        if metrics.ENABLED:
+            metrics.RPC_HEDGES.inc("sent")
+        second = self._executor.submit(self._send, backup, payload, timeout)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    body = future.result()
+                except FAILOVER_ERRORS as e:
+                    error = e
+                    continue
+                if metrics.ENABLED:
+                    metrics.RPC_HEDGES.inc("won" if future is second else "lost")
+                return body
+        raise error
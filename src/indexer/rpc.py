@@ -0,0 +1,278 @@
+import time
+import itertools
+import threading
+import requests
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple, Union
+from src import metrics
+from src.raw_decoder import to_checksum_address
+from src.indexer.cache import ResponseCache, MISS, get_cache, reset_cache
+from src.indexer.pool import EndpointPool, HEDGE_METHODS
+
+# Shared JSON-RPC client.
+# One keep-alive requests.Session per endpoint, with JSON-RPC batch support.
+# A comma-separated RPC_URL spreads the calls over several providers (see
+# src.indexer.pool).
+
+class RPCError(Exception):
+    """Error object returned by the node for a single call."""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        super().__init__(f"RPC error {code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data
+
+# Node error codes worth retrying (internal error / resource unavailable /
+# rate limited). Everything else (bad params, range limits, ...) is final.
+TRANSIENT_CODES = {-32000, -32002, -32603, 429}
+
+def _is_transient(error: "RPCError") -> bool:
+    return error.code in TRANSIENT_CODES
+
+class RPCClient:
+    """
+    JSON-RPC client that reuses one HTTP connection pool.
+
+    Args:
+        rpc_url (str): Endpoint URL, or several comma-separated (see src.indexer.pool).
+        batch_size (int): Max calls packed into one JSON-RPC batch request.
+        max_retries (int): Retries for failed calls (only the failed items of a batch are resent).
+        backoff (float): Base sleep between retries, doubled each attempt.
+        timeout (float): HTTP timeout in seconds.
+        cache (ResponseCache, optional): Response cache (defaults to the one configured by CACHE_MODE).
+        pool (EndpointPool, optional): Endpoint pool (defaults to one built from `rpc_url`, RPC_RATE_LIMIT and RPC_HEDGE).
+    """
+
+    def __init__(self, rpc_url: str, batch_size: int = 100, max_retries: int = 3,
+                 backoff: float = 0.5, timeout: float = 30.0, cache: ResponseCache = None,
+                 pool: EndpointPool = None):
+        self.rpc_url = rpc_url
+        self.cache = cache if cache is not None else get_cache()
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.pool = pool if pool is not None else EndpointPool.from_url(rpc_url)
+        self._ids = itertools.count(1)
+
+    def _hedge(self, payload) -> bool:
+        if not self.pool.hedging:
+            return False
+        if isinstance(payload, dict):
+            return payload["method"] in HEDGE_METHODS
+        return all(item["method"] in HEDGE_METHODS for item in payload)
+
+    def _post(self, payload):
+        if metrics.ENABLED:
+            return self._post_measured(payload)
+        return self.pool.post(payload, self.timeout, self._hedge(payload))
+
+    def _post_measured(self, payload):
+        if isinstance(payload, dict):
+            label = payload["method"]
+        else:
+            label = "batch:" + payload[0]["method"] if payload else "batch"
+        t0 = time.perf_counter()
+        try:
+            body = self.pool.post(payload, self.timeout, self._hedge(payload))
+        except Exception as e:
+            metrics.RPC_ERRORS.inc(label, type(e).__name__)
+            raise
+        finally:
+            metrics.RPC_SECONDS.observe(time.perf_counter() - t0, label)
+        for item in (body if isinstance(body, list) else (body,)):
+            if isinstance(item, dict) and "error" in item:
+                metrics.RPC_ERRORS.inc(label, str(item["error"].get("code")))
+        return body
+
+    def _record(self, method: str, params: list, result):
+        if self.cache.wants_head(method, params, result):
+            self.cache.set_head(int(self._call("eth_blockNumber"), 16))
+        self.cache.record_rpc(method, params, result)
+
+    def call(self, method: str, params: list = None):
+        """Single call; node errors raise RPCError, transport errors are retried."""
+        if self.cache is None:
+            return self._call(method, params)
+        result = self.cache.lookup_rpc(method, params)
+        if result is MISS:
+            result = self._call(method, params)
+            self._record(method, params, result)
+        return result
+
+    def _call(self, method: str, params: list = None):
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or []}
+        for attempt in range(self.max_retries + 1):
+            try:
+                body = self._post(payload)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+                if attempt == self.max_retries:
+                    raise
+                if metrics.ENABLED:
+                    metrics.RPC_RETRIES.inc(method)
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            if "error" in body:
+                error = body["error"]
+                error = RPCError(error.get("code"), error.get("message"), error.get("data"))
+                if not _is_transient(error) or attempt == self.max_retries:
+                    raise error
+                if metrics.ENABLED:
+                    metrics.RPC_RETRIES.inc(method)
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+            return body.get("result")
+
+    def batch_call(self, calls: List[Tuple[str, list]], raise_errors: bool = False) -> List[Any]:
+        """
+        Send many calls as JSON-RPC batches of `batch_size`.
+
+        Returns results aligned with `calls`. Items that come back with a
+        transient error (or are missing from the batch response) are retried
+        on their own. An item that fails for good (a non-transient error, or
+        still failing after `max_retries`) holds its RPCError in place of a
+        result, so one bad call does not cost the rest of the batch; with
+        `raise_errors` the first such error is raised instead.
+        """
+        if self.cache is None:
+            results = self._batch_call(calls)
+        else:
+            results: List[Any] = [None] * len(calls)
+            missing = []
+            for index, (method, params) in enumerate(calls):
+                result = self.cache.lookup_rpc(method, params)
+                if result is MISS:
+                    missing.append(index)
+                else:
+                    results[index] = result
+            if missing:
+                fetched = self._batch_call([calls[index] for index in missing])
+                for index, result in zip(missing, fetched):
+                    results[index] = result
+                    # A refused call is not a response; it is asked again next time
+                    if not isinstance(result, RPCError):
+                        self._record(*calls[index], result)
+        if raise_errors:
+            for result in results:
+                if isinstance(result, RPCError):
+                    raise result
+        return results
+
+    def _batch_call(self, calls: List[Tuple[str, list]]) -> List[Any]:
+        results: List[Any] = [None] * len(calls)
+        pending = list(range(len(calls)))
+        last_error: Dict[int, Exception] = {}
+
+        for attempt in range(self.max_retries + 1):
+            failed = []
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                ids = {}
+                payload = []
+                for index in chunk:
+                    request_id = next(self._ids)
+                    ids[request_id] = index
+                    method, params = calls[index]
+                    payload.append({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+
+                try:
+                    body = self._post(payload)
+                except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                    for index in chunk:
+                        last_error[index] = e
+                    failed.extend(chunk)
+                    continue
+
+                if isinstance(body, dict):
+                    # Some providers answer a rejected batch with one error object
+                    body = [dict(body, id=request_id) for request_id in ids]
+
+                answered = set()
+                for item in body:
+                    index = ids.get(item.get("id"))
+                    if index is None:
+                        continue
+                    answered.add(index)
+                    if "error" in item:
+                        error = item["error"]
+                        error = RPCError(error.get("code"), error.get("message"), error.get("data"))
+                        if _is_transient(error):
+                            last_error[index] = error
+                            failed.append(index)
+                        else:
+                            results[index] = error
+                    else:
+                        results[index] = item.get("result")
+                for index in chunk:
+                    if index not in answered:
+                        last_error[index] = RPCError(-32603, "missing from batch response")
+                        failed.append(index)
+
+            pending = sorted(failed)
+            if not pending:
+                break
+            if attempt < self.max_retries:
+                if metrics.ENABLED:
+                    metrics.RPC_RETRIES.inc("batch:" + calls[pending[0]][0], amount=len(pending))
+                time.sleep(self.backoff * 2 ** attempt)
+
+        for index in pending:
+            if not isinstance(last_error[index], RPCError):
+                # The endpoint itself kept failing; there is nothing to return
+                raise last_error[index]
+            results[index] = last_error[index]
+        return results
+
+    def get_receipts(self, tx_hashes: List[str]) -> List[Union[Dict[str, Any], RPCError, None]]:
+        """
+        Raw receipts (hex-string JSON) aligned with `tx_hashes`; None if
+        unknown, the RPCError if the node refused that hash.
+        """
+        return self.batch_call([("eth_getTransactionReceipt", [h]) for h in tx_hashes])
+
+    def get_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        return self.call("eth_getTransactionReceipt", [tx_hash])
+
+    def get_logs(self, flt: dict) -> list:
+        return self.call("eth_getLogs", [flt])
+
+_checksum_address = lru_cache(maxsize=1024)(to_checksum_address)
+
+_clients: Dict[str, RPCClient] = {}
+_clients_lock = threading.Lock()
+
+def get_client(rpc_url: str, **kwargs) -> RPCClient:
+    """Process-wide client per endpoint so every caller shares one connection pool."""
+    with _clients_lock:
+        client = _clients.get(rpc_url)
+        if client is None:
+            client = RPCClient(rpc_url, **kwargs)
+            _clients[rpc_url] = client
+        elif "batch_size" in kwargs:
+            client.batch_size = kwargs["batch_size"]
+        return client
+
+def reset_clients():
+    """
+    Forget the shared clients and response cache. Called in forked worker
+    processes so they do not reuse the parent's sockets / SQLite connection.
+    """
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+    reset_cache()
+
+def format_log(log: dict) -> dict:
+    """
+    Convert a raw JSON-RPC log to the field types web3 produces for the
+    fields the decoders read (checksummed address, int indexes).
+    Topics and data stay as hex strings; the raw decoder reads either form.
+    """
+    formatted = dict(log)
+    formatted["address"] = _checksum_address(log["address"])
+    for key in ("logIndex", "blockNumber", "transactionIndex"):
+        value = log.get(key)
+        if isinstance(value, str):
+            formatted[key] = int(value, 16)
+    return formatted
@@ -0,0 +1,217 @@
+import os
+import json
+import mmap
+import struct
+import argparse
+from typing import Optional, Dict, NamedTuple, Union
+from src.ctf.derive import derive_binary_positions
+
+# Reverse index: position / token ID -> market.
+#
+# In memory it is a dict keyed by the integer token ID. On disk it is an
+# open-addressing hash table of fixed-size records, so a saved index can be
+# mmap-ed and queried in O(1) without loading it:
+#
+#   header: magic(4) version(u32) slot_count(u64) entry_count(u64)
+#   slot:   token_id(32) condition_id(32) question_id(32) outcome(u8) flags(u8)
+#
+# Token IDs are keccak outputs, so their low 64 bits are already a good hash.
+
+MAGIC = b"PMTI"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQ")
+SLOT = struct.Struct("<32s32s32sBB")
+FLAG_USED = 1
+FLAG_NEG_RISK = 2
+
+class TokenInfo(NamedTuple):
+    condition_id: str
+    outcome_index: int
+    question_id: Optional[str]
+    neg_risk: bool
+
+TokenKey = Union[int, str]
+
+def token_key(token_id: TokenKey) -> int:
+    """Accepts an int, a 0x-hex string (as in trade['token_id']) or a decimal string (Gamma clobTokenIds)."""
+    if isinstance(token_id, int):
+        return token_id
+    if token_id.startswith("0x"):
+        return int(token_id, 16)
+    return int(token_id)
+
+def _hex_bytes(value: Optional[str]) -> bytes:
+    if not value:
+        return b"\x00" * 32
+    value = value[2:] if value.startswith("0x") else value
+    return bytes.fromhex(value.rjust(64, "0"))
+
+def _bytes_hex(value: bytes) -> Optional[str]:
+    if value == b"\x00" * 32:
+        return None
+    return "0x" + value.hex()
+
+def _slot_for(token: int, mask: int) -> int:
+    return token & mask
+
+class TokenIndex:
+    """In-memory token ID -> TokenInfo map."""
+
+    def __init__(self):
+        self.entries: Dict[int, TokenInfo] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, token_id: TokenKey, condition_id: str, outcome_index: int,
+            question_id: str = None, neg_risk: bool = False):
+        condition_id = condition_id if condition_id.startswith("0x") else "0x" + condition_id
+        if question_id and not question_id.startswith("0x"):
+            question_id = "0x" + question_id
+        self.entries[token_key(token_id)] = TokenInfo(condition_id.lower(), outcome_index,
+                                                      question_id.lower() if question_id else None,
+                                                      bool(neg_risk))
+
+    def add_derived(self, derived: dict, question_id: str = None, neg_risk: bool = False):
+        """Add the YES/NO tokens of a `derive_binary_positions` result (hex IDs)."""
+        self.add(int(derived["yesTokenId"], 16), derived["conditionId"], 0, question_id, neg_risk)
+        self.add(int(derived["noTokenId"], 16), derived["conditionId"], 1, question_id, neg_risk)
+
+    def add_gamma_market(self, market: dict):
+        """
+        Add a Gamma market. Uses `clobTokenIds` when present (outcome i ->
+        token i), otherwise derives the binary positions from oracle/questionID.
+        """
+        condition_id = market.get("conditionId")
+        question_id = market.get("questionID")
+        neg_risk = bool(market.get("negRisk"))
+        if not condition_id:
+            return
+
+        tokens = market.get("clobTokenIds")
+        if isinstance(tokens, str):
+            tokens = json.loads(tokens) if tokens else None
+        if tokens:
+            for outcome_index, token in enumerate(tokens):
+                self.add(token, condition_id, outcome_index, question_id, neg_risk)
+            return
+
+        if market.get("oracle") or question_id:
+            derived = derive_binary_positions(
+                oracle=market.get("oracle"),
+                question_id=question_id,
+                condition_id=condition_id,
+                collateral_token=market.get("collateralToken"),
+            )
+            self.add_derived(derived, question_id, neg_risk)
+
+    def add_catalog(self, catalog):
+        """Add every market of a src.indexer.catalog.MarketCatalog."""
+        for market in catalog.iter_markets():
+            self.add_gamma_market(market)
+
+    def get(self, token_id: TokenKey) -> Optional[TokenInfo]:
+        return self.entries.get(token_key(token_id))
+
+    def save(self, path: str):
+        """Write the mmap-able hash table (load factor <= 0.5)."""
+        slot_count = 1
+        while slot_count < 2 * max(len(self.entries), 1):
+            slot_count <<= 1
+        mask = slot_count - 1
+
+        table = bytearray(HEADER.size + slot_count * SLOT.size)
+        HEADER.pack_into(table, 0, MAGIC, VERSION, slot_count, len(self.entries))
+        used = bytearray(slot_count)
+        for token, info in self.entries.items():
+            slot = _slot_for(token, mask)
+            while used[slot]:
+                slot = (slot + 1) & mask
+            used[slot] = 1
+            flags = FLAG_USED | (FLAG_NEG_RISK if info.neg_risk else 0)
+            SLOT.pack_into(table, HEADER.size + slot * SLOT.size,
+                           token.to_bytes(32, "big"), _hex_bytes(info.condition_id),
+                           _hex_bytes(info.question_id), info.outcome_index, flags)
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(table)
+        os.replace(tmp, path)
+
+class MappedTokenIndex:
+    """Read-only view over a saved index; lookups probe the mmap directly."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slot_count, self.entry_count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a token index file")
+        self.mask = self.slot_count - 1
+
+    def __len__(self):
+        return self.entry_count
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def get(self, token_id: TokenKey) -> Optional[TokenInfo]:
+        token = token_key(token_id)
+        key = token.to_bytes(32, "big")
+        slot = _slot_for(token, self.mask)
+        while True:
+            offset = HEADER.size + slot * SLOT.size
+            stored, condition_id, question_id, outcome_index, flags = SLOT.unpack_from(self.map, offset)
+            if not flags & FLAG_USED:
+                return None
+            if stored == key:
+                return TokenInfo(_bytes_hex(condition_id), outcome_index,
+                                 _bytes_hex(question_id), bool(flags & FLAG_NEG_RISK))
+            slot = (slot + 1) & self.mask
+
+    def to_memory(self) -> TokenIndex:
+        index = TokenIndex()
+        for slot in range(self.slot_count):
+            stored, condition_id, question_id, outcome_index, flags = SLOT.unpack_from(
+                self.map, HEADER.size + slot * SLOT.size)
+            if flags & FLAG_USED:
+                index.entries[int.from_bytes(stored, "big")] = TokenInfo(
+                    _bytes_hex(condition_id), outcome_index, _bytes_hex(question_id), bool(flags & FLAG_NEG_RISK))
+        return index
+
+def load_index(path: str) -> TokenIndex:
+    """Load a saved index fully into memory (fastest lookups)."""
+    mapped = MappedTokenIndex(path)
+    try:
+        return mapped.to_memory()
+    finally:
+        mapped.close()
+
+def tag_trade(trade: dict, index) -> dict:
+    """Attach the market of trade['token_id'] in place (None fields if unknown)."""
+    info = index.get(trade["token_id"])
+    trade["condition_id"] = info.condition_id if info else None
+    trade["outcome_index"] = info.outcome_index if info else None
+    trade["question_id"] = info.question_id if info else None
+    trade["neg_risk"] = info.neg_risk if info else None
+    return trade
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the token ID -> market reverse index")
+    parser.add_argument("--catalog", required=True, help="Local Gamma catalog (see src.indexer.catalog)")
+    parser.add_argument("--output", default="data/token_index.bin", help="Index file path")
+
+    args = parser.parse_args()
+
+    try:
+        from src.indexer.catalog import MarketCatalog
+        catalog = MarketCatalog(args.catalog)
+        index = TokenIndex()
+        index.add_catalog(catalog)
+        index.save(args.output)
+        print(f"Indexed {len(index)} tokens into {args.output}")
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,434 @@
+import os
+import json
+import struct
+import argparse
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+from dotenv import load_dotenv
+from src.trade import Trade
+
+load_dotenv()
+
+# Per-address position and cash ledger built from fills.
+#
+# State is address -> token -> Position(balance, cost, realized), all integers
+# in base units; token 0 (the exchange's asset ID for USDC) holds the
+# address's net USDC flow. Cost basis uses average cost: a buy adds its USDC
+# to the cost, a sell removes the sold share of the cost and books the
+# difference to the USDC received as realized P&L.
+#
+# Durability: every applied batch is appended to a delta log as one frame of
+# fixed-size (address, token, d_balance, d_cost, d_realized) records; the
+# deltas are the resulting state changes, so replaying them needs no logic
+# beyond addition. Amounts are uint256 on chain, so the three deltas are
+# signed 256-bit fields, and a fill's records are encoded before the fill
+# touches memory: one that cannot be logged is not applied at all. A snapshot stores the full state plus the log position it
+# covers; restart = load snapshot + replay the log tail. `compact` writes a
+# snapshot and starts a new log generation.
+#
+# Which fills to apply: the exchange emits one OrderFilled per maker order
+# (maker = order owner, taker = counterparty) and one for the taker order
+# (taker = exchange), which decode_trades drops. `apply_fill(mirror=True)`
+# books the counterparty's side as the mirror image of each maker fill;
+# that is exact for direct fills and complementary matches, but not for
+# MINT / MERGE matches where both sides buy (or sell). `apply_dispatched`
+# uses the taker-order fill from the dispatcher instead and is exact for
+# every match type. Exchange fees are not included.
+
+_LOG_HEADER = struct.Struct("<4sI")           # magic, generation
+_FRAME = struct.Struct("<4sIqq")              # magic, record count, block, log index
+_DELTA = struct.Struct("<20s32s32s32s32s")    # address, token, d_balance, d_cost, d_realized (signed)
+_SNAPSHOT = struct.Struct("<4sHIqqQQ")        # magic, version, generation, block, log index, log offset, count
+
+LOG_MAGIC = b"PMLG"
+FRAME_MAGIC = b"PMLD"
+SNAPSHOT_MAGIC = b"PMLS"
+
+USDC = 0
+
+class Position:
+    """Balance, cost basis and realized P&L of one (address, token)."""
+
+    __slots__ = ("balance", "cost", "realized")
+
+    def __init__(self, balance: int = 0, cost: int = 0, realized: int = 0):
+        self.balance = balance
+        self.cost = cost
+        self.realized = realized
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"balance": str(self.balance), "cost": str(self.cost), "realized": str(self.realized)}
+
+    def __repr__(self):
+        return f"Position(balance={self.balance}, cost={self.cost}, realized={self.realized})"
+
+def _address_bytes(address: str) -> bytes:
+    return bytes.fromhex(address[2:])
+
+def _int256(value: int) -> bytes:
+    return value.to_bytes(32, "big", signed=True)
+
+def _from_int256(value: bytes) -> int:
+    return int.from_bytes(value, "big", signed=True)
+
+def _fill_fields(fill) -> tuple:
+    if isinstance(fill, Trade):
+        return (fill.maker, fill.taker, fill.maker_asset_id, fill.taker_asset_id,
+                fill.maker_amount, fill.taker_amount, fill.block_number, fill.log_index)
+    return (fill["maker"], fill["taker"], int(fill["maker_asset_id"]), int(fill["taker_asset_id"]),
+            int(fill["maker_amount"]), int(fill["taker_amount"]), fill.get("block_number"),
+            int(fill["log_index"]))
+
+class Ledger:
+    """
+    In-memory ledger with snapshot + append-only delta log persistence.
+
+    Args:
+        directory (str, optional): Where `ledger.snapshot` and `ledger.log`
+            live. Without it the ledger is memory-only.
+        sync (bool): fsync the log after every frame.
+    """
+
+    def __init__(self, directory: str = None, sync: bool = False):
+        self.positions: Dict[str, Dict[int, Position]] = {}
+        # (block_number, log_index) of the last applied fill
+        self.last_key: Tuple[int, int] = (-1, -1)
+        self.directory = directory
+        self.sync = sync
+        self.generation = 0
+        self.log = None
+        # Encoded delta records not yet flushed to the log
+        self._pending: List[bytes] = []
+        # Fills skipped because they sort at or before last_key
+        self.skipped = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._recover()
+
+    # --- queries ---
+
+    def position(self, address: str, token: int) -> Optional[Position]:
+        return self.positions.get(address.lower(), {}).get(token)
+
+    def positions_of(self, address: str) -> Dict[int, Position]:
+        """token -> Position for `address` (token 0 = net USDC flow)."""
+        return self.positions.get(address.lower(), {})
+
+    def cash(self, address: str) -> int:
+        position = self.position(address, USDC)
+        return position.balance if position else 0
+
+    def __len__(self):
+        return sum(len(tokens) for tokens in self.positions.values())
+
+    # --- updates ---
+
+    def _delta(self, address: str, token: int, d_balance: int, d_cost: int = 0, d_realized: int = 0):
+        address = address.lower()
+        if self.log is not None:
+            # Encode before applying, so a delta that does not fit leaves memory untouched
+            self._pending.append(_DELTA.pack(_address_bytes(address), token.to_bytes(32, "big"),
+                                             _int256(d_balance), _int256(d_cost), _int256(d_realized)))
+        self._add(address, token, d_balance, d_cost, d_realized)
+
+    def _add(self, address: str, token: int, d_balance: int, d_cost: int, d_realized: int):
+        tokens = self.positions.get(address)
+        if tokens is None:
+            tokens = self.positions[address] = {}
+        position = tokens.get(token)
+        if position is None:
+            position = tokens[token] = Position()
+        position.balance += d_balance
+        position.cost += d_cost
+        position.realized += d_realized
+
+    def _book(self, trades: List[tuple]):
+        """
+        Book (address, give_asset, give_amount, recv_asset, recv_amount)
+        trades as one unit: if any delta cannot be encoded, the ones already
+        applied are undone and the error is raised.
+        """
+        mark = len(self._pending)
+        try:
+            for trade in trades:
+                self._trade(*trade)
+        except (OverflowError, struct.error):
+            for address, token, d_balance, d_cost, d_realized in reversed(
+                    list(_DELTA.iter_unpack(b"".join(self._pending[mark:])))):
+                self._add("0x" + address.hex(), int.from_bytes(token, "big"), -_from_int256(d_balance),
+                          -_from_int256(d_cost), -_from_int256(d_realized))
+            del self._pending[mark:]
+            raise
+
+    def _trade(self, address: str, give_asset: int, give_amount: int, recv_asset: int, recv_amount: int):
+        """`address` gives `give_amount` of one asset and receives `recv_amount` of the other."""
+        if give_asset == USDC:
+            # buy: pay USDC, receive tokens at cost
+            self._delta(address, USDC, -give_amount)
+            self._delta(address, recv_asset, recv_amount, give_amount)
+            return
+        # sell: give tokens, receive USDC; release the average cost of what was held
+        position = self.position(address, give_asset)
+        held = position.balance if position else 0
+        released = position.cost * min(give_amount, held) // held if held > 0 else 0
+        self._delta(address, USDC, recv_amount)
+        self._delta(address, give_asset, -give_amount, -released, recv_amount - released)
+
+    def _seen(self, block_number, log_index) -> bool:
+        if block_number is None:
+            return False
+        if (block_number, log_index) <= self.last_key:
+            self.skipped += 1
+            return True
+        return False
+
+    def apply_fill(self, fill, mirror: bool = True) -> bool:
+        """
+        Apply one maker fill (Trade or decoder trade dict). With `mirror` the
+        counterparty (fill taker) gets the opposite side. Fills at or before
+        the last applied (block, log index) are skipped and counted in
+        `skipped`, so re-feeding a stream after a restart is harmless.
+        Returns False if skipped.
+        """
+        return self._apply(fill, mirror)
+
+    def _apply(self, fill, mirror: bool, taker_fill=None) -> bool:
+        (maker, taker, maker_asset_id, taker_asset_id,
+         maker_amount, taker_amount, block_number, log_index) = _fill_fields(fill)
+        if self._seen(block_number, log_index):
+            return False
+        trades = [(maker, maker_asset_id, maker_amount, taker_asset_id, taker_amount)]
+        if mirror:
+            trades.append((taker, taker_asset_id, taker_amount, maker_asset_id, maker_amount))
+        if taker_fill is not None:
+            trades.append((taker_fill.maker, taker_fill.maker_asset_id, taker_fill.maker_amount,
+                           taker_fill.taker_asset_id, taker_fill.taker_amount))
+        self._book(trades)
+        if block_number is not None:
+            self.last_key = (block_number, log_index)
+        return True
+
+    def apply_fills(self, fills: Iterable, mirror: bool = True) -> int:
+        applied = 0
+        for fill in fills:
+            applied += self.apply_fill(fill, mirror)
+        self.flush()
+        return applied
+
+    def apply_dispatched(self, dispatched) -> int:
+        """
+        Apply a `src.dispatcher.Dispatched`: every fill (matched or not) is
+        booked to its order's owner only, and the taker side of each match
+        comes from its taker-order fill. Fills outside a match (direct
+        fillOrder) are mirrored, which is exact for them.
+        """
+        applied = 0
+        in_match = set()
+        taker_fills = {}
+        for match in dispatched.matches:
+            for fill in match.fills:
+                in_match.add((fill.tx_hash, fill.log_index))
+            if match.taker_fill is not None and match.fills:
+                # book the taker order right after the last maker fill it closed
+                last = match.fills[-1]
+                taker_fills[(last.tx_hash, last.log_index)] = match.taker_fill
+        for fill in dispatched.fills:
+            key = (fill.tx_hash, fill.log_index)
+            applied += self._apply(fill, key not in in_match, taker_fills.get(key))
+        self.flush()
+        return applied
+
+    # --- persistence ---
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.directory, "ledger.snapshot")
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.directory, "ledger.log")
+
+    def flush(self):
+        """Append the deltas applied since the last flush to the log as one frame."""
+        if self.log is None or not self._pending:
+            return
+        self.log.write(_FRAME.pack(FRAME_MAGIC, len(self._pending), *self.last_key) + b"".join(self._pending))
+        self.log.flush()
+        if self.sync:
+            os.fsync(self.log.fileno())
+        self._pending = []
+
+    def _write_snapshot(self, generation: int, log_offset: int):
+        count = len(self)
+        buffer = bytearray(_SNAPSHOT.size + _DELTA.size * count)
+        _SNAPSHOT.pack_into(buffer, 0, SNAPSHOT_MAGIC, 1, generation, *self.last_key, log_offset, count)
+        offset = _SNAPSHOT.size
+        for address, tokens in self.positions.items():
+            address_bytes = _address_bytes(address)
+            for token, position in tokens.items():
+                _DELTA.pack_into(buffer, offset, address_bytes, token.to_bytes(32, "big"),
+                                 _int256(position.balance), _int256(position.cost), _int256(position.realized))
+                offset += _DELTA.size
+        tmp = self.snapshot_path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(buffer)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+
+    def snapshot(self):
+        """Write a snapshot covering everything logged so far."""
+        if self.log is None:
+            raise ValueError("Ledger has no directory to snapshot to")
+        self.flush()
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        self._write_snapshot(self.generation, self.log.tell())
+
+    def compact(self):
+        """Snapshot the full state and start a new, empty log generation."""
+        if self.log is None:
+            raise ValueError("Ledger has no directory to snapshot to")
+        self.flush()
+        generation = self.generation + 1
+        self._write_snapshot(generation, _LOG_HEADER.size)
+        # A crash from here until the replace leaves an old-generation log
+        # whose frames the snapshot already covers; _recover discards it.
+        self._open_new_log(generation)
+
+    def _open_new_log(self, generation: int):
+        if self.log is not None:
+            self.log.close()
+        tmp = self.log_path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(_LOG_HEADER.pack(LOG_MAGIC, generation))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.log_path)
+        self.generation = generation
+        self.log = open(self.log_path, 'ab')
+
+    def _load_snapshot(self) -> Tuple[int, int]:
+        with open(self.snapshot_path, 'rb') as f:
+            data = f.read()
+        magic, version, generation, block, log_index, log_offset, count = _SNAPSHOT.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{self.snapshot_path} is not a ledger snapshot")
+        self.last_key = (block, log_index)
+        for address, token, balance, cost, realized in _DELTA.iter_unpack(
+                memoryview(data)[_SNAPSHOT.size:_SNAPSHOT.size + count * _DELTA.size]):
+            tokens = self.positions.setdefault("0x" + address.hex(), {})
+            tokens[int.from_bytes(token, "big")] = Position(
+                _from_int256(balance), _from_int256(cost), _from_int256(realized))
+        return generation, log_offset
+
+    def _replay(self, data: bytes, offset: int) -> int:
+        """Apply complete frames from `offset`; returns the end of the last complete frame."""
+        view = memoryview(data)
+        positions = self.positions
+        while offset + _FRAME.size <= len(data):
+            magic, count, block, log_index = _FRAME.unpack_from(data, offset)
+            end = offset + _FRAME.size + count * _DELTA.size
+            if magic != FRAME_MAGIC or end > len(data):
+                break
+            for address, token, d_balance, d_cost, d_realized in _DELTA.iter_unpack(view[offset + _FRAME.size:end]):
+                address = "0x" + address.hex()
+                token = int.from_bytes(token, "big")
+                tokens = positions.get(address)
+                if tokens is None:
+                    tokens = positions[address] = {}
+                position = tokens.get(token)
+                if position is None:
+                    position = tokens[token] = Position()
+                position.balance += _from_int256(d_balance)
+                position.cost += _from_int256(d_cost)
+                position.realized += _from_int256(d_realized)
+            self.last_key = (block, log_index)
+            offset = end
+        return offset
+
+    def _recover(self):
+        generation, log_offset = 0, _LOG_HEADER.size
+        if os.path.exists(self.snapshot_path):
+            generation, log_offset = self._load_snapshot()
+
+        data = b""
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'rb') as f:
+                data = f.read()
+        if len(data) < _LOG_HEADER.size or _LOG_HEADER.unpack_from(data, 0) != (LOG_MAGIC, generation):
+            # No log, or one from before the snapshot's compaction
+            self._open_new_log(generation)
+            return
+
+        end = self._replay(data, log_offset)
+        self.generation = generation
+        self.log = open(self.log_path, 'r+b')
+        # Drop a frame torn by a crash mid-write
+        self.log.truncate(max(end, log_offset))
+        self.log.seek(0, os.SEEK_END)
+
+    def close(self):
+        if self.log is not None:
+            self.flush()
+            self.log.close()
+            self.log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def positions_dict(ledger: Ledger, address: str) -> Dict[str, Any]:
+    tokens = ledger.positions_of(address)
+    return {
+        "address": address,
+        "usdc": str(tokens[USDC].balance) if USDC in tokens else "0",
+        "positions": {hex(token): p.to_dict() for token, p in sorted(tokens.items()) if token != USDC},
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-address position and cash ledger")
+    parser.add_argument("--dir", default="data/ledger", help="Snapshot / delta log directory")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--input", help="Apply trades from JSON Lines (backfill --output); counterparties mirrored")
+    source.add_argument("--from-block", type=int, help="Apply fills of a block range via the dispatcher (exact)")
+    parser.add_argument("--to-block", type=int, help="Last block (inclusive) for --from-block")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Fills per log frame")
+    parser.add_argument("--compact", action="store_true", help="Snapshot and start a new log afterwards")
+    parser.add_argument("--address", help="Print this address's positions")
+
+    args = parser.parse_args()
+
+    try:
+        with Ledger(args.dir) as ledger:
+            applied = 0
+            if args.input:
+                with open(args.input) as f:
+                    batch = []
+                    for line in f:
+                        if line.strip():
+                            batch.append(json.loads(line))
+                        if len(batch) >= args.batch_size:
+                            applied += ledger.apply_fills(batch)
+                            batch = []
+                    applied += ledger.apply_fills(batch)
+            elif args.from_block is not None:
+                from src.dispatcher import dispatch_blocks
+                if args.to_block is None:
+                    raise ValueError("--to-block is required with --from-block")
+                applied = ledger.apply_dispatched(dispatch_blocks(args.from_block, args.to_block))
+
+            if args.compact:
+                ledger.compact()
+
+            if args.address:
+                print(json.dumps(positions_dict(ledger, args.address), indent=2))
+            else:
+                print(f"Applied {applied} fills; {len(ledger.positions)} addresses, "
+                      f"{len(ledger)} positions, last fill {ledger.last_key}")
+            if ledger.skipped:
+                print(f"Skipped {ledger.skipped} fills at or before an already applied (block, log index)")
+
+    except Exception as e:
+        print(f"Error: {e}")
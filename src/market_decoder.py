@@ -1,21 +1,80 @@
 import argparse
 import json
 import sys
+from src import metrics
 from src.indexer.gamma import fetch_market_by_slug, fetch_market_by_id
-from src.ctf.derive import derive_binary_positions
+from src.indexer.catalog import MarketCatalog
+from src.ctf.derive import derive_binary_positions, USDC_E
 
-def decode_market(slug: str = None, condition_id: str = None) -> dict:
+def decode_market(slug: str = None, condition_id: str = None, catalog=None) -> dict:
     market_data = None
     
-    # 1. Fetch data from API
-    if slug:
-        market_data = fetch_market_by_slug(slug)
-    elif condition_id:
-        market_data = fetch_market_by_id(condition_id)
+    # 0. Local catalog (src.indexer.catalog), no network hit
+    if catalog is not None:
+        if slug:
+            market_data = catalog.market_by_slug(slug)
+        elif condition_id:
+            market_data = catalog.market_by_condition_id(condition_id)
+        if market_data and metrics.ENABLED:
+            metrics.GAMMA_REQUESTS.inc("catalog")
+
+    # 1. Fetch data from API (no catalog, or not in it yet)
+    if not market_data:
+        if slug:
+            market_data = fetch_market_by_slug(slug)
+        elif condition_id:
+            market_data = fetch_market_by_id(condition_id)
         
     if not market_data:
+        if metrics.ENABLED:
+            metrics.DECODE_FAILURES.inc("market_not_found")
         raise ValueError("Market not found in Gamma API")
 
+    return market_from_gamma(market_data)
+
+def decode_market_from_log(tx_hash: str, log_index: int = None, rpc_url: str = None) -> dict:
+    """
+    Rebuild market parameters from the ConditionPreparation log of a
+    transaction (the one at `log_index` if given, else the first).
+    The collateral comes from a PositionSplit of the same condition in the
+    transaction when there is one, else defaults to USDC.e.
+    """
+    from src.dispatcher import dispatch_tx
+
+    dispatched = dispatch_tx(tx_hash, rpc_url)
+    conditions = [c for c in dispatched.conditions if log_index is None or c.log_index == log_index]
+    if not conditions:
+        raise ValueError("No ConditionPreparation log found")
+    condition = conditions[0]
+
+    collateral = None
+    for split in dispatched.splits:
+        if split.condition_id == condition.condition_id:
+            collateral = split.collateral_token
+            break
+
+    derived = derive_binary_positions(
+        oracle=condition.oracle,
+        question_id=condition.question_id,
+        condition_id=condition.condition_id,
+        collateral_token=collateral,
+    )
+
+    return {
+        "conditionId": condition.condition_id,
+        "oracle": condition.oracle,
+        "questionId": condition.question_id,
+        "outcomeSlotCount": condition.outcome_slot_count,
+        "collateralToken": collateral or USDC_E,
+        "yesTokenId": derived["yesTokenId"],
+        "noTokenId": derived["noTokenId"],
+    }
+
+def market_from_gamma(market_data: dict) -> dict:
+    """
+    Build the decoded market (derived token IDs + raw Gamma data) from a
+    Gamma market object. No network access.
+    """
     # 2. Extract parameters
     # Note: Gamma API field names might vary. Adapting to common fields.
     # We need: oracle, questionId, conditionId
@@ -93,20 +152,36 @@ if __name__ == "__main__":
     parser.add_argument("--market-slug", help="Market Slug")
     parser.add_argument("--tx-hash", help="Transaction Hash (Optional for strict decoding from logs)")
     parser.add_argument("--log-index", help="Log Index (Optional)")
+    parser.add_argument("--catalog", help="Local Gamma catalog (see src.indexer.catalog)")
     parser.add_argument("--output", help="Output file")
+    parser.add_argument("--service", nargs="?", const="", help="Decode --market-slug via the resident service "
+                                                               "(src.service); address defaults to DECODE_SERVICE")
     
     args = parser.parse_args()
     
     try:
+        catalog = MarketCatalog(args.catalog) if args.catalog and args.service is None else None
         if args.market_slug:
-            result = decode_market(slug=args.market_slug)
+            if args.service is not None:
+                from src.client import ServiceClient
+                result = ServiceClient(args.service or None).decode_market(slug=args.market_slug)
+            else:
+                result = decode_market(slug=args.market_slug, catalog=catalog)
             print(json.dumps(result, indent=2))
             
+            if args.output:
+                with open(args.output, 'w') as f:
+                    json.dump(result, f, indent=2)
+        elif args.tx_hash:
+            log_index = int(args.log_index) if args.log_index is not None else None
+            result = decode_market_from_log(args.tx_hash, log_index)
+            print(json.dumps(result, indent=2))
+
             if args.output:
                 with open(args.output, 'w') as f:
                     json.dump(result, f, indent=2)
         else:
-            print("Please provide --market-slug")
+            print("Please provide --market-slug or --tx-hash")
             
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import threading
+from collections import deque
+from typing import Dict, Any, List, Tuple, Callable, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Metrics and tracing for the decode pipeline.
+#
+# Disabled by default; instrumented code checks the module-level ENABLED flag
+# (or gets a shared no-op from span()), so the disabled cost is one attribute
+# lookup per RPC call / receipt / chunk. Per-log work is counted per batch,
+# never per log.
+#
+# Environment:
+#   METRICS=1           collect metrics
+#   METRICS_TRACE=1     also keep recent spans (Chrome trace format at /trace)
+#   METRICS_PORT=9108   serve /metrics (Prometheus text), /stats (JSON), /trace
+#   METRICS_DUMP=path   write the JSON stats to `path` at exit
+
+ENABLED = False
+TRACING = False
+
+# Seconds; suits both RPC round trips and per-chunk decode work
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_START = time.time()
+_registry: Dict[str, "_Metric"] = {}
+_registry_lock = threading.Lock()
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_str(names: Tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values: Dict[tuple, Any] = {}
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_label_str(self.labels, labels)} {value}")
+        return lines
+
+    def to_json(self) -> Dict[str, Any]:
+        uptime = max(time.time() - _START, 1e-9)
+        return {",".join(map(str, k)) or "_": {"total": v, "per_second": v / uptime}
+                for k, v in sorted(self.values.items())}
+
+class Gauge(_Metric):
+    """Set directly, or computed at scrape time from registered callbacks (e.g. queue sizes)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self.functions: Dict[tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def set_function(self, fn: Optional[Callable[[], float]], *labels):
+        """Report `fn()` for `labels` at scrape time; None unregisters."""
+        with self.lock:
+            if fn is None:
+                self.functions.pop(labels, None)
+            else:
+                self.functions[labels] = fn
+
+    def _current(self) -> Dict[tuple, float]:
+        with self.lock:
+            values = dict(self.values)
+            functions = dict(self.functions)
+        for labels, fn in functions.items():
+            try:
+                values[labels] = fn()
+            except Exception:
+                pass
+        return values
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, value in sorted(self._current().items()):
+            lines.append(f"{self.name}{_label_str(self.labels, labels)} {value}")
+        return lines
+
+    def to_json(self) -> Dict[str, Any]:
+        return {",".join(map(str, k)) or "_": v for k, v in sorted(self._current().items())}
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                # per-bucket counts (+Inf last), sum, count
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> float:
+        # Upper bound of the bucket holding the q-quantile
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def render(self) -> List[str]:
+        lines = self._header()
+        for labels, (counts, total_sum, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_label_str(self.labels, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_str(self.labels, labels, le)} {count}")
+            lines.append(f"{self.name}_sum{_label_str(self.labels, labels)} {total_sum}")
+            lines.append(f"{self.name}_count{_label_str(self.labels, labels)} {count}")
+        return lines
+
+    def to_json(self) -> Dict[str, Any]:
+        out = {}
+        for labels, (counts, total_sum, count) in sorted(self.values.items()):
+            out[",".join(map(str, labels)) or "_"] = {
+                "count": count,
+                "mean": total_sum / count if count else 0.0,
+                "p50": self._quantile(counts, count, 0.50),
+                "p99": self._quantile(counts, count, 0.99),
+            }
+        return out
+
+def _register(metric: _Metric) -> _Metric:
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            return existing
+        _registry[metric.name] = metric
+        return metric
+
+def counter(name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+    return _register(Counter(name, help, labels))
+
+def gauge(name: str, help: str, labels: Tuple[str, ...] = ()) -> Gauge:
+    return _register(Gauge(name, help, labels))
+
+def histogram(name: str, help: str, labels: Tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labels, buckets))
+
+# --- pipeline metrics (defined here so every module shares one registry) ---
+
+RPC_SECONDS = histogram("pm_rpc_request_seconds", "JSON-RPC HTTP round trip", ("method",))
+RPC_ERRORS = counter("pm_rpc_errors_total", "Failed JSON-RPC calls by method and error code / exception", ("method", "reason"))
+RPC_RETRIES = counter("pm_rpc_retries_total", "JSON-RPC retries", ("method",))
+RPC_ENDPOINT_REQUESTS = counter("pm_rpc_endpoint_requests_total", "Requests per pool endpoint by outcome (ok / throttled / timeout / error)", ("endpoint", "result"))
+RPC_ENDPOINT_LATENCY = gauge("pm_rpc_endpoint_latency_seconds", "Smoothed latency per pool endpoint", ("endpoint",))
+RPC_FAILOVERS = counter("pm_rpc_failovers_total", "Requests moved on to another endpoint after a failure", ("endpoint",))
+RPC_HEDGES = counter("pm_rpc_hedges_total", "Hedged requests (sent / won by the hedge / lost to the primary)", ("result",))
+LOGS_SCANNED = counter("pm_logs_scanned_total", "Logs examined by the decoders", ("source",))
+LOGS_MATCHED = counter("pm_logs_matched_total", "OrderFilled logs decoded", ("source",))
+FILLS = counter("pm_fills_total", "Maker fills produced (taker summary fills excluded)", ("source",))
+LOG_RANGE_SPLITS = counter("pm_getlogs_range_splits_total", "eth_getLogs ranges halved after a provider range error")
+FOLLOW_ROLLBACKS = counter("pm_follow_rollbacks_total", "Reorgs that rolled back already emitted blocks in follow mode")
+DECODE_FAILURES = counter("pm_decode_failures_total", "Decode failures by reason", ("reason",))
+GAMMA_REQUESTS = counter("pm_gamma_requests_total", "Market lookups by where they were answered", ("source",))
+GAMMA_ERRORS = counter("pm_gamma_errors_total", "Failed Gamma lookups by exception", ("reason",))
+CACHE_REQUESTS = counter("pm_cache_requests_total", "Response cache lookups", ("kind", "result"))
+QUEUE_DEPTH = gauge("pm_queue_depth", "Items waiting in pipeline queues", ("queue",))
+STAGE_SECONDS = histogram("pm_stage_seconds", "Time spent per pipeline stage (spans)", ("stage",))
+
+# --- spans ---
+
+_trace: deque = deque(maxlen=100000)
+
+class _Span:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.t0
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        if TRACING:
+            _trace.append((self.stage, self.t0, elapsed, threading.get_ident(), exc_type is not None))
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP = _NoopSpan()
+
+def span(stage: str):
+    """Time a pipeline stage: `with metrics.span("decode"): ...`. A shared no-op when disabled."""
+    if not ENABLED:
+        return _NOOP
+    return _Span(stage)
+
+def trace_events() -> Dict[str, Any]:
+    """Recent spans in Chrome trace-event format (chrome://tracing, Perfetto)."""
+    pid = os.getpid()
+    return {"traceEvents": [
+        {"name": stage, "ph": "X", "ts": t0 * 1e6, "dur": elapsed * 1e6, "pid": pid, "tid": tid,
+         "args": {"error": failed}}
+        for stage, t0, elapsed, tid, failed in list(_trace)
+    ]}
+
+# --- exposition ---
+
+def render_prometheus() -> str:
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def stats() -> Dict[str, Any]:
+    with _registry_lock:
+        metrics = list(_registry.items())
+    return {
+        "uptime_seconds": time.time() - _START,
+        "enabled": ENABLED,
+        "metrics": {name: metric.to_json() for name, metric in metrics},
+    }
+
+def dump(path: str):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(stats(), f, indent=2)
+
+def serve(port: int, host: str = "127.0.0.1"):
+    """Serve /metrics, /stats and /trace from a daemon thread."""
+    # Imported here so plain CLI runs don't pay for http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/metrics":
+                body, content_type = render_prometheus().encode(), "text/plain; version=0.0.4"
+            elif path == "/stats":
+                body, content_type = json.dumps(stats()).encode(), "application/json"
+            elif path == "/trace":
+                body, content_type = json.dumps(trace_events()).encode(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def enable(tracing: bool = False):
+    global ENABLED, TRACING
+    ENABLED = True
+    TRACING = tracing
+
+def disable():
+    global ENABLED, TRACING
+    ENABLED = False
+    TRACING = False
+
+def _configure_from_env():
+    if os.getenv("METRICS") or os.getenv("METRICS_PORT") or os.getenv("METRICS_DUMP"):
+        enable(tracing=bool(os.getenv("METRICS_TRACE")))
+    if os.getenv("METRICS_PORT"):
+        serve(int(os.getenv("METRICS_PORT")), os.getenv("METRICS_HOST") or "127.0.0.1")
+    if os.getenv("METRICS_DUMP"):
+        atexit.register(dump, os.getenv("METRICS_DUMP"))
+
+_configure_from_env()
@@ -0,0 +1,301 @@
+import os
+import json
+import time
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+from typing import Optional, Dict, Any, Tuple
+from dotenv import load_dotenv
+from src import metrics
+from src.trade_decoder import decode_trades, trades_from_receipt, _resolve_rpc_url
+from src.market_decoder import decode_market
+from src.ctf.derive import derive_binary_positions, derive_binary_positions_many
+from src.indexer.rpc import RPCError, get_client
+from src.indexer.catalog import MarketCatalog
+from src.indexer.token_index import load_index
+
+load_dotenv()
+
+# Resident decode service.
+#
+# Keeps everything a CLI call would rebuild warm in one process: the imports,
+# the pooled RPC connection, the Gamma market lookups (TTL cache), the local
+# catalog / token index and the decoders' checksum caches. Served over HTTP on
+# localhost or over a Unix socket; src.client is the matching thin client and
+# the decoder CLIs use it with --service.
+#
+# Endpoints (GET query parameters, or a JSON object as POST body):
+#   /decode-tx          tx_hash | tx_hashes (list), include_block
+#                       (tx_hashes: one {"tx_hash", "trades"} or {"tx_hash", "error"} per hash)
+#   /decode-market      slug | condition_id
+#   /derive-positions   oracle + question_id [+ condition_id, collateral_token]
+#                       | condition_ids (list) [+ collateral_token]
+#   /token              token_id  (needs --token-index)
+#   /health, /metrics
+# Responses are {"result": ...} or {"error": "..."}.
+
+class ServiceError(Exception):
+    """Bad request; reported to the client with `status`."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+class TTLCache:
+    """Small thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_size: int = 4096, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+class DecodeService:
+    """
+    Request handlers plus the warm state they share.
+
+    Args:
+        rpc_url (str): RPC endpoint (defaults to RPC_URL).
+        catalog (str, optional): Local Gamma catalog path, consulted before the API.
+        token_index (str, optional): Token index path for /token.
+        market_ttl (float): Seconds a decoded market is served from memory.
+    """
+
+    def __init__(self, rpc_url: str = None, catalog: str = None, token_index: str = None,
+                 market_ttl: float = 300.0):
+        self.rpc_url = _resolve_rpc_url(rpc_url)
+        # Opens the pooled session now rather than on the first request
+        self.client = get_client(self.rpc_url)
+        self.catalog_path = catalog
+        self._local = threading.local()
+        self.token_index = load_index(token_index) if token_index else None
+        self.markets = TTLCache(ttl=market_ttl)
+        self.started = time.time()
+        self.requests = 0
+        self._requests_lock = threading.Lock()
+        self.routes = {
+            "/decode-tx": self.decode_tx,
+            "/decode-market": self.decode_market,
+            "/derive-positions": self.derive_positions,
+            "/token": self.token,
+            "/health": self.health,
+        }
+
+    def _catalog(self) -> Optional[MarketCatalog]:
+        # sqlite3 connections stay on the thread that opened them
+        if self.catalog_path is None:
+            return None
+        catalog = getattr(self._local, "catalog", None)
+        if catalog is None:
+            catalog = self._local.catalog = MarketCatalog(self.catalog_path)
+        return catalog
+
+    def handle(self, path: str, params: Dict[str, Any]) -> Any:
+        route = self.routes.get(path)
+        if route is None:
+            raise ServiceError(f"Unknown endpoint {path}", 404)
+        with self._requests_lock:
+            self.requests += 1
+        with metrics.span("service" + path.replace("/", "_").replace("-", "_")):
+            return route(params)
+
+    # --- endpoints ---
+
+    def decode_tx(self, params: dict):
+        include_block = str(params.get("include_block", "")).lower() in ("1", "true")
+        if params.get("tx_hashes"):
+            return self._decode_txs(list(params["tx_hashes"]), include_block)
+        if not params.get("tx_hash"):
+            raise ServiceError("tx_hash or tx_hashes required")
+        try:
+            return decode_trades(params["tx_hash"], self.rpc_url, include_block=include_block)
+        except ValueError as e:
+            raise ServiceError(str(e), 404)
+        except RPCError as e:
+            # Invalid params means the hash itself was refused; anything else is the node's fault
+            raise ServiceError(str(e), 400 if e.code == -32602 else 502)
+
+    def _decode_txs(self, tx_hashes: list, include_block: bool) -> list:
+        # Per-hash results, so the client can tell which hashes failed and why
+        results = []
+        for tx_hash, tx_receipt in zip(tx_hashes, self.client.get_receipts(tx_hashes)):
+            if tx_receipt is None:
+                if metrics.ENABLED:
+                    metrics.DECODE_FAILURES.inc("receipt_not_found")
+                results.append({"tx_hash": tx_hash, "error": f"Transaction {tx_hash} not found"})
+            elif isinstance(tx_receipt, RPCError):
+                if metrics.ENABLED:
+                    metrics.DECODE_FAILURES.inc("receipt_rejected")
+                results.append({"tx_hash": tx_hash, "error": str(tx_receipt)})
+            else:
+                results.append({"tx_hash": tx_hash,
+                                "trades": trades_from_receipt(tx_hash, tx_receipt, include_block)})
+        return results
+
+    def decode_market(self, params: dict):
+        slug, condition_id = params.get("slug"), params.get("condition_id")
+        if not slug and not condition_id:
+            raise ServiceError("slug or condition_id required")
+        key = ("slug", slug) if slug else ("condition_id", condition_id.lower())
+        market = self.markets.get(key)
+        if market is None:
+            try:
+                market = decode_market(slug=slug, condition_id=condition_id, catalog=self._catalog())
+            except ValueError as e:
+                raise ServiceError(str(e), 404)
+            self.markets.put(key, market)
+        elif metrics.ENABLED:
+            metrics.GAMMA_REQUESTS.inc("service")
+        return market
+
+    def derive_positions(self, params: dict):
+        collateral = params.get("collateral_token")
+        if params.get("condition_ids"):
+            return derive_binary_positions_many(list(params["condition_ids"]), collateral)
+        if not params.get("condition_id") and not (params.get("oracle") and params.get("question_id")):
+            raise ServiceError("oracle and question_id (or condition_id / condition_ids) required")
+        return derive_binary_positions(params.get("oracle"), params.get("question_id"),
+                                       params.get("condition_id"), collateral)
+
+    def token(self, params: dict):
+        if self.token_index is None:
+            raise ServiceError("Service started without --token-index", 404)
+        if not params.get("token_id"):
+            raise ServiceError("token_id required")
+        info = self.token_index.get(params["token_id"])
+        if info is None:
+            raise ServiceError(f"Unknown token {params['token_id']}", 404)
+        return info._asdict()
+
+    def health(self, params: dict):
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime_seconds": time.time() - self.started,
+            "requests": self.requests,
+            "rpc_endpoints": self.client.pool.status(),
+        }
+
+def _make_handler(service: DecodeService, tcp: bool = True):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # TCP_NODELAY does not exist on Unix sockets
+        disable_nagle_algorithm = tcp
+
+        def _params(self) -> Tuple[str, dict]:
+            url = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                try:
+                    body = json.loads(self.rfile.read(length))
+                except ValueError as e:
+                    raise ServiceError(f"Malformed JSON body: {e}")
+                if not isinstance(body, dict):
+                    raise ServiceError("POST body must be a JSON object")
+                params.update(body)
+            return url.path, params
+
+        def _reply(self, status: int, body: bytes, content_type: str = "application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _dispatch(self):
+            try:
+                path, params = self._params()
+                if path == "/metrics":
+                    self._reply(200, metrics.render_prometheus().encode(), "text/plain; version=0.0.4")
+                    return
+                status, body = 200, {"result": service.handle(path, params)}
+            except ServiceError as e:
+                status, body = e.status, {"error": str(e)}
+            except Exception as e:
+                status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+            self._reply(status, json.dumps(body).encode())
+
+        do_GET = _dispatch
+        do_POST = _dispatch
+
+        def address_string(self):
+            # Unix socket peers have no (host, port)
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        # Replace a socket file left behind by a previous run
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+def make_server(service: DecodeService, host: str = "127.0.0.1", port: int = 8600, unix_socket: str = None):
+    """HTTP server for `service` on host:port, or on `unix_socket` when given."""
+    handler = _make_handler(service, tcp=not unix_socket)
+    if unix_socket:
+        if os.path.dirname(unix_socket):
+            os.makedirs(os.path.dirname(unix_socket), exist_ok=True)
+        return UnixHTTPServer(unix_socket, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resident decode service (warm RPC pool, market cache, decoders)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--rpc-url", help="RPC endpoint (defaults to RPC_URL)")
+    parser.add_argument("--catalog", help="Local Gamma catalog (see src.indexer.catalog)")
+    parser.add_argument("--token-index", help="Token ID -> market index (see src.indexer.token_index)")
+    parser.add_argument("--market-ttl", type=float, default=300.0, help="Seconds a decoded market stays cached")
+
+    args = parser.parse_args()
+
+    try:
+        service = DecodeService(args.rpc_url, catalog=args.catalog, token_index=args.token_index,
+                                market_ttl=args.market_ttl)
+        server = make_server(service, args.host, args.port, args.socket)
+        where = f"unix:{args.socket}" if args.socket else f"http://{args.host}:{server.server_address[1]}"
+        print(f"Decode service listening on {where}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if args.socket and os.path.exists(args.socket):
+                os.remove(args.socket)
+    except Exception as e:
+        print(f"Error: {e}")
@@ -0,0 +1,174 @@
+import os
+import threading
+from typing import List, Dict, Any, Optional, Set, Tuple
+from src.store.records import to_row, to_trade, token_bytes, address_key
+
+# Partitioned Parquet trade store.
+#
+#   <root>/block_bucket=<block_number // bucket_size>/part-<seq>.parquet
+#
+# Trades must carry "block_number" (the partition key).
+# Each upsert appends one new part file per touched partition, so a batch
+# costs the same however large the partition already is. Reads merge the
+# parts on (tx_hash, log_index), newest part winning; compact() (run for
+# the partitions written when the store is closed) folds them back into one.
+# Rows inside a part are sorted by (token_id, block_number) and written in
+# small row groups, so token lookups skip row groups via min/max stats and
+# block-range lookups skip whole partitions.
+# Requires pyarrow (optional dependency: pip install pyarrow).
+
+def _schema(pa):
+    return pa.schema([
+        ("tx_hash", pa.string()),
+        ("log_index", pa.int64()),
+        ("block_number", pa.int64()),
+        ("exchange", pa.string()),
+        ("maker", pa.string()),
+        ("taker", pa.string()),
+        ("maker_asset_id", pa.binary(32)),
+        ("taker_asset_id", pa.binary(32)),
+        ("token_id", pa.binary(32)),
+        ("maker_amount", pa.string()),
+        ("taker_amount", pa.string()),
+        ("price", pa.float64()),
+        ("side", pa.string()),
+    ])
+
+class ParquetTradeStore:
+    """
+    Args:
+        root (str): Dataset directory.
+        bucket_size (int): Blocks per partition.
+        row_group_size (int): Rows per Parquet row group.
+    """
+
+    def __init__(self, root: str, bucket_size: int = 100000, row_group_size: int = 8192):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required for the Parquet trade store (pip install pyarrow)")
+        self.pa = pa
+        self.pq = pq
+        self.schema = _schema(pa)
+        self.root = root
+        self.bucket_size = bucket_size
+        self.row_group_size = row_group_size
+        self.lock = threading.Lock()
+        # Partitions appended to since the last compaction
+        self.dirty: Set[str] = set()
+        os.makedirs(root, exist_ok=True)
+
+    def close(self):
+        self.compact(self.dirty)
+
+    def _bucket(self, block_number: Optional[int]) -> str:
+        if block_number is None:
+            raise ValueError("Parquet trade store needs trades with block_number")
+        return str(block_number // self.bucket_size)
+
+    def _dir(self, bucket: str) -> str:
+        return os.path.join(self.root, f"block_bucket={bucket}")
+
+    def _parts(self, bucket: str) -> List[str]:
+        """Part files of a partition, oldest first."""
+        directory = self._dir(bucket)
+        if not os.path.isdir(directory):
+            return []
+        names = sorted(n for n in os.listdir(directory) if n.startswith("part-") and n.endswith(".parquet"))
+        return [os.path.join(directory, n) for n in names]
+
+    def _next_part(self, bucket: str) -> str:
+        seqs = [int(os.path.basename(p)[5:-8]) for p in self._parts(bucket)]
+        return os.path.join(self._dir(bucket), f"part-{max(seqs, default=0) + 1:08d}.parquet")
+
+    def _buckets(self) -> List[str]:
+        return [name.split("=", 1)[1] for name in os.listdir(self.root)
+                if name.startswith("block_bucket=") and self._parts(name.split("=", 1)[1])]
+
+    def _keys(self, path: str) -> Set[Tuple[str, int]]:
+        table = self.pq.read_table(path, columns=["tx_hash", "log_index"])
+        return set(zip(table.column("tx_hash").to_pylist(), table.column("log_index").to_pylist()))
+
+    def _read(self, bucket: str, filters=None) -> List[Dict[str, Any]]:
+        parts = self._parts(bucket)
+        if len(parts) == 1:
+            return self.pq.read_table(parts[0], filters=filters, schema=self.schema).to_pylist()
+        # Newest first; a key already seen in a newer part (matching the filter or not) is stale
+        rows, newer = [], set()
+        for path in reversed(parts):
+            for row in self.pq.read_table(path, filters=filters, schema=self.schema).to_pylist():
+                if (row["tx_hash"], row["log_index"]) not in newer:
+                    rows.append(row)
+            newer |= self._keys(path)
+        return rows
+
+    def _write(self, bucket: str, rows: List[Dict[str, Any]]) -> str:
+        ordered = sorted(rows, key=lambda r: (r["token_id"], r["block_number"], r["tx_hash"], r["log_index"]))
+        table = self.pa.Table.from_pylist(ordered, schema=self.schema)
+        path = self._next_part(bucket)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        self.pq.write_table(table, tmp, row_group_size=self.row_group_size)
+        os.replace(tmp, path)
+        return path
+
+    def upsert(self, trades: List[Dict[str, Any]]) -> int:
+        """Insert or overwrite trades (by tx_hash, log_index) by appending one part per touched partition."""
+        by_bucket: Dict[str, Dict[tuple, Dict[str, Any]]] = {}
+        for trade in trades:
+            row = to_row(trade)
+            by_bucket.setdefault(self._bucket(row["block_number"]), {})[(row["tx_hash"], row["log_index"])] = row
+
+        with self.lock:
+            for bucket, rows in by_bucket.items():
+                self._write(bucket, list(rows.values()))
+                self.dirty.add(bucket)
+        return len(trades)
+
+    def compact(self, buckets=None):
+        """Merge each partition's parts into one (all partitions by default)."""
+        with self.lock:
+            for bucket in list(buckets if buckets is not None else self._buckets()):
+                parts = self._parts(bucket)
+                if len(parts) > 1:
+                    self._write(bucket, self._read(bucket))
+                    # The merged part is the newest, so a crash here only leaves stale duplicates
+                    for path in parts:
+                        os.remove(path)
+                self.dirty.discard(bucket)
+
+    def _query(self, filters, from_block: int = None, to_block: int = None) -> List[Dict[str, Any]]:
+        rows = []
+        for bucket in self._buckets():
+            start = int(bucket) * self.bucket_size
+            end = start + self.bucket_size - 1
+            if (from_block is not None and end < from_block) or (to_block is not None and start > to_block):
+                continue
+            rows.extend(self._read(bucket, filters))
+
+        if from_block is not None:
+            rows = [r for r in rows if r["block_number"] >= from_block]
+        if to_block is not None:
+            rows = [r for r in rows if r["block_number"] <= to_block]
+        rows.sort(key=lambda r: (r["block_number"], r["log_index"], r["tx_hash"]))
+        return [to_trade(r) for r in rows]
+
+    def fills_for_token(self, token_id, from_block: int = None, to_block: int = None) -> List[Dict[str, Any]]:
+        return self._query([("token_id", "==", token_bytes(token_id))], from_block, to_block)
+
+    def fills_for_maker(self, maker: str, from_block: int = None, to_block: int = None) -> List[Dict[str, Any]]:
+        return self._query([("maker", "==", address_key(maker))], from_block, to_block)
+
+    def fills_in_blocks(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        return self._query(None, from_block, to_block)
+
+    def count(self) -> int:
+        total = 0
+        for bucket in self._buckets():
+            parts = self._parts(bucket)
+            if len(parts) == 1:
+                total += self.pq.ParquetFile(parts[0]).metadata.num_rows
+            else:
+                total += len(set().union(*(self._keys(path) for path in parts)))
+        return total
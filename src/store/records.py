@@ -0,0 +1,65 @@
+from functools import lru_cache
+from typing import Dict, Any
+from src.trade import Trade
+from src.raw_decoder import to_checksum_address
+
+# Typed trade rows for the storage backends.
+# The two 256-bit asset IDs / token ID are stored as 32-byte big-endian
+# values, which sort and compare like the integers they encode. Amounts are
+# uint256 as well, so they stay decimal strings: an int64 column would
+# overflow on a large fill and take the whole batch down with it.
+# Maker / taker addresses are stored lowercase (queries lowercase theirs too)
+# and checksummed again on the way out.
+
+COLUMNS = (
+    "tx_hash", "log_index", "block_number", "exchange", "maker", "taker",
+    "maker_asset_id", "taker_asset_id", "token_id",
+    "maker_amount", "taker_amount", "price", "side",
+)
+
+_checksum = lru_cache(maxsize=4096)(to_checksum_address)
+
+def address_key(address: str) -> str:
+    """Stored form of an address: lowercase, whatever case it came in."""
+    return address.lower()
+
+def uint256_bytes(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+def token_bytes(token_id) -> bytes:
+    """Accepts an int, a 0x-hex token ID (trade['token_id']) or a decimal string."""
+    if isinstance(token_id, int):
+        return uint256_bytes(token_id)
+    if token_id.startswith("0x"):
+        return uint256_bytes(int(token_id, 16))
+    return uint256_bytes(int(token_id))
+
+def to_row(trade: Dict[str, Any]) -> Dict[str, Any]:
+    """Decoder trade dict -> typed row."""
+    maker_asset_id = int(trade["maker_asset_id"])
+    return {
+        "tx_hash": trade["tx_hash"].lower(),
+        "log_index": int(trade["log_index"]),
+        "block_number": trade.get("block_number"),
+        "exchange": trade["exchange"],
+        "maker": address_key(trade["maker"]),
+        "taker": address_key(trade["taker"]),
+        "maker_asset_id": uint256_bytes(maker_asset_id),
+        "taker_asset_id": uint256_bytes(int(trade["taker_asset_id"])),
+        "token_id": token_bytes(trade["token_id"]),
+        "maker_amount": str(int(trade["maker_amount"])),
+        "taker_amount": str(int(trade["taker_amount"])),
+        "price": float(trade["price"]),
+        "side": trade["side"],
+    }
+
+def to_trade(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Typed row -> decoder trade dict. Side, token_id and the price string are
+    recomputed from the integers, so they match the decoder output exactly.
+    """
+    return Trade(
+        row["tx_hash"], row["log_index"], row["exchange"], _checksum(row["maker"]), _checksum(row["taker"]),
+        int.from_bytes(row["maker_asset_id"], "big"), int.from_bytes(row["taker_asset_id"], "big"),
+        int(row["maker_amount"]), int(row["taker_amount"]), row.get("block_number"),
+    ).to_dict()
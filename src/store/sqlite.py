@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any
+from src.store.records import COLUMNS, to_row, to_trade, token_bytes, address_key
+
+# Embedded SQLite trade store.
+# Keyed by (tx_hash, log_index) so re-running a job overwrites instead of
+# duplicating; secondary indexes cover token / maker / block range queries.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (
+    tx_hash TEXT NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_number INTEGER,
+    exchange TEXT NOT NULL,
+    maker TEXT NOT NULL,
+    taker TEXT NOT NULL,
+    maker_asset_id BLOB NOT NULL,
+    taker_asset_id BLOB NOT NULL,
+    token_id BLOB NOT NULL,
+    maker_amount TEXT NOT NULL,
+    taker_amount TEXT NOT NULL,
+    price REAL NOT NULL,
+    side TEXT NOT NULL,
+    PRIMARY KEY (tx_hash, log_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_trades_token_block ON trades(token_id, block_number);
+CREATE INDEX IF NOT EXISTS idx_trades_maker_block ON trades(maker, block_number);
+CREATE INDEX IF NOT EXISTS idx_trades_block ON trades(block_number);
+"""
+
+_UPSERT = (
+    f"INSERT INTO trades ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+    "ON CONFLICT (tx_hash, log_index) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in COLUMNS if c not in ("tx_hash", "log_index"))
+)
+
+class SQLiteTradeStore:
+    """
+    Args:
+        path (str): Database file.
+    """
+
+    def __init__(self, path: str):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared with the BatchWriter thread; access is serialized by self.lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yield the connection inside one transaction (committed on exit,
+        rolled back on error). Lets callers such as the indexing cursor
+        write their own tables atomically with the trades.
+        """
+        with self.lock:
+            with self.conn:
+                yield self.conn
+
+    def upsert_in(self, conn, trades: List[Dict[str, Any]]) -> int:
+        """Upsert within a transaction opened by `transaction()`."""
+        rows = [tuple(to_row(t)[c] for c in COLUMNS) for t in trades]
+        conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def upsert(self, trades: List[Dict[str, Any]]) -> int:
+        """Insert or overwrite trades (by tx_hash, log_index) in one transaction."""
+        with self.transaction() as conn:
+            return self.upsert_in(conn, trades)
+
+    def delete_after_in(self, conn, block_number: int) -> int:
+        """Delete trades above `block_number` (reorg rollback) within a transaction."""
+        return conn.execute("DELETE FROM trades WHERE block_number > ?", (block_number,)).rowcount
+
+    def _select(self, where: str, params: tuple) -> List[Dict[str, Any]]:
+        sql = f"SELECT {', '.join(COLUMNS)} FROM trades WHERE {where} ORDER BY block_number, log_index, tx_hash"
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [to_trade(dict(zip(COLUMNS, row))) for row in rows]
+
+    def fills_for_token(self, token_id, from_block: int = None, to_block: int = None) -> List[Dict[str, Any]]:
+        where, params = "token_id = ?", [token_bytes(token_id)]
+        if from_block is not None:
+            where += " AND block_number >= ?"
+            params.append(from_block)
+        if to_block is not None:
+            where += " AND block_number <= ?"
+            params.append(to_block)
+        return self._select(where, tuple(params))
+
+    def fills_for_maker(self, maker: str, from_block: int = None, to_block: int = None) -> List[Dict[str, Any]]:
+        where, params = "maker = ?", [address_key(maker)]
+        if from_block is not None:
+            where += " AND block_number >= ?"
+            params.append(from_block)
+        if to_block is not None:
+            where += " AND block_number <= ?"
+            params.append(to_block)
+        return self._select(where, tuple(params))
+
+    def fills_in_blocks(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        return self._select("block_number BETWEEN ? AND ?", (from_block, to_block))
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def explain(self, sql: str, params: tuple = ()) -> list:
+        """EXPLAIN QUERY PLAN, to check a query uses an index."""
+        with self.lock:
+            return self.conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
@@ -0,0 +1,84 @@
+import queue
+import threading
+from typing import Dict, Any
+from src import metrics
+
+# Background batching in front of a trade store, so the decoder only pays
+# for a queue put per trade.
+
+_STOP = object()
+
+class BatchWriter:
+    """
+    Collects trades and upserts them on a background thread.
+
+    Args:
+        store: SQLiteTradeStore / ParquetTradeStore (anything with upsert(list)).
+        batch_size (int): Trades per upsert.
+        max_pending (int): Queue bound; `write` blocks when the store falls this far behind.
+        flush_interval (float): Seconds after which a partial batch is written anyway.
+    """
+
+    def __init__(self, store, batch_size: int = 5000, max_pending: int = 100000, flush_interval: float = 1.0):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.written = 0
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        if metrics.ENABLED:
+            metrics.QUEUE_DEPTH.set_function(self.queue.qsize, "store_writer")
+
+    def write(self, trade: Dict[str, Any]):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(trade)
+
+    def close(self):
+        """Flush everything still queued and stop the thread."""
+        self.queue.put(_STOP)
+        self.thread.join()
+        if metrics.ENABLED:
+            metrics.QUEUE_DEPTH.set_function(None, "store_writer")
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        batch = []
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _STOP:
+                batch.append(item)
+            if batch and (item is None or item is _STOP or len(batch) >= self.batch_size):
+                try:
+                    with metrics.span("store_upsert"):
+                        self.written += self.store.upsert(batch)
+                except Exception as e:
+                    self.error = e
+                batch = []
+            if item is _STOP:
+                return
+
+def open_store(uri: str):
+    """
+    Open a trade store from a URI: "sqlite:<path>" or "parquet:<directory>".
+    """
+    scheme, _, location = uri.partition(":")
+    if scheme == "sqlite":
+        from src.store.sqlite import SQLiteTradeStore
+        return SQLiteTradeStore(location)
+    if scheme == "parquet":
+        from src.store.parquet import ParquetTradeStore
+        return ParquetTradeStore(location)
+    raise ValueError(f"Unknown store '{uri}' (expected sqlite:<path> or parquet:<dir>)")
@@ -0,0 +1,146 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from src.stub.rpc import StubHTTPServer
+
+# Local stand-in for the Gamma API.
+# Serves recorded events (the objects returned by /events, each with a
+# "markets" list) for /events?slug=... and /markets?condition_id=..., with
+# limit/offset paging, order/ascending sorting and ETag / If-None-Match.
+
+class StubGammaServer:
+    """
+    Args:
+        events (list): Recorded Gamma event objects.
+        latency (float): Seconds to sleep before answering each request.
+    """
+
+    def __init__(self, events: list = None, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.events = list(events or [])
+        self.latency = latency
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self.routes = {
+            "/events": self.get_events,
+            "/markets": self.get_markets,
+        }
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                status, body, headers = server.handle_get(parts.path, query, dict(self.headers))
+                raw = b"" if body is None else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = StubHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubGammaServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle_get(self, path: str, query: dict, headers: dict):
+        with self.lock:
+            self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        route = self.routes.get(path.rstrip("/"))
+        if route is None:
+            return 404, {"error": "not found"}, {}
+        return route(query, headers)
+
+    def markets(self):
+        for event in self.events:
+            for market in event.get("markets", []):
+                yield market
+
+    def add_event(self, event: dict):
+        """Insert or replace (by id) an event, e.g. to simulate an update between syncs."""
+        with self.lock:
+            self.events = [e for e in self.events if e.get("id") != event.get("id")] + [event]
+
+    def _page(self, items: list, query: dict, headers: dict):
+        order = query.get("order")
+        if order:
+            reverse = query.get("ascending", "true").lower() == "false"
+            items = sorted(items, key=lambda item: item.get(order) or "", reverse=reverse)
+        offset = int(query.get("offset", 0))
+        if "limit" in query:
+            items = items[offset:offset + int(query["limit"])]
+        else:
+            items = items[offset:]
+
+        etag = '"' + hashlib.sha1(json.dumps(items, sort_keys=True).encode()).hexdigest() + '"'
+        if headers.get("If-None-Match") == etag:
+            return 304, None, {"ETag": etag}
+        return 200, items, {"ETag": etag}
+
+    def get_events(self, query: dict, headers: dict):
+        events = self.events
+        if "slug" in query:
+            events = [e for e in events if e.get("slug") == query["slug"]]
+        return self._page(events, query, headers)
+
+    def get_markets(self, query: dict, headers: dict):
+        markets = list(self.markets())
+        if "condition_id" in query:
+            markets = [m for m in markets if m.get("conditionId", "").lower() == query["condition_id"].lower()]
+        if "slug" in query:
+            markets = [m for m in markets if m.get("slug") == query["slug"]]
+        return self._page(markets, query, headers)
+
+def load_events(path: str) -> list:
+    with open(path) as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in Gamma API serving recorded events")
+    parser.add_argument("--events", required=True, help="JSON file with a list of Gamma event objects")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8546)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of injected latency per request")
+
+    args = parser.parse_args()
+
+    server = StubGammaServer(events=load_events(args.events), host=args.host, port=args.port, latency=args.latency)
+    print(f"Serving {len(server.events)} events on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
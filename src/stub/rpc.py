@@ -0,0 +1,417 @@
+import argparse
+import bisect
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, List
+
+# Local stand-in for a Polygon JSON-RPC node.
+# It serves recorded logs (the raw JSON objects returned by eth_getLogs) so the
+# indexer can be exercised offline. Receipts are synthesized from the logs of
+# each transaction unless recorded receipts are passed in explicitly.
+
+def _to_int(value) -> int:
+    if isinstance(value, int):
+        return value
+    return int(value, 16)
+
+def _as_list(value) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [value.lower()]
+    return [v.lower() for v in value]
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Concurrency benchmarks open many connections at once
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Clients that are killed mid-request (terminated workers) are expected
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+class StubRPCServer:
+    """
+    Minimal JSON-RPC server backed by recorded logs.
+
+    Args:
+        logs (list): Raw log objects as returned by eth_getLogs.
+        receipts (dict, optional): Recorded receipts keyed by tx hash.
+        max_block_range (int, optional): Reject eth_getLogs spanning more blocks, like hosted providers do.
+        max_results (int, optional): Reject eth_getLogs returning more logs than this.
+        latency (float): Seconds to sleep before answering each HTTP request.
+        error_rate (float): Fraction of calls answered with a transient -32000 error
+                            (per item, so batches partly fail).
+        throttle_rate (float): Fraction of HTTP requests answered with 429 Too Many Requests.
+        rate_limit (float, optional): Requests per second accepted (one second of burst); the rest get 429.
+        slow_rate (float): Fraction of HTTP requests delayed by a further `slow_latency`
+                           (above the client timeout this injects timeouts).
+        retry_after (float, optional): Retry-After header sent with 429s.
+    """
+
+    def __init__(self, logs: list = None, receipts: Dict[str, Any] = None,
+                 host: str = "127.0.0.1", port: int = 0,
+                 max_block_range: int = None, max_results: int = None,
+                 latency: float = 0.0, error_rate: float = 0.0, chain_id: int = 137,
+                 seed: int = 0, throttle_rate: float = 0.0, rate_limit: float = None,
+                 slow_rate: float = 0.0, slow_latency: float = 1.0, retry_after: float = None):
+        self.logs = sorted(logs or [], key=lambda l: (_to_int(l["blockNumber"]), _to_int(l["logIndex"])))
+        self.receipts = {k.lower(): v for k, v in (receipts or {}).items()}
+        self._reindex()
+        self.max_block_range = max_block_range
+        self.max_results = max_results
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit = rate_limit
+        self.tokens = rate_limit or 0.0
+        self.refilled = time.monotonic()
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.retry_after = retry_after
+        self.throttled_count = 0
+        self.slow_count = 0
+        self.rng = random.Random(seed)
+        self.chain_id = chain_id
+        self.request_count = 0
+        self.call_counts: Dict[str, int] = {}
+        self.error_count = 0
+        self.lock = threading.Lock()
+        # (first block, fork epoch) pairs; see reorg()
+        self.forks: List[tuple] = []
+        self.head_block = None
+        # Timer-driven block production; see mine()
+        self.pending_logs: List[dict] = []
+        self.mined_at: Dict[int, float] = {}
+        self._miner = None
+        self._mining = threading.Event()
+        self.methods = {
+            "eth_chainId": self.eth_chain_id,
+            "eth_blockNumber": self.eth_block_number,
+            "eth_getBlockByNumber": self.eth_get_block_by_number,
+            "eth_getLogs": self.eth_get_logs,
+            "eth_getTransactionReceipt": self.eth_get_transaction_receipt,
+        }
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"null")
+                status, body = server.handle_http(payload)
+                raw = json.dumps(body).encode()
+                self.send_response(status)
+                if status == 429 and server.retry_after is not None:
+                    self.send_header("Retry-After", str(server.retry_after))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = StubHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubRPCServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_mining()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # --- request handling ---
+
+    def _throttled(self) -> bool:
+        with self.lock:
+            if self.throttle_rate and self.rng.random() < self.throttle_rate:
+                return True
+            if self.rate_limit is None:
+                return False
+            now = time.monotonic()
+            self.tokens = min(self.rate_limit, self.tokens + (now - self.refilled) * self.rate_limit)
+            self.refilled = now
+            if self.tokens < 1.0:
+                return True
+            self.tokens -= 1.0
+            return False
+
+    def handle_http(self, payload):
+        with self.lock:
+            self.request_count += 1
+        if self._throttled():
+            with self.lock:
+                self.throttled_count += 1
+            return 429, {"jsonrpc": "2.0", "id": None, "error": {"code": 429, "message": "Too many requests"}}
+        if self.slow_rate:
+            with self.lock:
+                slow = self.rng.random() < self.slow_rate
+                self.slow_count += slow
+            if slow:
+                time.sleep(self.slow_latency)
+        if self.latency:
+            time.sleep(self.latency)
+        if isinstance(payload, list):
+            return 200, [self.handle_call(call) for call in payload]
+        return 200, self.handle_call(payload)
+
+    def handle_call(self, call: dict) -> dict:
+        method = call.get("method")
+        response = {"jsonrpc": "2.0", "id": call.get("id")}
+        with self.lock:
+            self.call_counts[method] = self.call_counts.get(method, 0) + 1
+        handler = self.methods.get(method)
+        try:
+            if self.error_rate:
+                with self.lock:
+                    fail = self.rng.random() < self.error_rate
+                if fail:
+                    raise RPCError(-32000, "internal error (injected)")
+            if handler is None:
+                raise RPCError(-32601, f"the method {method} does not exist/is not available")
+            response["result"] = handler(*call.get("params", []))
+        except RPCError as e:
+            with self.lock:
+                self.error_count += 1
+            response["error"] = {"code": e.code, "message": e.message}
+        return response
+
+    # --- methods ---
+
+    def head(self) -> int:
+        last_log = _to_int(self.logs[-1]["blockNumber"]) if self.logs else 0
+        if self.head_block is not None:
+            return max(self.head_block, last_log)
+        return last_log
+
+    def block_hash(self, number: int) -> str:
+        """Epoch 0 hashes match the synthetic logs ("0x" + 32-byte block number)."""
+        epoch = 0
+        for first_block, fork_epoch in self.forks:
+            if number >= first_block:
+                epoch = fork_epoch
+        return "0x" + format(epoch, '08x') + format(number, '056x')
+
+    def reorg(self, first_block: int, new_logs: list = None):
+        """
+        Replace the chain from `first_block` on: blocks get new hashes and the
+        logs at or above it are swapped for `new_logs` (re-hashed to the fork).
+        """
+        with self.lock:
+            epoch = len(self.forks) + 1
+            self.forks.append((first_block, epoch))
+            kept = [l for l in self.logs if _to_int(l["blockNumber"]) < first_block]
+            for log in new_logs or []:
+                log = dict(log)
+                log["blockHash"] = self.block_hash(_to_int(log["blockNumber"]))
+                kept.append(log)
+            self.logs = sorted(kept, key=lambda l: (_to_int(l["blockNumber"]), _to_int(l["logIndex"])))
+            self._reindex()
+
+    def mine(self, block_time: float, logs: list = None, start_block: int = None):
+        """
+        Produce a block every `block_time` seconds from a background thread.
+
+        `logs` are held back and become visible when the head reaches their
+        block. The head starts at `start_block` (default: the current head, or
+        just below the first pending log). `mined_at` records the wall-clock
+        time each block appeared.
+        """
+        with self.lock:
+            self.pending_logs = sorted(self.pending_logs + list(logs or []),
+                                       key=lambda l: (_to_int(l["blockNumber"]), _to_int(l["logIndex"])))
+            if start_block is None:
+                start_block = self.head()
+                if not self.logs and self.pending_logs:
+                    start_block = _to_int(self.pending_logs[0]["blockNumber"]) - 1
+            self.head_block = start_block
+        self._mining.set()
+        self._miner = threading.Thread(target=self._mine_loop, args=(block_time,), daemon=True)
+        self._miner.start()
+
+    def stop_mining(self):
+        self._mining.clear()
+        if self._miner is not None:
+            self._miner.join()
+            self._miner = None
+
+    def mine_block(self) -> int:
+        """Advance the head by one block, releasing its pending logs."""
+        with self.lock:
+            number = self.head() + 1
+            released = 0
+            while released < len(self.pending_logs) and _to_int(self.pending_logs[released]["blockNumber"]) <= number:
+                released += 1
+            new_logs, self.pending_logs = self.pending_logs[:released], self.pending_logs[released:]
+            for log in new_logs:
+                log = dict(log, blockHash=self.block_hash(_to_int(log["blockNumber"])))
+                self.logs.append(log)
+                self.logs_by_tx.setdefault(log["transactionHash"].lower(), []).append(log)
+                self.log_blocks.append(_to_int(log["blockNumber"]))
+            self.head_block = number
+            self.mined_at[number] = time.time()
+            return number
+
+    def _mine_loop(self, block_time: float):
+        next_at = time.monotonic() + block_time
+        while self._mining.is_set():
+            time.sleep(max(0.0, next_at - time.monotonic()))
+            if not self._mining.is_set():
+                return
+            self.mine_block()
+            next_at += block_time
+
+    def _reindex(self):
+        # Receipt lookup by tx hash; sorted block numbers so eth_getLogs can bisect
+        self.logs_by_tx: Dict[str, list] = {}
+        for log in self.logs:
+            self.logs_by_tx.setdefault(log["transactionHash"].lower(), []).append(log)
+        self.log_blocks = [_to_int(log["blockNumber"]) for log in self.logs]
+
+    def eth_chain_id(self):
+        return hex(self.chain_id)
+
+    def eth_block_number(self):
+        return hex(self.head())
+
+    def eth_get_block_by_number(self, number, full_transactions: bool = False):
+        number = self.head() if number == "latest" else _to_int(number)
+        if number > self.head():
+            return None
+        return {
+            "number": hex(number),
+            "hash": self.block_hash(number),
+            "parentHash": self.block_hash(number - 1) if number > 0 else "0x" + "0" * 64,
+            "timestamp": hex(1700000000 + number * 2),
+            "transactions": [],
+        }
+
+    def eth_get_logs(self, flt: dict):
+        from_block = flt.get("fromBlock", "latest")
+        to_block = flt.get("toBlock", "latest")
+        start = self.head() if from_block == "latest" else _to_int(from_block)
+        end = self.head() if to_block == "latest" else _to_int(to_block)
+
+        if self.max_block_range is not None and end - start + 1 > self.max_block_range:
+            raise RPCError(-32005, f"block range is too large, max is {self.max_block_range}")
+
+        addresses = _as_list(flt.get("address"))
+        topics = flt.get("topics") or []
+        topic0 = _as_list(topics[0]) if topics else None
+
+        matched = []
+        lo = bisect.bisect_left(self.log_blocks, start)
+        hi = bisect.bisect_right(self.log_blocks, end)
+        for log in self.logs[lo:hi]:
+            if addresses is not None and log["address"].lower() not in addresses:
+                continue
+            if topic0 is not None and (not log["topics"] or log["topics"][0].lower() not in topic0):
+                continue
+            matched.append(log)
+
+        if self.max_results is not None and len(matched) > self.max_results:
+            raise RPCError(-32005, f"query returned more than {self.max_results} results")
+        return matched
+
+    def eth_get_transaction_receipt(self, tx_hash: str):
+        tx_hash = tx_hash.lower()
+        if len(tx_hash) != 66 or not tx_hash.startswith("0x"):
+            raise RPCError(-32602, f"invalid argument 0: hex string has length {len(tx_hash) - 2}, want 64 for common.Hash")
+        if tx_hash in self.receipts:
+            return self.receipts[tx_hash]
+        logs = self.logs_by_tx.get(tx_hash)
+        if not logs:
+            return None
+        first = logs[0]
+        return {
+            "transactionHash": first["transactionHash"],
+            "transactionIndex": first.get("transactionIndex", "0x0"),
+            "blockHash": first["blockHash"],
+            "blockNumber": first["blockNumber"],
+            "from": "0x" + "0" * 40,
+            "to": first["address"],
+            "cumulativeGasUsed": "0x0",
+            "gasUsed": "0x0",
+            "effectiveGasPrice": "0x0",
+            "contractAddress": None,
+            "logs": logs,
+            "logsBloom": "0x" + "0" * 512,
+            "status": "0x1",
+            "type": "0x2",
+        }
+
+def load_logs(path: str) -> list:
+    with open(path) as f:
+        return json.load(f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in JSON-RPC server serving recorded logs")
+    parser.add_argument("--logs", required=True, help="JSON file with a list of raw eth_getLogs results")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--max-block-range", type=int, help="Reject eth_getLogs spanning more blocks")
+    parser.add_argument("--max-results", type=int, help="Reject eth_getLogs returning more logs")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of injected latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with a transient error")
+    parser.add_argument("--block-time", type=float, help="Release the logs block by block, one block every N seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429")
+    parser.add_argument("--rate-limit", type=float, help="Requests per second accepted; the rest get HTTP 429")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests delayed by --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Extra seconds for slow requests")
+
+    args = parser.parse_args()
+
+    logs = load_logs(args.logs)
+    server = StubRPCServer(
+        logs=None if args.block_time else logs,
+        host=args.host,
+        port=args.port,
+        max_block_range=args.max_block_range,
+        max_results=args.max_results,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit=args.rate_limit,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+    )
+    if args.block_time:
+        server.mine(args.block_time, logs)
+        print(f"Mining {len(logs)} logs, one block every {args.block_time}s, on {server.url}")
+    else:
+        print(f"Serving {len(server.logs)} logs on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
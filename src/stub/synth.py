@@ -0,0 +1,243 @@
+import json
+import random
+from src.ctf.derive import derive_binary_positions
+from src.trade_decoder import CTF_EXCHANGE, NEG_RISK_CTF_EXCHANGE
+from src.raw_decoder import ORDER_FILLED_TOPIC
+
+# Synthetic OrderFilled logs in raw JSON-RPC form (hex strings) and Gamma
+# events, for the stub servers and benchmarks.
+
+UMA_ADAPTER = "0x157Ce2d672854c848c9b79C49a8Cc6cc89176a49"
+
+def _word(value: int) -> str:
+    return format(value, '064x')
+
+def _address(value: int) -> str:
+    return "0x" + format(value, '040x')
+
+def _address_topic(address: str) -> str:
+    return "0x" + "0" * 24 + address[2:].lower()
+
+def make_order_filled_log(block_number: int, log_index: int, tx_hash: str, exchange: str,
+                          order_hash: str, maker: str, taker: str,
+                          maker_asset_id: int, taker_asset_id: int,
+                          maker_amount: int, taker_amount: int, fee: int = 0) -> dict:
+    return {
+        "address": exchange,
+        "topics": [ORDER_FILLED_TOPIC, order_hash, _address_topic(maker), _address_topic(taker)],
+        "data": "0x" + "".join(_word(v) for v in (maker_asset_id, taker_asset_id, maker_amount, taker_amount, fee)),
+        "blockNumber": hex(block_number),
+        "blockHash": "0x" + _word(block_number),
+        "transactionHash": tx_hash,
+        "transactionIndex": "0x0",
+        "logIndex": hex(log_index),
+        "removed": False,
+    }
+
+def _event_log(address: str, topics: list, data: bytes, block_number: int, log_index: int, tx_hash: str) -> dict:
+    return {
+        "address": address,
+        "topics": topics,
+        "data": "0x" + data.hex(),
+        "blockNumber": hex(block_number),
+        "blockHash": "0x" + _word(block_number),
+        "transactionHash": tx_hash,
+        "transactionIndex": "0x0",
+        "logIndex": hex(log_index),
+        "removed": False,
+    }
+
+def make_orders_matched_log(block_number: int, log_index: int, tx_hash: str, exchange: str,
+                            taker_order_hash: str, taker_order_maker: str,
+                            maker_asset_id: int, taker_asset_id: int,
+                            maker_amount: int, taker_amount: int) -> dict:
+    from src.dispatcher import ORDERS_MATCHED_TOPIC
+    data = b"".join(v.to_bytes(32, "big") for v in (maker_asset_id, taker_asset_id, maker_amount, taker_amount))
+    return _event_log(exchange, [ORDERS_MATCHED_TOPIC, taker_order_hash, _address_topic(taker_order_maker)],
+                      data, block_number, log_index, tx_hash)
+
+def make_condition_preparation_log(block_number: int, log_index: int, tx_hash: str, condition_id: str,
+                                   oracle: str, question_id: str, outcome_slot_count: int = 2) -> dict:
+    from src.dispatcher import CONDITION_PREPARATION_TOPIC, CONDITIONAL_TOKENS
+    return _event_log(CONDITIONAL_TOKENS,
+                      [CONDITION_PREPARATION_TOPIC, _hex32(condition_id), _address_topic(oracle), question_id],
+                      outcome_slot_count.to_bytes(32, "big"), block_number, log_index, tx_hash)
+
+def make_position_split_log(block_number: int, log_index: int, tx_hash: str, stakeholder: str,
+                            collateral_token: str, condition_id: str, partition: tuple, amount: int) -> dict:
+    from src.dispatcher import POSITION_SPLIT_TOPIC, CONDITIONAL_TOKENS
+    words = [int(collateral_token, 16), 3 * 32, amount, len(partition)] + list(partition)
+    return _event_log(CONDITIONAL_TOKENS,
+                      [POSITION_SPLIT_TOPIC, _address_topic(stakeholder), "0x" + _word(0), _hex32(condition_id)],
+                      b"".join(w.to_bytes(32, "big") for w in words), block_number, log_index, tx_hash)
+
+def make_positions_converted_log(block_number: int, log_index: int, tx_hash: str, stakeholder: str,
+                                 market_id: str, index_set: int, amount: int) -> dict:
+    from src.dispatcher import POSITIONS_CONVERTED_TOPIC, NEG_RISK_ADAPTER
+    return _event_log(NEG_RISK_ADAPTER,
+                      [POSITIONS_CONVERTED_TOPIC, _address_topic(stakeholder), market_id, "0x" + _word(index_set)],
+                      amount.to_bytes(32, "big"), block_number, log_index, tx_hash)
+
+def make_match_logs(block_number: int, first_log_index: int, tx_hash: str, exchange: str,
+                    token: int, price_num: int, price_den: int, fills: list, rng: random.Random) -> list:
+    """
+    Logs of one matchOrders: a BUY taker order filled against maker SELL
+    orders. `fills` is a list of (maker, share amount). Emits the maker
+    OrderFilled logs, the taker summary OrderFilled and OrdersMatched.
+    """
+    taker_order_hash = "0x" + _word(rng.getrandbits(256))
+    taker = _address(rng.getrandbits(160))
+    logs = []
+    log_index = first_log_index
+    total_shares, total_usdc = 0, 0
+    for maker, shares in fills:
+        usdc = shares * price_num // price_den
+        total_shares += shares
+        total_usdc += usdc
+        logs.append(make_order_filled_log(block_number, log_index, tx_hash, exchange,
+                                          "0x" + _word(rng.getrandbits(256)), maker, taker,
+                                          token, 0, shares, usdc))
+        log_index += 1
+    logs.append(make_order_filled_log(block_number, log_index, tx_hash, exchange, taker_order_hash,
+                                      taker, exchange, 0, token, total_usdc, total_shares))
+    logs.append(make_orders_matched_log(block_number, log_index + 1, tx_hash, exchange, taker_order_hash,
+                                        taker, 0, token, total_usdc, total_shares))
+    return logs
+
+def make_noise_log(block_number: int, log_index: int, tx_hash: str, rng: random.Random) -> dict:
+    """A non-OrderFilled log (ERC-1155 TransferSingle shaped) to exercise the prefilter."""
+    return {
+        "address": "0x4D97DCd97eC945f40cF65F87097ACe5EA0476045",
+        "topics": ["0xc3d58168c5ae7397731d063d5bbf3d657854427343f4c083240f7aacaa2d0f62"] +
+                  ["0x" + _word(rng.getrandbits(160)) for _ in range(3)],
+        "data": "0x" + _word(rng.getrandbits(256)) + _word(rng.randrange(1, 10 ** 9)),
+        "blockNumber": hex(block_number),
+        "blockHash": "0x" + _word(block_number),
+        "transactionHash": tx_hash,
+        "transactionIndex": "0x0",
+        "logIndex": hex(log_index),
+        "removed": False,
+    }
+
+def generate_logs(count: int, start_block: int = 1, logs_per_block: int = 50,
+                  noise_ratio: float = 0.0, summary_ratio: float = 0.2,
+                  token_count: int = 1000, address_count: int = 5000, seed: int = 0) -> list:
+    """
+    Generate `count` logs spread over consecutive blocks.
+
+    Args:
+        noise_ratio (float): Fraction of logs that are not OrderFilled.
+        summary_ratio (float): Fraction of OrderFilled logs whose taker is the exchange
+                               itself (the per-match summary log that decoders drop).
+        token_count (int): Number of distinct outcome token IDs.
+        address_count (int): Number of distinct maker/taker wallets.
+    """
+    rng = random.Random(seed)
+    tokens = [rng.getrandbits(256) for _ in range(token_count)]
+    wallets = [_address(rng.getrandbits(160)) for _ in range(address_count)]
+
+    logs = []
+    tx_hash = None
+    for i in range(count):
+        block_number = start_block + i // logs_per_block
+        log_index = i % logs_per_block
+        if log_index % 5 == 0:
+            tx_hash = "0x" + _word(rng.getrandbits(256))
+
+        if rng.random() < noise_ratio:
+            logs.append(make_noise_log(block_number, log_index, tx_hash, rng))
+            continue
+
+        exchange = rng.choice((CTF_EXCHANGE, NEG_RISK_CTF_EXCHANGE))
+        token = rng.choice(tokens)
+        usdc = rng.randrange(1, 10 ** 9)
+        shares = rng.randrange(usdc, usdc * 100)
+        if rng.random() < 0.5:
+            asset_ids, amounts = (0, token), (usdc, shares)
+        else:
+            asset_ids, amounts = (token, 0), (shares, usdc)
+        taker = exchange if rng.random() < summary_ratio else rng.choice(wallets)
+
+        logs.append(make_order_filled_log(
+            block_number, log_index, tx_hash, exchange,
+            "0x" + _word(rng.getrandbits(256)), rng.choice(wallets), taker,
+            asset_ids[0], asset_ids[1], amounts[0], amounts[1],
+        ))
+    return logs
+
+def _hex32(value: str) -> str:
+    return value if value.startswith("0x") else "0x" + value
+
+def make_market(question_id: str, slug: str, market_id: int, neg_risk: bool = False,
+                oracle: str = UMA_ADAPTER) -> dict:
+    """Gamma-shaped market whose conditionId / clobTokenIds are derived from question_id."""
+    derived = derive_binary_positions(oracle, question_id)
+    return {
+        "id": str(market_id),
+        "slug": slug,
+        "question": f"Synthetic market {market_id}?",
+        "conditionId": _hex32(derived["conditionId"]),
+        "questionID": question_id,
+        "oracle": oracle,
+        "negRisk": neg_risk,
+        "outcomes": json.dumps(["Yes", "No"]),
+        # Gamma serializes token IDs as a JSON string of decimal integers
+        "clobTokenIds": json.dumps([
+            str(int(derived["yesTokenId"], 16)),
+            str(int(derived["noTokenId"], 16)),
+        ]),
+        "updatedAt": "2024-01-01T00:00:00Z",
+    }
+
+def generate_events(count: int, markets_per_event: int = 1, seed: int = 0) -> list:
+    """Gamma-shaped events; events with several markets are flagged negRisk."""
+    rng = random.Random(seed)
+    events = []
+    market_id = 0
+    for i in range(count):
+        neg_risk = markets_per_event > 1
+        markets = []
+        for _ in range(markets_per_event):
+            market_id += 1
+            markets.append(make_market(
+                "0x" + _word(rng.getrandbits(256)),
+                f"synthetic-market-{market_id}",
+                market_id,
+                neg_risk=neg_risk,
+            ))
+        events.append({
+            "id": str(i + 1),
+            "slug": f"synthetic-event-{i + 1}",
+            "title": f"Synthetic event {i + 1}",
+            "negRisk": neg_risk,
+            "markets": markets,
+            "updatedAt": "2024-01-01T00:00:00Z",
+        })
+    return events
+
+def market_tokens(market: dict) -> list:
+    """Outcome token IDs (ints) of a Gamma-shaped market."""
+    return [int(t) for t in json.loads(market["clobTokenIds"])]
+
+def generate_match_logs(events: list, tx_count: int, fills_per_tx: int = 3, txs_per_block: int = 20,
+                        start_block: int = 1, address_count: int = 5000, seed: int = 0) -> list:
+    """
+    Logs of `tx_count` matchOrders transactions, each trading a token of
+    one of the `events`' markets: `fills_per_tx` maker fills, the taker
+    summary fill and OrdersMatched, like a real exchange receipt.
+    """
+    rng = random.Random(seed)
+    wallets = [_address(rng.getrandbits(160)) for _ in range(address_count)]
+    markets = [m for event in events for m in event["markets"]]
+
+    logs = []
+    for i in range(tx_count):
+        block_number = start_block + i // txs_per_block
+        market = rng.choice(markets)
+        exchange = NEG_RISK_CTF_EXCHANGE if market.get("negRisk") else CTF_EXCHANGE
+        fills = [(rng.choice(wallets), rng.randrange(10 ** 6, 10 ** 10)) for _ in range(fills_per_tx)]
+        logs.extend(make_match_logs(
+            block_number, (i % txs_per_block) * (fills_per_tx + 2), "0x" + _word(rng.getrandbits(256)),
+            exchange, rng.choice(market_tokens(market)), rng.randrange(1, 100), 100, fills, rng,
+        ))
+    return logs
@@ -0,0 +1,191 @@
+from array import array
+from decimal import Decimal
+from typing import Optional, Dict, Any, List
+
+# Compact trade representations.
+# Raw integers are kept as decoded; side / token_id / price are derived on
+# access and strings are only produced by to_dict() (serialization time).
+# to_dict() output is identical to what build_trade has always returned.
+
+def _side(maker_asset_id: int) -> str:
+    # makerAssetId = 0 (USDC) -> Maker BUYS token
+    # takerAssetId = 0 (USDC) -> Maker SELLS token (gets USDC)
+    return "BUY" if maker_asset_id == 0 else "SELL"
+
+def _token_id(maker_asset_id: int, taker_asset_id: int) -> str:
+    return hex(taker_asset_id) if maker_asset_id == 0 else hex(maker_asset_id)
+
+def _price(maker_asset_id: int, maker_amount: int, taker_amount: int) -> Decimal:
+    # price = USDC amount / token amount (both in base units)
+    try:
+        if maker_asset_id == 0:
+            return Decimal(maker_amount) / Decimal(taker_amount)
+        return Decimal(taker_amount) / Decimal(maker_amount)
+    except:
+        return Decimal(0)
+
+def _to_dict(tx_hash, log_index, exchange, maker, taker, maker_asset_id, taker_asset_id,
+             maker_amount, taker_amount, block_number) -> Dict[str, Any]:
+    trade = {
+        "tx_hash": tx_hash,
+        "log_index": log_index,
+        "exchange": exchange,
+        "maker": maker,
+        "taker": taker,
+        "maker_asset_id": str(maker_asset_id),
+        "taker_asset_id": str(taker_asset_id),
+        "maker_amount": str(maker_amount),
+        "taker_amount": str(taker_amount),
+        "price": str(_price(maker_asset_id, maker_amount, taker_amount)),
+        "token_id": _token_id(maker_asset_id, taker_asset_id),
+        "side": _side(maker_asset_id),
+    }
+    if block_number is not None:
+        trade["block_number"] = block_number
+    return trade
+
+class Trade:
+    """A single OrderFilled fill."""
+
+    __slots__ = ("tx_hash", "log_index", "exchange", "maker", "taker",
+                 "maker_asset_id", "taker_asset_id", "maker_amount", "taker_amount",
+                 "block_number", "order_hash")
+
+    def __init__(self, tx_hash: str, log_index: int, exchange: str, maker: str, taker: str,
+                 maker_asset_id: int, taker_asset_id: int, maker_amount: int, taker_amount: int,
+                 block_number: int = None, order_hash: bytes = None):
+        self.tx_hash = tx_hash
+        self.log_index = log_index
+        self.exchange = exchange
+        self.maker = maker
+        self.taker = taker
+        self.maker_asset_id = maker_asset_id
+        self.taker_asset_id = taker_asset_id
+        self.maker_amount = maker_amount
+        self.taker_amount = taker_amount
+        self.block_number = block_number
+        # Not serialized; used to group fills under their OrdersMatched
+        self.order_hash = order_hash
+
+    @classmethod
+    def from_event(cls, tx_hash: str, log, args, block_number: int = None) -> Optional["Trade"]:
+        """
+        Build from a decoded OrderFilled event. Returns None for the taker
+        summary log (taker == exchange, i.e. the log address itself).
+        """
+        exchange = log['address']
+        if args['taker'].lower() == exchange.lower():
+            return None
+        return cls(tx_hash, log['logIndex'], exchange, args['maker'], args['taker'],
+                   args['makerAssetId'], args['takerAssetId'],
+                   args['makerAmountFilled'], args['takerAmountFilled'], block_number,
+                   args.get('orderHash'))
+
+    @property
+    def side(self) -> str:
+        return _side(self.maker_asset_id)
+
+    @property
+    def token(self) -> int:
+        """Outcome token ID as an integer."""
+        return self.taker_asset_id if self.maker_asset_id == 0 else self.maker_asset_id
+
+    @property
+    def token_id(self) -> str:
+        return _token_id(self.maker_asset_id, self.taker_asset_id)
+
+    @property
+    def price(self) -> Decimal:
+        return _price(self.maker_asset_id, self.maker_amount, self.taker_amount)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return _to_dict(self.tx_hash, self.log_index, self.exchange, self.maker, self.taker,
+                        self.maker_asset_id, self.taker_asset_id,
+                        self.maker_amount, self.taker_amount, self.block_number)
+
+    def __eq__(self, other):
+        if not isinstance(other, Trade):
+            return NotImplemented
+        # order_hash is grouping metadata (TradeBatch does not keep it)
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__ if f != "order_hash")
+
+    def __repr__(self):
+        return f"Trade({self.tx_hash}#{self.log_index} {self.side} {self.token_id})"
+
+class TradeBatch:
+    """
+    Struct-of-arrays container for many fills.
+
+    Small integers live in typed arrays; 256-bit asset IDs stay Python ints.
+    Amounts use unsigned 64-bit arrays and fall back to lists if a value
+    ever does not fit.
+    """
+
+    def __init__(self):
+        self.tx_hash: List[str] = []
+        self.log_index = array("l")
+        self.block_number = array("q")
+        self.exchange_code = array("B")
+        self.exchanges: List[str] = []
+        self._exchange_codes: Dict[str, int] = {}
+        self.maker: List[str] = []
+        self.taker: List[str] = []
+        self.maker_asset_id: List[int] = []
+        self.taker_asset_id: List[int] = []
+        self.maker_amount = array("Q")
+        self.taker_amount = array("Q")
+
+    def __len__(self):
+        return len(self.tx_hash)
+
+    def _append_amount(self, name: str, value: int):
+        column = getattr(self, name)
+        try:
+            column.append(value)
+        except OverflowError:
+            column = list(column)
+            column.append(value)
+            setattr(self, name, column)
+
+    def append(self, trade: Trade):
+        code = self._exchange_codes.get(trade.exchange)
+        if code is None:
+            code = len(self.exchanges)
+            self.exchanges.append(trade.exchange)
+            self._exchange_codes[trade.exchange] = code
+        self.tx_hash.append(trade.tx_hash)
+        self.log_index.append(trade.log_index)
+        # -1 marks "no block number"
+        self.block_number.append(-1 if trade.block_number is None else trade.block_number)
+        self.exchange_code.append(code)
+        self.maker.append(trade.maker)
+        self.taker.append(trade.taker)
+        self.maker_asset_id.append(trade.maker_asset_id)
+        self.taker_asset_id.append(trade.taker_asset_id)
+        self._append_amount("maker_amount", trade.maker_amount)
+        self._append_amount("taker_amount", trade.taker_amount)
+
+    def extend(self, trades):
+        for trade in trades:
+            self.append(trade)
+
+    def __getitem__(self, i: int) -> Trade:
+        block_number = self.block_number[i]
+        return Trade(self.tx_hash[i], self.log_index[i], self.exchanges[self.exchange_code[i]],
+                     self.maker[i], self.taker[i], self.maker_asset_id[i], self.taker_asset_id[i],
+                     self.maker_amount[i], self.taker_amount[i],
+                     None if block_number < 0 else block_number)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        exchanges = self.exchanges
+        return [
+            _to_dict(self.tx_hash[i], self.log_index[i], exchanges[self.exchange_code[i]],
+                     self.maker[i], self.taker[i], self.maker_asset_id[i], self.taker_asset_id[i],
+                     self.maker_amount[i], self.taker_amount[i],
+                     None if self.block_number[i] < 0 else self.block_number[i])
+            for i in range(len(self))
+        ]
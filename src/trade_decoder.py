@@ -1,9 +1,11 @@
 import os
 import json
 import argparse
-from decimal import Decimal
-from web3 import Web3
 from dotenv import load_dotenv
+from src import metrics
+from src.raw_decoder import decode_order_filled, is_order_filled
+from src.indexer.rpc import RPCError, get_client, format_log
+from src.trade import Trade
 
 # Load environment variables
 load_dotenv()
@@ -26,120 +28,155 @@ ORDER_FILLED_ABI = {
     "type": "event"
 }
 
-def decode_trades(tx_hash: str, rpc_url: str = None) -> list:
+# Polymarket exchange contracts (both emit the same OrderFilled event)
+CTF_EXCHANGE = "0x4bFb41d5B3570DeFd03C39a9A4D8dE6Bd8B8982E"
+NEG_RISK_CTF_EXCHANGE = "0xC5d563A36AE78145C45a50134d48A1215220f80a"
+EXCHANGE_ADDRESSES = [CTF_EXCHANGE, NEG_RISK_CTF_EXCHANGE]
+
+def build_trade(tx_hash: str, log, args, block_number: int = None) -> dict:
+    """
+    Turn a decoded OrderFilled event into a trade dict.
+
+    Returns None for the taker summary log (taker == exchange), which would
+    otherwise double count the fill.
+    """
+    # Stage 1 Guide says: 
+    # "通常会有...一条'taker汇总'的OrderFilled，其中taker字段会显示为Exchange合约地址本身...过滤掉 taker == exchange_address"
+    # The log address itself IS the exchange address (see Trade.from_event).
+    trade = Trade.from_event(tx_hash, log, args, block_number)
+    if trade is None:
+        return None
+    return trade.to_dict()
+
+def _resolve_rpc_url(rpc_url: str = None) -> str:
     if not rpc_url:
         rpc_url = os.getenv("RPC_URL")
     
     if not rpc_url:
         raise ValueError("RPC_URL not set")
+    return rpc_url
 
-    w3 = Web3(Web3.HTTPProvider(rpc_url))
-    tx_receipt = w3.eth.get_transaction_receipt(tx_hash)
-    
-    # Contract interface for decoding logs
-    # We can use a minimal contract instance to decode logs
-    contract = w3.eth.contract(abi=[ORDER_FILLED_ABI])
-    
+def trades_from_receipt(tx_hash: str, tx_receipt: dict, include_block: bool = False) -> list:
+    """
+    Decode every OrderFilled fill in a raw (JSON-RPC) receipt.
+
+    `include_block` adds "block_number" to each trade (needed by the trade stores).
+    """
     trades = []
+    block_number = int(tx_receipt['blockNumber'], 16) if include_block else None
+    matched = 0
     
     for log in tx_receipt['logs']:
-        try:
-            # Attempt to decode log as OrderFilled
-            event = contract.events.OrderFilled().process_log(log)
-            args = event['args']
-            
-            # Filter out Exchange wrapper logs if checking strictly,
-            # but usually duplicated logs have 'taker' as the Exchange contract address which triggers the match?
-            # Stage 1 Guide says: 
-            # "通常会有...一条'taker汇总'的OrderFilled，其中taker字段会显示为Exchange合约地址本身...过滤掉 taker == exchange_address"
-            # We need the exchange address. The log address itself IS the exchange address.
-            exchange_address = log['address']
-            
-            if args['taker'].lower() == exchange_address.lower():
-                continue
+        # topic0 prefilter + fixed-offset decode; None for any other event
+        args = decode_order_filled(log)
+        if args is None:
+            continue
+        matched += 1
 
-            maker_asset_id = args['makerAssetId']
-            taker_asset_id = args['takerAssetId']
-            maker_amount = args['makerAmountFilled']
-            taker_amount = args['takerAmountFilled']
-            
-            # Logic for price and side
-            # makerAssetId == 0 means Maker is spending USDC (BUYING outcome token)
-            # takerAssetId == 0 means Maker is spending Token (SELLING outcome token) -> Wait
-            # In Polymarket:
-            # makerAssetId = 0 (USDC) -> Maker BUYS token
-            # takerAssetId = 0 (USDC) -> Maker SELLS token (gets USDC)
-            
-            price = Decimal(0)
-            side = ""
-            token_id = ""
-            
-            # Calculate price: USDC amount / Token amount
-            # Note: Both are usually in base units. 
-            # If USDC is 6 decimals and Token is "1e6 per unit", the ratio is same as raw integers ratio.
-            
-            if maker_asset_id == 0:
-                # Maker Spends USDC -> Maker BUYS Info
-                # Price = MakerAmt (USDC) / TakerAmt (Token)
-                try:
-                    price = Decimal(maker_amount) / Decimal(taker_amount)
-                except:
-                    price = Decimal(0)
-                
-                token_id = hex(taker_asset_id)
-                side = "BUY"
-            else:
-                # Maker Spends Token -> Maker SELLS Info
-                # Taker Spends USDC
-                # Price = TakerAmt (USDC) / MakerAmt (Token)
-                try:
-                    price = Decimal(taker_amount) / Decimal(maker_amount)
-                except:
-                    price = Decimal(0)
-                    
-                token_id = hex(maker_asset_id)
-                side = "SELL"
-
-            # Format fields
-            trade = {
-                "tx_hash": tx_hash,
-                "log_index": log['logIndex'],
-                "exchange": exchange_address,
-                "maker": args['maker'],
-                "taker": args['taker'],
-                "maker_asset_id": str(maker_asset_id),
-                "taker_asset_id": str(taker_asset_id),
-                "maker_amount": str(maker_amount),
-                "taker_amount": str(taker_amount),
-                "price": f"{price:.6f}".rstrip('0').rstrip('.') if '.' in f"{price:.6f}" else f"{price:.6f}",
-                # Ensure price format is string float
-                # Stage 1 example says "1.0", "0.5".
-                # Let's start with simple str(price) or float formatting
-                # But example showed "1.0". 
-                "token_id": token_id, 
-                "side": side
-            }
-            # Refine price formatting to match example exactly if possible
-            trade["price"] = str(price)
-
-            trades.append(trade)
-
-        except Exception as e:
-            # Not an OrderFilled event or decode failed
+        trade = build_trade(tx_hash, format_log(log), args, block_number)
+        if trade is None:
             continue
+
+        trades.append(trade)
+
+    if metrics.ENABLED:
+        _observe_receipt(tx_receipt['logs'], matched, len(trades))
             
     return trades
 
+def _observe_receipt(logs: list, matched: int, fills: int):
+    metrics.LOGS_SCANNED.inc("receipt", amount=len(logs))
+    metrics.LOGS_MATCHED.inc("receipt", amount=matched)
+    metrics.FILLS.inc("receipt", amount=fills)
+    # OrderFilled topic but a payload the fixed-offset decoder rejected
+    malformed = sum(1 for log in logs if is_order_filled(log)) - matched
+    if malformed:
+        metrics.DECODE_FAILURES.inc("malformed", amount=malformed)
+
+def decode_trades(tx_hash: str, rpc_url: str = None, include_block: bool = False) -> list:
+    client = get_client(_resolve_rpc_url(rpc_url))
+    tx_receipt = client.get_receipt(tx_hash)
+    if tx_receipt is None:
+        if metrics.ENABLED:
+            metrics.DECODE_FAILURES.inc("receipt_not_found")
+        raise ValueError(f"Transaction {tx_hash} not found")
+
+    with metrics.span("decode_receipt"):
+        return trades_from_receipt(tx_hash, tx_receipt, include_block)
+
+def decode_trades_many(tx_hashes: list, rpc_url: str = None, batch_size: int = 100,
+                       include_block: bool = False) -> list:
+    """
+    Decode trades for many transactions.
+
+    Receipts are fetched over one shared keep-alive session, packed into
+    JSON-RPC batches of `batch_size`. Trades are returned in the order of
+    `tx_hashes`; unknown hashes and hashes the node rejects are reported and
+    skipped.
+    """
+    client = get_client(_resolve_rpc_url(rpc_url), batch_size=batch_size)
+    receipts = client.get_receipts(tx_hashes)
+
+    trades = []
+    for tx_hash, tx_receipt in zip(tx_hashes, receipts):
+        if tx_receipt is None:
+            if metrics.ENABLED:
+                metrics.DECODE_FAILURES.inc("receipt_not_found")
+            print(f"Transaction {tx_hash} not found")
+            continue
+        if isinstance(tx_receipt, RPCError):
+            if metrics.ENABLED:
+                metrics.DECODE_FAILURES.inc("receipt_rejected")
+            print(f"Transaction {tx_hash}: {tx_receipt}")
+            continue
+        trades.extend(trades_from_receipt(tx_hash, tx_receipt, include_block))
+    return trades
+
+def read_tx_hash_file(path: str) -> list:
+    """One hash per line; blank lines and '#' comments are ignored."""
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Trade Decoder")
-    parser.add_argument("--tx-hash", required=True, help="Transaction Hash")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--tx-hash", help="Transaction Hash")
+    group.add_argument("--tx-hash-file", help="File with one transaction hash per line")
+    parser.add_argument("--batch-size", type=int, default=100, help="Receipts per JSON-RPC batch request")
     parser.add_argument("--output", help="Output JSON file path")
+    parser.add_argument("--store", help="Also upsert into a trade store: sqlite:<path> or parquet:<dir>")
+    parser.add_argument("--service", nargs="?", const="", help="Decode via the resident service (src.service); "
+                                                               "address defaults to DECODE_SERVICE")
     
     args = parser.parse_args()
     
     try:
-        trades = decode_trades(args.tx_hash)
+        # Stores partition / query by block, so keep the block number when storing
+        include_block = bool(args.store)
+        if args.service is not None:
+            from src.client import ServiceClient
+            client = ServiceClient(args.service or None)
+            if args.tx_hash_file:
+                trades = []
+                for result in client.decode_txs(read_tx_hash_file(args.tx_hash_file), include_block=include_block):
+                    if "error" in result:
+                        print(result["error"])
+                    else:
+                        trades.extend(result["trades"])
+            else:
+                trades = client.decode_tx(args.tx_hash, include_block=include_block)
+        elif args.tx_hash_file:
+            trades = decode_trades_many(read_tx_hash_file(args.tx_hash_file), batch_size=args.batch_size,
+                                        include_block=include_block)
+        else:
+            trades = decode_trades(args.tx_hash, include_block=include_block)
         print(json.dumps(trades, indent=2))
+
+        if args.store:
+            from src.store.writer import open_store
+            store = open_store(args.store)
+            store.upsert(trades)
+            store.close()
         
         if args.output:
             # Create directory if not exists
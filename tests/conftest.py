@@ -0,0 +1,52 @@
+import pytest
+from src.stub.rpc import StubRPCServer
+from src.stub.gamma import StubGammaServer
+from src.stub.synth import generate_logs, generate_events
+from src.indexer.cache import set_cache
+
+# Shared fixtures: a stand-in chain of 30 blocks x 10 synthetic logs served
+# by StubRPCServer, and synthetic Gamma events served by StubGammaServer.
+# The response cache is off so every test sees the stand-ins as they are now.
+
+BLOCKS = 30
+LOGS_PER_BLOCK = 10
+
+def make_logs(blocks: int, start_block: int = 1, seed: int = 0, **kwargs) -> list:
+    return generate_logs(blocks * LOGS_PER_BLOCK, start_block=start_block,
+                         logs_per_block=LOGS_PER_BLOCK, seed=seed, **kwargs)
+
+def replacement_logs(first_block: int, last_block: int, seed: int = 1) -> list:
+    """Different fills for blocks [first_block, last_block], as a reorg would bring."""
+    return make_logs(last_block - first_block + 1, start_block=first_block, seed=seed)
+
+def trade_keys(trades) -> list:
+    return sorted((t["block_number"], t["log_index"], t["tx_hash"].lower()) for t in trades)
+
+def is_fill(log: dict) -> bool:
+    """OrderFilled that is not the taker summary (taker == exchange)."""
+    return len(log["topics"]) == 4 and log["topics"][3][-40:].lower() != log["address"][-40:].lower()
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    set_cache(None)
+    yield
+    set_cache(None)
+
+@pytest.fixture
+def logs():
+    return make_logs(BLOCKS)
+
+@pytest.fixture
+def chain(logs):
+    with StubRPCServer(logs=logs) as server:
+        yield server
+
+@pytest.fixture
+def events():
+    return generate_events(5, markets_per_event=2)
+
+@pytest.fixture
+def gamma(events, monkeypatch):
+    with StubGammaServer(events=events) as server:
+        monkeypatch.setattr("src.indexer.gamma.GAMMA_API_URL", server.url)
+        yield server
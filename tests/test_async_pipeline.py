@@ -0,0 +1,60 @@
+import time
+import asyncio
+from src.async_demo import run_pipeline
+from src.indexer.aio import HostLimiter
+from src.market_decoder import decode_market
+from src.stub.gamma import StubGammaServer
+from src.stub.rpc import StubRPCServer
+from src.trade_decoder import decode_trades
+
+def test_pipeline_matches_sequential_demo(chain, logs, gamma, events):
+    tx_hashes = list(dict.fromkeys(log["transactionHash"] for log in logs))[:20]
+    slug = events[1]["slug"]
+    documents = asyncio.run(run_pipeline(tx_hashes + ["0x" + "00" * 32], event_slug=slug,
+                                         rpc_url=chain.url, gamma_url=gamma.url, concurrency=4))
+
+    market = decode_market(slug=slug)
+    expected = [{"stage1": {"tx_hash": h, "trades": decode_trades(h, chain.url), "market": market}}
+                for h in tx_hashes]
+    assert documents[:-1] == expected
+    missing = documents[-1]["stage1"]
+    assert "not found" in missing["trades_error"] and missing["market"] == market
+
+def test_unknown_market_is_reported(chain, logs, gamma):
+    tx_hash = logs[0]["transactionHash"]
+    [document] = asyncio.run(run_pipeline([tx_hash], event_slug="no-such-event",
+                                          rpc_url=chain.url, gamma_url=gamma.url))
+    assert document["stage1"]["trades"] == decode_trades(tx_hash, chain.url)
+    assert "market_error" in document["stage1"]
+
+def test_throughput_scales_with_concurrency(logs, events):
+    tx_hashes = list(dict.fromkeys(log["transactionHash"] for log in logs))[:32]
+    with StubRPCServer(logs=logs, latency=0.03) as rpc, StubGammaServer(events=events, latency=0.03) as gamma:
+        def elapsed(concurrency):
+            t0 = time.perf_counter()
+            asyncio.run(run_pipeline(tx_hashes, event_slug=events[0]["slug"], rpc_url=rpc.url,
+                                     gamma_url=gamma.url, concurrency=concurrency, per_host=concurrency))
+            return time.perf_counter() - t0
+
+        serial, concurrent = elapsed(1), elapsed(16)
+    assert serial > 0.03 * len(tx_hashes)
+    assert concurrent < serial / 3
+
+def test_limiter_bounds_requests_in_flight():
+    async def run():
+        limiter = HostLimiter(total=6, per_host=2)
+        peak = {"a": 0, "b": 0, "total": 0}
+        current = {"a": 0, "b": 0}
+
+        async def request(host):
+            async with limiter.slot(f"http://{host}/x"):
+                current[host] += 1
+                peak[host] = max(peak[host], current[host])
+                peak["total"] = max(peak["total"], limiter.in_flight)
+                await asyncio.sleep(0.01)
+                current[host] -= 1
+
+        await asyncio.gather(*(request(host) for host in "ab" * 10))
+        return peak
+
+    assert asyncio.run(run()) == {"a": 2, "b": 2, "total": 4}
@@ -0,0 +1,67 @@
+import pytest
+from src.indexer.backfill import backfill, _is_range_error
+from src.indexer.pool import Throttled
+from src.indexer.rpc import RPCError
+from src.stub.rpc import StubRPCServer
+from src.trade_decoder import decode_trades
+from conftest import BLOCKS, make_logs, is_fill
+
+def key(trade: dict) -> tuple:
+    return trade["block_number"], trade["log_index"]
+
+def test_backfill_matches_receipt_decoding(chain, logs):
+    trades = list(backfill(1, BLOCKS, rpc_url=chain.url))
+    tx_hashes = list(dict.fromkeys(log["transactionHash"] for log in logs))
+    expected = [
+        dict(trade, block_number=int(log["blockNumber"], 16))
+        for tx_hash in tx_hashes
+        for trade in decode_trades(tx_hash, chain.url)
+        for log in logs if log["transactionHash"] == tx_hash and int(log["logIndex"], 16) == trade["log_index"]
+    ]
+    assert trades
+    assert sorted(trades, key=key) == sorted(expected, key=key)
+    # Taker summary logs are dropped
+    assert len(trades) == sum(map(is_fill, logs))
+
+def test_range_errors_split_the_range(logs):
+    with StubRPCServer(logs=logs) as reference:
+        expected = list(backfill(1, BLOCKS, rpc_url=reference.url))
+    with StubRPCServer(logs=logs, max_block_range=4) as limited:
+        trades = list(backfill(1, BLOCKS, rpc_url=limited.url, chunk_size=BLOCKS))
+    assert trades == expected
+
+def test_rejected_range_is_not_retried():
+    blocks = 400
+    logs = make_logs(blocks)
+    with StubRPCServer(logs=logs, max_block_range=8) as limited:
+        trades = list(backfill(1, blocks, rpc_url=limited.url, chunk_size=64))
+        calls, rejected = limited.call_counts["eth_getLogs"], limited.error_count
+    assert len(trades) == sum(map(is_fill, logs))
+    # Once the cap is learned the range stays just below it instead of
+    # doubling back into a rejection after every fast response
+    assert rejected <= 6
+    assert calls - rejected <= blocks // 8 + 4
+
+def test_throttling_does_not_split_the_range(logs):
+    with StubRPCServer(logs=logs) as reference:
+        expected = list(backfill(1, BLOCKS, rpc_url=reference.url))
+    with StubRPCServer(logs=logs, rate_limit=1.0) as throttled:
+        # Spend the one-request burst so the scan is answered 429 first
+        throttled.handle_http({"jsonrpc": "2.0", "id": 0, "method": "eth_chainId", "params": []})
+        trades = list(backfill(1, BLOCKS, rpc_url=throttled.url, chunk_size=BLOCKS))
+        assert throttled.throttled_count >= 1
+        # Retried with backoff over the same range: one answered eth_getLogs
+        assert throttled.call_counts["eth_getLogs"] == 1
+    assert trades == expected
+
+@pytest.mark.parametrize("error, expected", [
+    (RPCError(-32005, "query returned more than 10000 results"), True),
+    (RPCError(-32602, "Log response size exceeded. You can make eth_getLogs requests with up to a 2K block range"), True),
+    (RPCError(-32000, "exceed maximum block range: 3500"), True),
+    (RPCError(-32005, "project ID request rate exceeded"), False),
+    (RPCError(429, "Too many requests"), False),
+    (Throttled("429 Too Many Requests"), False),
+    (TimeoutError("timed out"), False),
+])
+def test_is_range_error(error, expected):
+    assert _is_range_error(error) is expected
@@ -0,0 +1,33 @@
+import json
+from src.bench.suite import BASELINE_PATH, CASES, METRICS, compare, run_case
+
+def results(**overrides):
+    metrics = {"throughput": 1000.0, "p50_ms": 1.0, "p99_ms": 2.0, "peak_rss_mb": 50.0,
+               "alloc_bytes_per_unit": 500.0, "blocks_per_unit": 4.0}
+    metrics.update(overrides)
+    return {"decode_trades": metrics}
+
+def test_compare_flags_only_regressions_past_tolerance():
+    baseline = results()
+    assert compare(results(throughput=800.0, p50_ms=1.2), baseline, 0.25) == []
+    assert compare(results(throughput=5000.0, peak_rss_mb=10.0), baseline, 0.25) == []
+    regressions = compare(results(throughput=700.0, alloc_bytes_per_unit=700.0), baseline, 0.25)
+    assert [r.split(":")[0] for r in regressions] == ["decode_trades.throughput",
+                                                      "decode_trades.alloc_bytes_per_unit"]
+
+def test_p99_gets_twice_the_tolerance():
+    baseline = results()
+    assert compare(results(p99_ms=2.9), baseline, 0.25) == []
+    assert compare(results(p99_ms=3.1), baseline, 0.25) != []
+
+def test_stored_baseline_covers_every_case():
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+    assert set(baseline["results"]) == set(CASES)
+    for metrics in baseline["results"].values():
+        assert all(metrics[m] > 0 for m in METRICS if m != "blocks_per_unit")
+
+def test_case_runs_in_its_own_process():
+    metrics = run_case("derive_binary_positions", {"derive_count": 50, "alloc_sample": 10, "repeat": 1})
+    assert metrics["unit"] == "markets" and metrics["count"] == 50
+    assert set(METRICS) <= set(metrics)
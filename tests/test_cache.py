@@ -0,0 +1,56 @@
+import pytest
+from src.indexer.backfill import iter_order_filled_logs
+from src.indexer.cache import (ResponseCache, ResponseStore, CacheMiss, http_key,
+                               export_fixtures, import_fixtures)
+from src.indexer.rpc import RPCClient, RPCError
+from conftest import BLOCKS
+
+DEAD_URL = "http://127.0.0.1:9"
+
+def make_cache(tmp_path, mode):
+    return ResponseCache(ResponseStore(str(tmp_path / "cache.db")), mode=mode, confirmations=0)
+
+def test_replay_needs_no_network(chain, logs, tmp_path):
+    tx_hashes = list(dict.fromkeys(log["transactionHash"] for log in logs))[:20]
+    recorder = RPCClient(chain.url, cache=make_cache(tmp_path, "record"))
+    recorded_logs = list(iter_order_filled_logs(recorder, 1, BLOCKS, chunk_size=7))
+    recorded_receipts = recorder.get_receipts(tx_hashes)
+    recorder.cache.store.close()
+
+    replayer = RPCClient(DEAD_URL, cache=make_cache(tmp_path, "replay"), max_retries=0)
+    # Different chunking is served from the recorded ranges
+    assert list(iter_order_filled_logs(replayer, 1, BLOCKS, chunk_size=11)) == recorded_logs
+    assert replayer.get_receipts(tx_hashes) == recorded_receipts
+    assert replayer.cache.misses == 0
+    with pytest.raises(CacheMiss):
+        replayer.get_receipt("0x" + "ff" * 32)
+
+def test_read_through_serves_repeats_from_cache(chain, logs, tmp_path):
+    client = RPCClient(chain.url, cache=make_cache(tmp_path, "read-through"))
+    tx_hash = logs[0]["transactionHash"]
+    first = client.get_receipt(tx_hash)
+    calls = dict(chain.call_counts)
+    assert client.get_receipt(tx_hash.upper().replace("0X", "0x")) == first
+    assert chain.call_counts == calls
+
+def test_refused_batch_items_are_not_recorded(chain, logs, tmp_path):
+    client = RPCClient(chain.url, cache=make_cache(tmp_path, "read-through"), backoff=0)
+    good = logs[0]["transactionHash"]
+    results = client.get_receipts([good, "0x1234"])
+    assert isinstance(results[1], RPCError) and results[0] is not None
+    assert client.cache.store.stats()["keys"] == 1
+    with pytest.raises(RPCError):
+        client.batch_call([("eth_getTransactionReceipt", ["0x1234"])], raise_errors=True)
+
+def test_fixture_round_trip_keeps_odd_slugs(tmp_path):
+    store = ResponseStore(str(tmp_path / "a.db"))
+    slug = "will-x/happy? 100%&more"
+    events = [{"id": "1", "slug": slug}]
+    store.put(http_key("/events", {"slug": slug}), events)
+    store.put("rpc:eth_getTransactionReceipt:[\"0xabc\"]", {"blockNumber": "0x1", "logs": []})
+    assert export_fixtures(store, str(tmp_path / "fixtures")) == 2
+
+    copy = ResponseStore(str(tmp_path / "b.db"))
+    assert import_fixtures(copy, str(tmp_path / "fixtures")) == 2
+    assert copy.get(http_key("/events", {"slug": slug})) == events
+    assert sorted(copy.iter_keys()) == sorted(store.iter_keys())
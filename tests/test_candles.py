@@ -0,0 +1,93 @@
+import random
+from decimal import Decimal
+from src.candles import CandleEngine, block_timestamps
+from src.indexer.backfill import iter_trades
+from src.indexer.rpc import get_client, format_log
+from src.stub.synth import generate_logs
+from src.raw_decoder import decode_order_filled
+from src.trade import Trade
+from conftest import BLOCKS
+
+def fills(count=3000, seed=0):
+    trades = []
+    for log in map(format_log, generate_logs(count, token_count=5, logs_per_block=20, seed=seed)):
+        trade = Trade.from_event(log["transactionHash"], log, decode_order_filled(log), log["blockNumber"])
+        if trade is not None:
+            trades.append(trade)
+    return trades
+
+def timestamps(trades):
+    # 12s blocks, so 1m / 5m buckets hold several blocks
+    return {t.block_number: 1700000000 + 12 * t.block_number for t in trades}
+
+def states(engine):
+    return {name: {token: [c.to_state() for c in engine.query(token, name)] for token in engine.tokens()}
+            for name in engine.intervals}
+
+def test_candle_fields_match_the_fills():
+    trades = fills()
+    engine = CandleEngine()
+    engine.add_many(trades, timestamps(trades))
+    token = trades[0].token
+    bucket = engine.query(token, "1h")[0]
+    in_bucket = [t for t in trades if t.token == token and
+                 bucket.start <= timestamps(trades)[t.block_number] < bucket.start + 3600]
+    in_bucket.sort(key=lambda t: (t.block_number, t.log_index))
+    candle = bucket.to_dict()
+    assert candle["count"] == len(in_bucket)
+    assert candle["open"] == str(in_bucket[0].price) and candle["close"] == str(in_bucket[-1].price)
+    assert Decimal(candle["high"]) == max(t.price for t in in_bucket)
+    assert Decimal(candle["low"]) == min(t.price for t in in_bucket)
+    sizes = [t.taker_amount if t.side == "BUY" else t.maker_amount for t in in_bucket]
+    usdc = [t.maker_amount if t.side == "BUY" else t.taker_amount for t in in_bucket]
+    assert candle["volume"] == str(sum(sizes)) and candle["notional"] == str(sum(usdc))
+    assert candle["vwap"] == str(Decimal(sum(usdc)) / Decimal(sum(sizes)))
+
+def test_merge_of_shuffled_shards_matches_one_pass():
+    trades = fills()
+    ts = timestamps(trades)
+    whole = CandleEngine()
+    whole.add_many(trades, ts)
+
+    shuffled = list(trades)
+    random.Random(3).shuffle(shuffled)
+    shards = [CandleEngine() for _ in range(4)]
+    for i, trade in enumerate(shuffled):
+        shards[i % 4].add(trade, ts[trade.block_number])
+    left = CandleEngine()
+    left.merge(shards[0]); left.merge(shards[1])
+    right = CandleEngine()
+    right.merge(shards[2]); right.merge(shards[3])
+    left.merge(right)
+    assert states(left) == states(whole)
+
+def test_dicts_and_trades_agree_and_state_round_trips(tmp_path):
+    trades = fills(1000)
+    ts = timestamps(trades)
+    from_trades, from_dicts = CandleEngine(), CandleEngine()
+    from_trades.add_many(trades, ts)
+    from_dicts.add_many([t.to_dict() for t in trades], ts)
+    assert states(from_dicts) == states(from_trades)
+    path = str(tmp_path / "candles.json")
+    from_trades.save(path)
+    assert states(CandleEngine.load(path)) == states(from_trades)
+
+def test_range_query_and_unknown_token():
+    trades = fills()
+    engine = CandleEngine()
+    engine.add_many(trades, timestamps(trades))
+    token = trades[0].token
+    every = engine.query(token, "1m")
+    middle = engine.query(hex(token), "1m", every[2].start, every[5].start)
+    assert [c.start for c in middle] == [c.start for c in every[2:5]]
+    assert engine.latest(str(token), "1m") is every[-1]
+    assert engine.query(12345, "1h") == [] and engine.latest(12345, "1h") is None
+
+def test_block_timestamps_from_the_node(chain):
+    client = get_client(chain.url)
+    trades = list(iter_trades(1, BLOCKS, rpc_url=chain.url))
+    known = block_timestamps(client, (t.block_number for t in trades))
+    assert known[1] == int(client.call("eth_getBlockByNumber", ["0x1", False])["timestamp"], 16)
+    calls = chain.call_counts.get("eth_getBlockByNumber", 0)
+    block_timestamps(client, known, known)
+    assert chain.call_counts.get("eth_getBlockByNumber", 0) == calls
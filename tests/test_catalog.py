@@ -0,0 +1,96 @@
+import copy
+import pytest
+from src.indexer.catalog import MarketCatalog
+from src.market_decoder import decode_market
+from src.stub.gamma import StubGammaServer
+from src.stub.synth import generate_events
+
+def stamped_events(count: int) -> list:
+    events = generate_events(count, markets_per_event=2)
+    for i, event in enumerate(events):
+        event["updatedAt"] = f"2024-01-01T00:00:{i:02d}Z"
+    return events
+
+@pytest.fixture
+def catalog():
+    catalog = MarketCatalog(":memory:")
+    yield catalog
+    catalog.close()
+
+def test_sync_serves_decode_market_offline(catalog, gamma, events):
+    catalog.base_url = gamma.url
+    assert catalog.sync(page_size=2) == len(events)
+    assert catalog.count() == {"events": len(events), "markets": 2 * len(events)}
+
+    requests_before = gamma.request_count
+    for event in events:
+        assert decode_market(slug=event["slug"], catalog=catalog) == decode_market(slug=event["slug"])
+    # Only the API reference lookups above reached the server
+    assert gamma.request_count - requests_before == len(events)
+
+def test_unchanged_catalog_costs_one_request(catalog):
+    with StubGammaServer(events=stamped_events(7)) as gamma:
+        catalog.base_url = gamma.url
+        catalog.sync(page_size=3)
+        before = gamma.request_count
+        assert catalog.sync(page_size=3) == 0
+        assert gamma.request_count - before == 1
+
+def test_incremental_sync_writes_only_changes(catalog):
+    events = stamped_events(9)
+    with StubGammaServer(events=events) as gamma:
+        catalog.base_url = gamma.url
+        catalog.sync(page_size=3)
+
+        changed = copy.deepcopy(events[2])
+        changed["title"], changed["updatedAt"] = "Renamed", "2024-01-01T00:01:00Z"
+        gamma.add_event(changed)
+        assert catalog.sync(page_size=3) == 1
+        assert catalog.get_event(changed["slug"])["title"] == "Renamed"
+
+def test_update_in_the_watermark_second_is_picked_up(catalog):
+    events = stamped_events(4)
+    with StubGammaServer(events=events) as gamma:
+        catalog.base_url = gamma.url
+        catalog.sync(page_size=2)
+
+        # Updated after the last run but stamped with the same second
+        late = copy.deepcopy(events[1])
+        late["title"], late["updatedAt"] = "Late edit", events[-1]["updatedAt"]
+        gamma.add_event(late)
+        assert catalog.sync(page_size=2) == 1
+        assert catalog.get_event(late["slug"])["title"] == "Late edit"
+        assert catalog.sync(page_size=2) == 0
+
+def test_rows_moving_during_paging_are_not_skipped(catalog):
+    events = stamped_events(10)
+    with StubGammaServer(events=events) as gamma:
+        catalog.base_url = gamma.url
+        get_page = catalog._get_page
+        pages = []
+
+        def get_page_then_remove(offset, page_size, use_etag=True):
+            page, etag = get_page(offset, page_size, use_etag)
+            pages.append(offset)
+            if len(pages) == 1:
+                # The newest event goes away after the first page: every row moves up one
+                gamma.events = [e for e in gamma.events if e["id"] != page[0]["id"]]
+            return page, etag
+
+        catalog._get_page = get_page_then_remove
+        catalog.sync(page_size=3)
+    assert 0 in pages[1:]
+    assert catalog.count()["events"] == len(events)
+    assert all(catalog.get_event(e["slug"]) is not None for e in events)
+
+def test_resync_drops_removed_markets(catalog):
+    events = stamped_events(2)
+    with StubGammaServer(events=events) as gamma:
+        catalog.base_url = gamma.url
+        catalog.sync()
+        trimmed = copy.deepcopy(events[0])
+        trimmed["markets"], trimmed["updatedAt"] = trimmed["markets"][:1], "2024-01-02T00:00:00Z"
+        gamma.add_event(trimmed)
+        catalog.sync()
+    assert catalog.markets_for_event(trimmed["id"]) == trimmed["markets"]
+    assert catalog.count()["markets"] == 3
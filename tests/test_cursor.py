@@ -0,0 +1,103 @@
+import pytest
+import src.indexer.cursor as cursor_module
+from src.indexer.backfill import iter_trades
+from src.indexer.cursor import IndexCursor, index_range
+from src.store.sqlite import SQLiteTradeStore
+from conftest import BLOCKS, replacement_logs, trade_keys
+
+WINDOW = 5
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteTradeStore(str(tmp_path / "trades.db"))
+    yield store
+    store.close()
+
+def chain_trades(chain) -> list:
+    """What a fresh index of the chain as it is now would hold."""
+    return [t.to_dict() for t in iter_trades(1, BLOCKS, rpc_url=chain.url)]
+
+def stored_trades(store) -> list:
+    return store.fills_in_blocks(1, BLOCKS)
+
+def test_index_range_matches_backfill(chain, store):
+    written = index_range(store, 1, BLOCKS, rpc_url=chain.url, window=WINDOW)
+    expected = chain_trades(chain)
+    assert written == len(expected)
+    assert trade_keys(stored_trades(store)) == trade_keys(expected)
+    assert IndexCursor(store).get().block_number == BLOCKS
+
+def test_resume_after_crash_mid_window(chain, store, monkeypatch):
+    def crashing_iter_trades(from_block, to_block, **kwargs):
+        for n, trade in enumerate(iter_trades(from_block, to_block, **kwargs)):
+            if from_block > 2 * WINDOW and n == 3:
+                raise RuntimeError("killed")
+            yield trade
+
+    monkeypatch.setattr(cursor_module, "iter_trades", crashing_iter_trades)
+    with pytest.raises(RuntimeError):
+        index_range(store, 1, BLOCKS, rpc_url=chain.url, window=WINDOW)
+    # Only whole windows were committed
+    assert IndexCursor(store).get().block_number == 2 * WINDOW
+    committed = [t for t in chain_trades(chain) if t["block_number"] <= 2 * WINDOW]
+    assert trade_keys(stored_trades(store)) == trade_keys(committed)
+
+    monkeypatch.undo()
+    index_range(store, 1, BLOCKS, rpc_url=chain.url, window=WINDOW)
+    assert trade_keys(stored_trades(store)) == trade_keys(chain_trades(chain))
+
+def test_reorg_below_cursor_is_rolled_back(chain, store):
+    index_range(store, 1, BLOCKS, rpc_url=chain.url, window=WINDOW)
+    before = trade_keys(stored_trades(store))
+
+    fork = BLOCKS - 7
+    chain.reorg(fork, replacement_logs(fork, BLOCKS))
+    index_range(store, 1, BLOCKS, rpc_url=chain.url, window=WINDOW)
+
+    after = trade_keys(stored_trades(store))
+    assert after == trade_keys(chain_trades(chain))
+    assert after != before
+    assert [key for key in after if key[0] < fork] == [key for key in before if key[0] < fork]
+    cursor = IndexCursor(store).get()
+    assert cursor.block_number == BLOCKS
+    assert cursor.block_hash.lower() == chain.block_hash(BLOCKS).lower()
+
+def test_reorg_between_windows_is_rolled_back(chain, store, monkeypatch):
+    fork = WINDOW - 2
+    windows = []
+
+    def reorging_iter_trades(from_block, to_block, **kwargs):
+        windows.append(from_block)
+        if from_block == 2 * WINDOW + 1 and windows.count(from_block) == 1:
+            # Lands after window 2 was committed, below the cursor
+            chain.reorg(fork, replacement_logs(fork, BLOCKS))
+        yield from iter_trades(from_block, to_block, **kwargs)
+
+    monkeypatch.setattr(cursor_module, "iter_trades", reorging_iter_trades)
+    index_range(store, 1, BLOCKS, rpc_url=chain.url, window=WINDOW)
+    assert trade_keys(stored_trades(store)) == trade_keys(chain_trades(chain))
+    assert 1 in windows[1:]
+
+def test_second_cursor_is_refused(chain, store):
+    index_range(store, 1, WINDOW, rpc_url=chain.url, window=WINDOW)
+    with pytest.raises(ValueError):
+        IndexCursor(store, "other")
+
+def test_parent_that_flips_back_is_checked_again(chain, store, monkeypatch):
+    index_range(store, 1, WINDOW, rpc_url=chain.url, window=WINDOW)
+    real = cursor_module._header_hashes
+    flips = []
+
+    def flipping_header_hashes(client, numbers):
+        hashes = real(client, numbers)
+        if len(numbers) == 2 and not flips:
+            # The parent looks reorged once, then the chain is back to the cursor's block
+            flips.append(numbers)
+            hashes[1] = "0x" + "ee" * 32
+        return hashes
+
+    monkeypatch.setattr(cursor_module, "_header_hashes", flipping_header_hashes)
+    index_range(store, 1, BLOCKS, rpc_url=chain.url, window=WINDOW)
+    assert flips
+    assert trade_keys(stored_trades(store)) == trade_keys(chain_trades(chain))
+    assert IndexCursor(store).get().block_number == BLOCKS
@@ -0,0 +1,56 @@
+import random
+import pytest
+import src.ctf.derive as derive
+from src.ctf.derive import (
+    derive_binary_positions,
+    derive_binary_positions_many,
+    compute_condition_id,
+    compute_condition_ids_many,
+    clear_position_cache,
+)
+from src.stub.synth import UMA_ADAPTER
+
+COLLATERAL = "0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359"
+
+@pytest.fixture
+def question_ids():
+    rng = random.Random(0)
+    return ["0x" + format(rng.getrandbits(256), "064x") for _ in range(300)]
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_position_cache()
+    yield
+    clear_position_cache()
+
+def test_bulk_matches_single_derivation(question_ids):
+    conditions = compute_condition_ids_many(UMA_ADAPTER, question_ids)
+    assert conditions == [compute_condition_id(UMA_ADAPTER, q, 2) for q in question_ids]
+    assert derive_binary_positions_many(conditions) == \
+           [derive_binary_positions(UMA_ADAPTER, q) for q in question_ids]
+    assert derive_binary_positions_many(conditions, collateral_token=COLLATERAL) == \
+           [derive_binary_positions(UMA_ADAPTER, q, collateral_token=COLLATERAL) for q in question_ids]
+
+def test_process_pool_matches_in_process(question_ids):
+    conditions = compute_condition_ids_many(UMA_ADAPTER, question_ids)
+    expected = derive_binary_positions_many(conditions)
+    clear_position_cache()
+    assert derive_binary_positions_many(conditions, processes=2, chunk_size=64) == expected
+
+def test_cache_is_keyed_by_collateral_and_bounded(question_ids, monkeypatch):
+    conditions = compute_condition_ids_many(UMA_ADAPTER, question_ids)
+    usdc = derive_binary_positions_many(conditions[:10])
+    other = derive_binary_positions_many(conditions[:10], collateral_token=COLLATERAL)
+    assert usdc != other
+    assert derive_binary_positions_many(conditions[:10]) == usdc
+
+    monkeypatch.setattr(derive, "POSITION_CACHE_SIZE", 50)
+    derive_binary_positions_many(conditions)
+    assert len(derive._position_cache) == 50
+    # Least recently used entries went first
+    newest = {derive._hex_to_bytes(c, 32) for c in conditions[-50:]}
+    assert {condition for _, condition in derive._position_cache} == newest
+
+def test_malformed_condition_is_rejected():
+    with pytest.raises(ValueError):
+        derive_binary_positions_many(["0x1234"])
@@ -0,0 +1,78 @@
+import random
+from src.ctf.derive import derive_binary_positions
+from src.dispatcher import dispatch, dispatch_blocks, ConditionPreparation
+from src.indexer.rpc import format_log
+from src.market_decoder import decode_market_from_log
+from src.raw_decoder import decode_order_filled
+from src.stub.rpc import StubRPCServer
+from src.stub.synth import (generate_logs, make_match_logs, make_condition_preparation_log,
+                            make_position_split_log, make_positions_converted_log, UMA_ADAPTER)
+from src.trade import Trade
+from src.trade_decoder import CTF_EXCHANGE
+
+TX = "0x" + "aa" * 32
+QUESTION = "0x" + "5a" * 32
+USDC = "0x2791Bca1f2de4661ED88A30C99A7a9449Aa84174"
+
+def market_logs(block=10):
+    derived = derive_binary_positions(UMA_ADAPTER, QUESTION)
+    condition_id = "0x" + derived["conditionId"].removeprefix("0x")
+    return [
+        make_condition_preparation_log(block, 0, TX, condition_id, UMA_ADAPTER, QUESTION),
+        make_position_split_log(block, 1, TX, "0x" + "77" * 20, USDC, condition_id, (1, 2), 10 ** 6),
+        make_positions_converted_log(block, 2, TX, "0x" + "77" * 20, "0x" + "66" * 32, 3, 5),
+    ], derived
+
+def test_fills_grouped_under_orders_matched():
+    rng = random.Random(1)
+    makers = ["0x" + f"{i:040x}" for i in range(1, 4)]
+    logs = make_match_logs(5, 0, TX, CTF_EXCHANGE, 1234, 1, 2, [(m, 100 * (i + 1)) for i, m in enumerate(makers)], rng)
+    result = dispatch(logs)
+    assert len(result.matches) == 1
+    match = result.matches[0]
+    assert [t.log_index for t in match.fills] == [0, 1, 2]
+    assert match.taker_fill.log_index == 3 and match.taker_fill.taker == CTF_EXCHANGE
+    assert result.fills == match.fills
+    assert match.matched.maker_amount == sum(t.taker_amount for t in match.fills)
+
+def test_unmatched_fills_match_trade_decoder():
+    logs = generate_logs(500, noise_ratio=0.3)
+    expected = []
+    for log in map(format_log, logs):
+        args = decode_order_filled(log)
+        trade = args and Trade.from_event(log["transactionHash"], log, args, log["blockNumber"])
+        if trade:
+            expected.append(trade.to_dict())
+    assert [t.to_dict() for t in dispatch(logs).fills] == expected
+
+def test_ctf_events_decode():
+    logs, derived = market_logs()
+    result = dispatch(logs)
+    condition, = result.conditions
+    assert isinstance(condition, ConditionPreparation)
+    assert condition.oracle.lower() == UMA_ADAPTER.lower() and condition.question_id == QUESTION
+    assert condition.outcome_slot_count == 2
+    split, = result.splits
+    assert split.collateral_token == USDC and split.partition == (1, 2) and split.amount == 10 ** 6
+    conversion, = result.conversions
+    assert conversion.index_set == 3 and conversion.amount == 5
+    assert result.to_dict()["splits"][0]["partition"] == ["1", "2"]
+
+def test_block_scan_matches_in_memory_dispatch():
+    rng = random.Random(2)
+    logs, _ = market_logs(block=3)
+    logs = generate_logs(200, noise_ratio=0.2, logs_per_block=20) + logs
+    logs += make_match_logs(12, 40, "0x" + "bb" * 32, CTF_EXCHANGE, 99, 1, 4, [("0x" + "12" * 20, 400)], rng)
+    with StubRPCServer(logs=logs, max_block_range=3) as server:
+        scanned = dispatch_blocks(1, 12, rpc_url=server.url, chunk_size=2)
+    ordered = sorted(logs, key=lambda l: (int(l["blockNumber"], 16), int(l["logIndex"], 16)))
+    assert scanned.to_dict() == dispatch(ordered).to_dict()
+    assert scanned.matches and scanned.conditions
+
+def test_market_rebuilt_from_condition_preparation():
+    logs, derived = market_logs()
+    with StubRPCServer(logs=logs) as server:
+        market = decode_market_from_log(TX, rpc_url=server.url)
+    assert market["collateralToken"] == USDC
+    assert market["outcomeSlotCount"] == 2
+    assert market["yesTokenId"] == derived["yesTokenId"] and market["noTokenId"] == derived["noTokenId"]
@@ -0,0 +1,97 @@
+import threading
+import pytest
+from src.indexer.backfill import iter_trades
+from src.indexer.follow import follow, Update, Rollback
+from src.indexer.rpc import RPCError, get_client
+from conftest import BLOCKS, replacement_logs, trade_keys
+
+STEP = 5
+
+@pytest.fixture
+def stop():
+    stop = threading.Event()
+    # Ends a follow() stuck waiting for a block, should an assertion not be reached
+    timer = threading.Timer(30, stop.set)
+    timer.start()
+    yield stop
+    stop.set()
+    timer.cancel()
+
+def follow_until(updates, to_block: int, trades: dict, events: list):
+    """Apply updates (and rollbacks) to `trades` until `to_block` is emitted."""
+    for update in updates:
+        events.append(update)
+        if isinstance(update, Rollback):
+            for key in [key for key, trade in trades.items() if trade["block_number"] > update.block_number]:
+                del trades[key]
+            continue
+        for trade in update.trades:
+            trade = trade.to_dict()
+            trades[(trade["tx_hash"], trade["log_index"])] = trade
+        if update.to_block >= to_block:
+            return
+    pytest.fail(f"follow() stopped before block {to_block}")
+
+def test_follow_rolls_back_a_reorg(chain, stop):
+    updates = follow(chain.url, from_block=1, max_range=STEP, min_interval=0.01, stop=stop)
+    trades, events = {}, []
+    follow_until(updates, BLOCKS, trades, events)
+    assert not any(isinstance(event, Rollback) for event in events)
+
+    fork = BLOCKS - 7
+    chain.reorg(fork, replacement_logs(fork, BLOCKS))
+    chain.head_block = BLOCKS
+    head = chain.mine_block()
+    events.clear()
+    follow_until(updates, head, trades, events)
+
+    rollbacks = [event for event in events if isinstance(event, Rollback)]
+    assert len(rollbacks) == 1
+    # Rolled back to the newest emitted range end below the fork
+    assert rollbacks[0].block_number == (fork - 1) // STEP * STEP
+    assert isinstance(events[0], Rollback)
+    assert all(isinstance(event, Update) for event in events[1:])
+
+    expected = [t.to_dict() for t in iter_trades(1, head, rpc_url=chain.url)]
+    assert trade_keys(trades.values()) == trade_keys(expected)
+
+def test_follow_waits_for_confirmations(chain, stop):
+    confirmations = 3
+    updates = follow(chain.url, from_block=1, confirmations=confirmations, max_range=STEP,
+                     min_interval=0.01, stop=stop)
+    trades, events = {}, []
+    follow_until(updates, BLOCKS - confirmations, trades, events)
+
+    # A reorg of still unconfirmed blocks is never seen
+    fork = BLOCKS - confirmations + 1
+    chain.reorg(fork, replacement_logs(fork, BLOCKS))
+    chain.head_block = BLOCKS
+    head = chain.mine_block()
+    follow_until(updates, head - confirmations, trades, events)
+
+    assert not any(isinstance(event, Rollback) for event in events)
+    expected = [t.to_dict() for t in iter_trades(1, head - confirmations, rpc_url=chain.url)]
+    assert trade_keys(trades.values()) == trade_keys(expected)
+
+def test_refused_step_is_retried(chain, stop, monkeypatch, capsys):
+    client = get_client(chain.url)
+    batch_call = client._batch_call
+    refused = []
+
+    def refuse_first_get_logs(calls):
+        results = batch_call(calls)
+        if not refused and calls[-1][0] == "eth_getLogs":
+            refused.append(calls[-1])
+            results[-1] = RPCError(-32005, "query timeout exceeded")
+        return results
+
+    monkeypatch.setattr(client, "_batch_call", refuse_first_get_logs)
+    updates = follow(chain.url, from_block=1, max_range=STEP, min_interval=0.01, max_interval=0.01, stop=stop)
+    trades, events = {}, []
+    follow_until(updates, BLOCKS, trades, events)
+
+    assert refused
+    assert "query timeout exceeded" in capsys.readouterr().out
+    assert [event.from_block for event in events] == list(range(1, BLOCKS + 1, STEP))
+    expected = [t.to_dict() for t in iter_trades(1, BLOCKS, rpc_url=chain.url)]
+    assert trade_keys(trades.values()) == trade_keys(expected)
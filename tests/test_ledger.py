@@ -0,0 +1,105 @@
+import pytest
+from src.indexer.rpc import format_log
+from src.ledger import Ledger, USDC
+from src.raw_decoder import decode_order_filled
+from src.stub.synth import generate_logs
+from src.trade import Trade
+from src.trade_decoder import CTF_EXCHANGE
+
+ALICE = "0x" + "a1" * 20
+BOB = "0x" + "b2" * 20
+TOKEN = 7
+
+def fill(block, maker, taker, maker_asset_id, taker_asset_id, maker_amount, taker_amount, log_index=0):
+    return Trade("0x" + f"{block:064x}", log_index, CTF_EXCHANGE, maker, taker,
+                 maker_asset_id, taker_asset_id, maker_amount, taker_amount, block)
+
+def synthetic_fills(count=3000):
+    fills = []
+    for log in map(format_log, generate_logs(count, token_count=20, address_count=50)):
+        trade = Trade.from_event(log["transactionHash"], log, decode_order_filled(log), log["blockNumber"])
+        if trade is not None:
+            fills.append(trade)
+    return fills
+
+def state(ledger):
+    return {address: {token: (p.balance, p.cost, p.realized) for token, p in tokens.items()}
+            for address, tokens in ledger.positions.items()}
+
+def test_average_cost_and_cash():
+    ledger = Ledger()
+    ledger.apply_fills([
+        fill(1, ALICE, BOB, USDC, TOKEN, 50, 100),   # Alice buys 100 for 50
+        fill(2, ALICE, BOB, USDC, TOKEN, 70, 100),   # and 100 more for 70
+        fill(3, ALICE, BOB, TOKEN, USDC, 100, 80),   # sells 100 for 80
+    ])
+    alice = ledger.position(ALICE, TOKEN)
+    assert (alice.balance, alice.cost, alice.realized) == (100, 60, 20)
+    assert ledger.cash(ALICE) == -50 - 70 + 80
+    assert ledger.cash(BOB) == -ledger.cash(ALICE)
+    assert ledger.position(BOB.upper().replace("0X", "0x"), TOKEN).balance == -100
+
+def test_balances_match_a_plain_sum():
+    fills = synthetic_fills()
+    ledger = Ledger()
+    ledger.apply_fills(fills)
+    expected = {}
+    for f in fills:
+        for address, give, give_amount, recv, recv_amount in (
+                (f.maker, f.maker_asset_id, f.maker_amount, f.taker_asset_id, f.taker_amount),
+                (f.taker, f.taker_asset_id, f.taker_amount, f.maker_asset_id, f.maker_amount)):
+            tokens = expected.setdefault(address.lower(), {})
+            tokens[give] = tokens.get(give, 0) - give_amount
+            tokens[recv] = tokens.get(recv, 0) + recv_amount
+    assert {a: {t: p[0] for t, p in tokens.items()} for a, tokens in state(ledger).items()} == expected
+
+def test_recovery_from_snapshot_and_torn_log(tmp_path):
+    fills = synthetic_fills()
+    with Ledger(str(tmp_path)) as ledger:
+        ledger.apply_fills(fills[:1000])
+        ledger.snapshot()
+        ledger.apply_fills(fills[1000:2000])
+        expected = state(ledger)
+        last_key = ledger.last_key
+    with open(tmp_path / "ledger.log", "ab") as f:
+        f.write(b"PMLD\x05\x00\x00\x00" + b"\x00" * 40)   # frame torn mid-write
+
+    with Ledger(str(tmp_path)) as ledger:
+        assert state(ledger) == expected and ledger.last_key == last_key
+        # Re-feeding the stream skips what was applied, and says so
+        assert ledger.apply_fills(fills) == len(fills) - 2000
+        assert ledger.skipped == 2000
+        ledger.compact()
+        expected = state(ledger)
+    with Ledger(str(tmp_path)) as ledger:
+        assert state(ledger) == expected
+
+def test_out_of_order_fill_is_counted():
+    ledger = Ledger()
+    ledger.apply_fill(fill(5, ALICE, BOB, USDC, TOKEN, 1, 2))
+    assert not ledger.apply_fill(fill(4, ALICE, BOB, USDC, TOKEN, 1, 2))
+    assert ledger.skipped == 1 and ledger.cash(ALICE) == -1
+
+def test_uint256_amounts_are_logged(tmp_path):
+    big = 2 ** 200
+    with Ledger(str(tmp_path)) as ledger:
+        ledger.apply_fills([fill(1, ALICE, BOB, USDC, TOKEN, big, big + 1)])
+        expected = state(ledger)
+    with Ledger(str(tmp_path)) as ledger:
+        assert state(ledger) == expected
+        ledger.compact()
+    with Ledger(str(tmp_path)) as ledger:
+        assert ledger.position(ALICE, TOKEN).balance == big + 1
+
+def test_delta_that_cannot_be_logged_is_not_applied(tmp_path):
+    with Ledger(str(tmp_path)) as ledger:
+        ledger.apply_fills([fill(1, ALICE, BOB, USDC, TOKEN, 10, 20)])
+        before = state(ledger)
+        with pytest.raises(OverflowError):
+            # Bob is credited 5 USDC first, then his -(2^256-1) token delta does not fit
+            ledger.apply_fill(fill(2, BOB, ALICE, TOKEN, USDC, 2 ** 256 - 1, 5))
+        assert state(ledger) == before and ledger.last_key == (1, 0)
+        assert ledger.apply_fills([fill(3, ALICE, BOB, USDC, TOKEN, 1, 1)]) == 1
+        expected = state(ledger)
+    with Ledger(str(tmp_path)) as ledger:
+        assert state(ledger) == expected
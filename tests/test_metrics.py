@@ -0,0 +1,102 @@
+import json
+import urllib.error
+import urllib.request
+import pytest
+from src import metrics
+from src.indexer.backfill import backfill
+from src.stub.rpc import StubRPCServer
+from src.trade_decoder import decode_trades, decode_trades_many
+from conftest import BLOCKS, is_fill
+
+# The registry is process-wide, so these tests compare counts before/after.
+
+def value(metric, *labels):
+    return metric.values.get(labels, 0)
+
+@pytest.fixture
+def enabled():
+    metrics.enable(tracing=True)
+    yield
+    metrics.disable()
+
+def test_counter_gauge_histogram_render():
+    counter = metrics.counter("test_items_total", "Items", ("kind",))
+    counter.inc("a")
+    counter.inc("a", amount=2)
+    gauge = metrics.gauge("test_depth", "Depth", ("queue",))
+    gauge.set(3, "fixed")
+    gauge.set_function(lambda: 7, "live")
+    histogram = metrics.histogram("test_seconds", "Seconds", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+
+    # Registering the same name again returns the existing metric
+    assert metrics.counter("test_items_total", "Items", ("kind",)) is counter
+    text = metrics.render_prometheus()
+    assert "# TYPE test_items_total counter" in text
+    assert 'test_items_total{kind="a"} 3' in text
+    assert 'test_depth{queue="fixed"} 3' in text
+    assert 'test_depth{queue="live"} 7' in text
+    assert 'test_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_seconds_bucket{le="1.0"} 2' in text
+    assert 'test_seconds_bucket{le="+Inf"} 2' in text
+    assert "test_seconds_count 2" in text
+
+    gauge.set_function(None, "live")
+    assert "live" not in metrics.stats()["metrics"]["test_depth"]
+
+def test_disabled_records_nothing(chain, logs):
+    assert not metrics.ENABLED
+    assert metrics.span("decode_receipt") is metrics.span("get_logs")
+    recorded = (metrics.LOGS_SCANNED, metrics.FILLS, metrics.RPC_SECONDS, metrics.STAGE_SECONDS)
+    before = [repr(metric.values) for metric in recorded]
+    list(backfill(1, BLOCKS, rpc_url=chain.url))
+    decode_trades(logs[0]["transactionHash"], chain.url)
+    assert [repr(metric.values) for metric in recorded] == before
+
+def test_backfill_is_counted(enabled, logs):
+    scanned = value(metrics.LOGS_SCANNED, "getLogs")
+    fills = value(metrics.FILLS, "getLogs")
+    splits = value(metrics.LOG_RANGE_SPLITS)
+    with StubRPCServer(logs=logs, max_block_range=4) as limited:
+        trades = list(backfill(1, BLOCKS, rpc_url=limited.url, chunk_size=BLOCKS))
+
+    assert value(metrics.LOGS_SCANNED, "getLogs") - scanned == len(logs)
+    assert value(metrics.FILLS, "getLogs") - fills == len(trades) == sum(map(is_fill, logs))
+    assert value(metrics.LOG_RANGE_SPLITS) > splits
+    assert metrics.RPC_SECONDS.values[("eth_getLogs",)][2] > 0
+    assert value(metrics.RPC_ERRORS, "eth_getLogs", "-32005") > 0
+    assert any(event["name"] == "get_logs" for event in metrics.trace_events()["traceEvents"])
+
+def test_receipt_failures_are_counted(enabled, chain, logs):
+    missing = value(metrics.DECODE_FAILURES, "receipt_not_found")
+    rejected = value(metrics.DECODE_FAILURES, "receipt_rejected")
+    fills = value(metrics.FILLS, "receipt")
+    tx_hash = logs[0]["transactionHash"]
+    trades = decode_trades_many([tx_hash, "0x" + "ab" * 32, "0xbad"], chain.url)
+
+    assert trades == decode_trades(tx_hash, chain.url)
+    assert value(metrics.DECODE_FAILURES, "receipt_not_found") - missing == 1
+    assert value(metrics.DECODE_FAILURES, "receipt_rejected") - rejected == 1
+    assert value(metrics.FILLS, "receipt") - fills == 2 * len(trades)
+
+def test_http_endpoints(enabled):
+    metrics.FILLS.inc("test")
+    server = metrics.serve(0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(base + "/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert 'pm_fills_total{source="test"}' in response.read().decode()
+        with urllib.request.urlopen(base + "/stats") as response:
+            body = json.load(response)
+            assert body["enabled"] is True
+            assert body["metrics"]["pm_fills_total"]["test"]["total"] >= 1
+        with urllib.request.urlopen(base + "/trace") as response:
+            assert "traceEvents" in json.load(response)
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(base + "/nope")
+        assert excinfo.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,42 @@
+from web3 import Web3
+from src.bench.raw_decode import _as_receipt_log, process_log_path
+from src.raw_decoder import decode_order_filled, is_order_filled
+from src.stub.synth import generate_logs
+from src.trade_decoder import ORDER_FILLED_ABI, build_trade, decode_trades
+from conftest import BLOCKS
+
+def order_filled_event():
+    return Web3().eth.contract(abi=[ORDER_FILLED_ABI]).events.OrderFilled()
+
+def test_matches_process_log_bit_for_bit():
+    logs = [_as_receipt_log(log) for log in generate_logs(2000, noise_ratio=0.5)]
+    expected = process_log_path(logs, order_filled_event())
+    decoded = [decode_order_filled(log) for log in logs]
+    assert decoded == expected
+    assert any(args is None for args in decoded) and any(args is not None for args in decoded)
+    for ours, theirs in zip(decoded, expected):
+        if ours is not None:
+            assert [type(v) for v in ours.values()] == [type(v) for v in theirs.values()]
+
+def test_hex_json_logs_decode_like_receipt_logs():
+    raw = generate_logs(500, noise_ratio=0.3)
+    assert [decode_order_filled(log) for log in raw] == \
+           [decode_order_filled(_as_receipt_log(log)) for log in raw]
+
+def test_malformed_logs_are_skipped():
+    log = generate_logs(1)[0]
+    assert is_order_filled(log)
+    assert decode_order_filled(dict(log, topics=log["topics"][:3])) is None
+    assert decode_order_filled(dict(log, data=log["data"][:-64])) is None
+    assert decode_order_filled(dict(log, topics=[])) is None
+
+def test_decode_trades_matches_process_log_path(chain, logs):
+    event = order_filled_event()
+    tx_hashes = list(dict.fromkeys(log["transactionHash"] for log in logs))
+    for tx_hash in tx_hashes[:BLOCKS]:
+        expected = []
+        for log in map(_as_receipt_log, (l for l in logs if l["transactionHash"] == tx_hash)):
+            trade = build_trade(tx_hash, log, event.process_log(log)['args'])
+            if trade is not None:
+                expected.append(trade)
+        assert decode_trades(tx_hash, chain.url) == expected
@@ -0,0 +1,51 @@
+import pytest
+from src.indexer.rpc import RPCClient, RPCError, get_client
+from src.stub.rpc import StubRPCServer
+from src.trade_decoder import decode_trades, decode_trades_many
+
+def tx_hashes_of(logs: list) -> list:
+    return list(dict.fromkeys(log["transactionHash"] for log in logs))
+
+def test_batch_matches_single_calls(chain, logs):
+    client = RPCClient(chain.url, batch_size=7)
+    tx_hashes = tx_hashes_of(logs)
+    assert client.get_receipts(tx_hashes) == [client.get_receipt(h) for h in tx_hashes]
+
+def test_only_failed_items_are_retried(logs):
+    tx_hashes = tx_hashes_of(logs)
+    with StubRPCServer(logs=logs, error_rate=0.2, seed=3) as flaky:
+        client = RPCClient(flaky.url, batch_size=16, backoff=0.01, max_retries=8)
+        receipts = client.get_receipts(tx_hashes)
+        assert all(isinstance(r, dict) for r in receipts)
+        assert flaky.error_count > 0
+        # Every injected error cost exactly one resend of that item alone
+        assert flaky.call_counts["eth_getTransactionReceipt"] == len(tx_hashes) + flaky.error_count
+    with StubRPCServer(logs=logs) as steady:
+        assert receipts == RPCClient(steady.url).get_receipts(tx_hashes)
+
+def test_permanent_error_keeps_the_rest_of_the_batch(logs):
+    tx_hashes = tx_hashes_of(logs)[:20]
+    calls = [("eth_getTransactionReceipt", [h]) for h in tx_hashes]
+    calls.insert(5, ("eth_getTransactionReceipt", ["0x1234"]))
+    calls.insert(12, ("eth_getTransactionReceipt", ["0x" + "ab" * 32]))
+    with StubRPCServer(logs=logs, error_rate=0.2, seed=1) as flaky:
+        client = RPCClient(flaky.url, batch_size=50, backoff=0.01, max_retries=8)
+        results = client.batch_call(calls)
+        assert flaky.error_count > 1
+
+    assert isinstance(results[5], RPCError) and results[5].code == -32602
+    assert results[12] is None
+    good = [r for i, r in enumerate(results) if i not in (5, 12)]
+    assert [r["transactionHash"] for r in good] == tx_hashes
+
+    with StubRPCServer(logs=logs) as steady:
+        with pytest.raises(RPCError):
+            RPCClient(steady.url).batch_call(calls, raise_errors=True)
+
+def test_decode_trades_many_skips_rejected_hashes(chain, logs):
+    tx_hashes = tx_hashes_of(logs)
+    expected = [t for h in tx_hashes for t in decode_trades(h, chain.url)]
+    assert decode_trades_many(tx_hashes[:3] + ["0xbad"] + tx_hashes[3:], chain.url, batch_size=8) == expected
+
+def test_get_client_is_shared_per_endpoint(chain):
+    assert get_client(chain.url) is get_client(chain.url)
@@ -0,0 +1,92 @@
+import json
+import threading
+import pytest
+from src.client import ServiceClient
+from src.ctf.derive import derive_binary_positions
+from src.market_decoder import decode_market
+from src.service import DecodeService, make_server
+from src.stub.rpc import StubRPCServer
+from src.stub.synth import UMA_ADAPTER
+from src.trade_decoder import decode_trades
+
+@pytest.fixture(params=["tcp", "unix"])
+def service(request, chain, gamma, tmp_path):
+    socket_path = str(tmp_path / "decode.sock") if request.param == "unix" else None
+    server = make_server(DecodeService(chain.url), port=0, unix_socket=socket_path)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    address = f"unix:{socket_path}" if socket_path else f"http://127.0.0.1:{server.server_address[1]}"
+    client = ServiceClient(address, timeout=10)
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+def test_decode_tx_matches_direct(service, chain, logs):
+    tx_hash = logs[0]["transactionHash"]
+    expected = decode_trades(tx_hash, chain.url, include_block=True)
+    assert expected
+    # Several calls over one kept-alive connection
+    for _ in range(3):
+        assert service.decode_tx(tx_hash, include_block=True) == expected
+
+def test_batch_reports_each_hash(service, chain, logs):
+    tx_hash = logs[0]["transactionHash"]
+    unknown = "0x" + "ab" * 32
+    results = service.decode_txs([tx_hash, unknown, "0xbad"])
+
+    assert [result["tx_hash"] for result in results] == [tx_hash, unknown, "0xbad"]
+    assert results[0] == {"tx_hash": tx_hash, "trades": decode_trades(tx_hash, chain.url)}
+    assert "not found" in results[1]["error"]
+    assert "-32602" in results[2]["error"]
+
+def test_request_errors(service):
+    with pytest.raises(ValueError, match="not found"):
+        service.decode_tx("0x" + "ab" * 32)
+    with pytest.raises(ValueError, match="-32602"):
+        service.decode_tx("0xbad")
+    with pytest.raises(ValueError, match="required"):
+        service.request("/decode-tx")
+    with pytest.raises(ValueError, match="Unknown endpoint"):
+        service.request("/nope")
+
+def test_malformed_json_is_a_bad_request(service):
+    if service.address.startswith("unix:"):
+        pytest.skip("same handler as TCP")
+    conn = service._connect()
+    conn.request("POST", "/health", b"{not json", {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    assert response.status == 400
+    assert "Malformed JSON" in json.loads(response.read())["error"]
+    conn.close()
+
+def test_decode_market_is_cached(service, gamma, events):
+    slug = events[0]["slug"]
+    expected = decode_market(slug=slug)
+    before = gamma.request_count
+    assert service.decode_market(slug=slug) == expected
+    assert service.decode_market(slug=slug) == expected
+    assert gamma.request_count - before == 1
+    with pytest.raises(ValueError):
+        service.decode_market(slug="no-such-market")
+
+def test_derive_positions_match_direct(service):
+    question_id = "0x" + "12" * 32
+    expected = derive_binary_positions(UMA_ADAPTER, question_id)
+    assert service.derive_positions(UMA_ADAPTER, question_id) == expected
+    assert service.derive_positions_many([expected["conditionId"]]) == [expected]
+
+def test_health_does_not_expose_the_rpc_url(service, chain):
+    health = service.health()
+    assert health["status"] == "ok"
+    assert health["requests"] >= 1
+    assert chain.url not in json.dumps(health)
+
+def test_health_reports_sanitized_endpoints(chain, logs):
+    with StubRPCServer(logs=logs) as backup:
+        # The stand-ins answer on any path, like a provider's /v2/<key>
+        service = DecodeService(f"{chain.url}/v2/SECRET,{backup.url}/SECRET#rps=50")
+        health = service.handle("/health", {})
+    assert [endpoint["endpoint"] for endpoint in health["rpc_endpoints"]] == \
+        [chain.url.split("//")[1], backup.url.split("//")[1]]
+    assert health["rpc_endpoints"][1]["rate_limit"] == 50
+    assert "SECRET" not in json.dumps(health)
@@ -0,0 +1,94 @@
+import pytest
+from src.bench.raw_decode import _as_receipt_log
+from src.raw_decoder import decode_order_filled
+from src.store.sqlite import SQLiteTradeStore
+from src.store.writer import BatchWriter
+from src.stub.synth import make_order_filled_log
+from src.trade_decoder import CTF_EXCHANGE, build_trade
+from conftest import make_logs
+
+def to_trades(logs):
+    trades = []
+    for raw in logs:
+        log = _as_receipt_log(raw)
+        args = decode_order_filled(log)
+        trade = build_trade(raw["transactionHash"], log, args) if args else None
+        if trade is not None:
+            trades.append(dict(trade, block_number=log["blockNumber"]))
+    return trades
+
+def huge_trade(amount=2 ** 63 + 5):
+    log = make_order_filled_log(7, 0, "0x" + "ab" * 32, CTF_EXCHANGE, "0x" + "01" * 32,
+                                "0x" + "11" * 20, "0x" + "22" * 20, 0, 2 ** 255 + 1, amount, 2 ** 256 - 1)
+    return to_trades([log])[0]
+
+@pytest.fixture(params=["sqlite", "parquet"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = SQLiteTradeStore(str(tmp_path / "trades.db"))
+    else:
+        pytest.importorskip("pyarrow")
+        from src.store.parquet import ParquetTradeStore
+        store = ParquetTradeStore(str(tmp_path / "trades"), bucket_size=10, row_group_size=16)
+    yield store
+    store.close()
+
+def test_upsert_is_idempotent(store):
+    trades = to_trades(make_logs(30))
+    store.upsert(trades)
+    store.upsert(trades[: len(trades) // 2])
+    assert store.count() == len(trades)
+    by_key = lambda t: (t["block_number"], t["log_index"], t["tx_hash"])
+    assert store.fills_in_blocks(0, 10 ** 9) == sorted(trades, key=by_key)
+
+def test_token_and_block_queries(store):
+    trades = to_trades(make_logs(30, token_count=3))
+    store.upsert(trades)
+    token = trades[0]["token_id"]
+    expected = [t for t in trades if t["token_id"] == token and 5 <= t["block_number"] <= 20]
+    got = store.fills_for_token(token, 5, 20)
+    assert got and sorted(map(str, got)) == sorted(map(str, expected))
+    assert store.fills_for_token(int(token, 16), 5, 20) == got
+    assert all(10 <= t["block_number"] <= 12 for t in store.fills_in_blocks(10, 12))
+
+def test_maker_lookup_ignores_address_case(store):
+    trades = to_trades(make_logs(10, address_count=3))
+    store.upsert(trades)
+    maker = trades[0]["maker"]
+    expected = [t for t in trades if t["maker"] == maker]
+    assert maker != maker.lower()
+    assert store.fills_for_maker(maker) == store.fills_for_maker(maker.lower()) == \
+        store.fills_for_maker(maker.upper().replace("0X", "0x"))
+    assert len(store.fills_for_maker(maker)) == len(expected)
+    # Output keeps the decoders' checksummed form
+    assert all(t["maker"] == maker for t in store.fills_for_maker(maker.lower()))
+
+def test_uint256_amounts_round_trip(store):
+    trade = huge_trade()
+    store.upsert([trade])
+    assert store.fills_in_blocks(0, 100) == [trade]
+    assert store.fills_for_token(trade["token_id"]) == [trade]
+
+def test_batch_writer_stores_uint256_amounts(tmp_path):
+    trades = to_trades(make_logs(5)) + [huge_trade(2 ** 200)]
+    store = SQLiteTradeStore(str(tmp_path / "trades.db"))
+    with BatchWriter(store, batch_size=7, flush_interval=0.05) as writer:
+        for trade in trades:
+            writer.write(trade)
+    assert writer.written == len(trades) == store.count()
+    assert store.fills_in_blocks(7, 7)[-1]["maker_amount"] == str(2 ** 200)
+
+def test_parquet_parts_merge_on_compact(tmp_path):
+    pytest.importorskip("pyarrow")
+    from src.store.parquet import ParquetTradeStore
+    store = ParquetTradeStore(str(tmp_path / "trades"), bucket_size=100)
+    trades = to_trades(make_logs(20))
+    store.upsert(trades[:50])
+    store.upsert(trades[25:])
+    assert len(store._parts("0")) == 2
+    assert store.count() == len(trades)
+    before = store.fills_in_blocks(0, 100)
+    store.close()
+    assert len(store._parts("0")) == 1
+    assert store.count() == len(trades)
+    assert store.fills_in_blocks(0, 100) == before
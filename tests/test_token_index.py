@@ -0,0 +1,67 @@
+import json
+from src.indexer.backfill import backfill
+from src.indexer.catalog import MarketCatalog
+from src.indexer.token_index import TokenIndex, MappedTokenIndex, load_index, tag_trade
+from conftest import BLOCKS
+
+def market_tokens(events: list) -> list:
+    """(token ID, conditionId, outcome index, questionID) for every market outcome."""
+    return [(int(token), market["conditionId"], outcome, market["questionID"])
+            for event in events for market in event["markets"]
+            for outcome, token in enumerate(json.loads(market["clobTokenIds"]))]
+
+def test_catalog_index_resolves_every_token(gamma, events):
+    catalog = MarketCatalog(":memory:", base_url=gamma.url)
+    catalog.sync()
+    index = TokenIndex()
+    index.add_catalog(catalog)
+    catalog.close()
+
+    tokens = market_tokens(events)
+    assert len(index) == len(tokens)
+    for token, condition_id, outcome, question_id in tokens:
+        info = index.get(hex(token))
+        assert (info.condition_id, info.outcome_index, info.question_id, info.neg_risk) == \
+               (condition_id.lower(), outcome, question_id.lower(), True)
+    assert index.get(12345) is None
+
+def test_derived_positions_match_clob_token_ids(events):
+    from_clob, from_derived = TokenIndex(), TokenIndex()
+    for event in events:
+        for market in event["markets"]:
+            from_clob.add_gamma_market(market)
+            from_derived.add_gamma_market(dict(market, clobTokenIds=None))
+    assert from_clob.entries == from_derived.entries
+
+def test_saved_index_maps_back(tmp_path, events):
+    index = TokenIndex()
+    for event in events:
+        for market in event["markets"]:
+            index.add_gamma_market(market)
+    path = str(tmp_path / "tokens.bin")
+    index.save(path)
+
+    mapped = MappedTokenIndex(path)
+    try:
+        assert len(mapped) == len(index)
+        for token, info in index.entries.items():
+            assert mapped.get(token) == info
+            assert mapped.get(str(token)) == info
+        assert mapped.get(1) is None
+    finally:
+        mapped.close()
+    assert load_index(path).entries == index.entries
+
+def test_backfill_tags_trades(chain, logs):
+    index = TokenIndex()
+    question_id = "0x" + "11" * 32
+    trades = list(backfill(1, BLOCKS, rpc_url=chain.url))
+    known = {t["token_id"] for t in trades[:3]}
+    for n, token_id in enumerate(known):
+        index.add(token_id, "0x" + f"{n:064x}", 0, question_id)
+
+    tagged = list(backfill(1, BLOCKS, rpc_url=chain.url, token_index=index))
+    assert [dict(t, condition_id=None, outcome_index=None, question_id=None, neg_risk=None) for t in tagged] == \
+           [tag_trade(dict(t), TokenIndex()) for t in trades]
+    assert {t["token_id"] for t in tagged if t["condition_id"]} == known
+    assert all(t["question_id"] == question_id for t in tagged if t["condition_id"])
@@ -0,0 +1,43 @@
+import json
+from src.bench.trade_memory import build_batch, build_dicts, build_objects
+from src.indexer.rpc import format_log
+from src.raw_decoder import decode_order_filled
+from src.stub.synth import generate_logs, make_order_filled_log
+from src.trade import Trade, TradeBatch
+from src.trade_decoder import CTF_EXCHANGE, trades_from_receipt
+
+def events_for(logs):
+    return [(log, decode_order_filled(log)) for log in map(format_log, logs)]
+
+def test_json_is_byte_identical_to_legacy_dicts():
+    events = events_for(generate_logs(3000, summary_ratio=0.2))
+    expected = json.dumps(build_dicts(events), indent=2)
+    assert json.dumps([t.to_dict() for t in build_objects(events)], indent=2) == expected
+    assert json.dumps(build_batch(events).to_dicts(), indent=2) == expected
+
+def test_batch_round_trips_trades():
+    events = events_for(generate_logs(500))
+    objects = build_objects(events)
+    batch = build_batch(events)
+    assert len(batch) == len(objects)
+    assert list(batch) == objects
+    assert batch[3].side == objects[3].side and batch[3].price == objects[3].price
+
+def test_batch_amounts_fall_back_past_uint64():
+    huge = 2 ** 200
+    log = format_log(make_order_filled_log(9, 1, "0x" + "cd" * 32, CTF_EXCHANGE, "0x" + "02" * 32,
+                                           "0x" + "33" * 20, "0x" + "44" * 20, 5, 0, huge, 1))
+    batch = TradeBatch()
+    batch.extend(build_objects(events_for(generate_logs(3))))
+    trade = Trade.from_event(log["transactionHash"], log, decode_order_filled(log), block_number=9)
+    batch.append(trade)
+    assert batch[-1] == trade
+    assert batch.to_dicts()[-1] == trade.to_dict()
+    assert trade.to_dict()["maker_amount"] == str(huge) and trade.to_dict()["block_number"] == 9
+
+def test_receipt_trades_carry_block_number_only_when_asked():
+    logs = generate_logs(10, start_block=42, summary_ratio=0.0)
+    receipt = {"blockNumber": hex(42), "logs": logs}
+    tx_hash = logs[0]["transactionHash"]
+    assert all("block_number" not in t for t in trades_from_receipt(tx_hash, receipt))
+    assert {t["block_number"] for t in trades_from_receipt(tx_hash, receipt, include_block=True)} == {42}